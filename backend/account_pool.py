@@ -0,0 +1,311 @@
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from eth_account import Account
+from models import db, PoolAccount, OnboardingJob
+from profiling import phase
+
+IN_PROGRESS_STATES = ('fund', 'register', 'confirm')
+# ready accounts a claim tries before reporting the pool empty
+CLAIM_CANDIDATES = 8
+# window for the refill rate (accounts made ready per second)
+RATE_WINDOW_SECONDS = 60
+MAX_BACKOFF_SECONDS = 300
+
+
+class AccountPool:
+    """
+    Keeps a stock of voter accounts that are already created, funded and
+    registered on the contract, so /register only has to claim one.
+    - A refill thread tops the pool up to ACCOUNT_POOL_TARGET once ready plus
+      in-progress accounts drop below ACCOUNT_POOL_LOW_WATERMARK, creating
+      ACCOUNT_POOL_REFILL_BATCH accounts per round.
+    - Funding goes out per account; registration goes through registerVoters
+      (one tx per batch) and both are confirmed with one batched receipt lookup.
+      A tx still unmined after RECEIPT_DROP_AFTER_SECONDS that the node no
+      longer knows was dropped; its account goes back to fund or register.
+    - Failed steps wait ONBOARDING_BACKOFF_SECONDS, doubling per attempt.
+    - claim() takes a ready account with a conditional UPDATE, inside the
+      caller's transaction, so concurrent signups never share one.
+    - The refill thread only runs where ACCOUNT_POOL_REFILL_ENABLED is set;
+      set it in one process. Claims are safe from any number.
+    """
+    def __init__(self, app=None, bc=None):
+        self._thread = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._ready_events = deque()
+        self._stats = {'created': 0, 'funded': 0, 'registered': 0, 'ready': 0, 'claimed': 0,
+                       'exhausted': 0, 'failed': 0}
+        if app:
+            self.init_app(app, bc)
+
+    def init_app(self, app, bc):
+        self.app = app
+        self.bc = bc
+        self.enabled = app.config.get('ACCOUNT_POOL_ENABLED', False)
+        self.refill_enabled = app.config.get('ACCOUNT_POOL_REFILL_ENABLED', False)
+        self.target = app.config.get('ACCOUNT_POOL_TARGET', 500)
+        self.low_watermark = app.config.get('ACCOUNT_POOL_LOW_WATERMARK', 200)
+        self.refill_batch = app.config.get('ACCOUNT_POOL_REFILL_BATCH', 100)
+        self.poll_interval = app.config.get('ACCOUNT_POOL_POLL_INTERVAL', 2)
+        self.max_attempts = app.config.get('ONBOARDING_MAX_ATTEMPTS', 8)
+        self.backoff = app.config.get('ONBOARDING_BACKOFF_SECONDS', 2)
+        self.drop_after = app.config.get('RECEIPT_DROP_AFTER_SECONDS', 300)
+        self.funding_ether = app.config.get('VOTER_FUNDING_ETHER', 1)
+
+    # --------------------------------------------------------------------------
+    # CLAIMING (request path)
+    # --------------------------------------------------------------------------
+    def claim(self):
+        """
+        Reserve a ready account in the current transaction (caller commits),
+        or None when the pool is empty.
+        """
+        candidates = [row_id for (row_id,) in (db.session.query(PoolAccount.id)
+                                               .filter(PoolAccount.state == 'ready')
+                                               .order_by(PoolAccount.id)
+                                               .limit(CLAIM_CANDIDATES)
+                                               .all())]
+        # spread concurrent claimers over the candidates instead of racing for one row
+        random.shuffle(candidates)
+        for row_id in candidates:
+            claimed = (PoolAccount.query
+                       .filter(PoolAccount.id == row_id, PoolAccount.state == 'ready')
+                       .update({'state': 'claimed', 'claimed_at': datetime.utcnow()},
+                               synchronize_session=False))
+            if claimed:
+                self._count('claimed')
+                self._wake.set()
+                return db.session.get(PoolAccount, row_id)
+        self._count('exhausted')
+        self._wake.set()
+        return None
+
+    def assign(self, account, user):
+        """Link a claimed account to user and record its onboarding as already done."""
+        if user.id is None:
+            db.session.flush()
+        account.user_id = user.id
+        job = OnboardingJob(user=user, step='done', fund_tx_hash=account.fund_tx_hash,
+                            register_tx_hash=account.register_tx_hash)
+        db.session.add(job)
+        return job
+
+    # --------------------------------------------------------------------------
+    # REFILL
+    # --------------------------------------------------------------------------
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name='account-pool', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    worked = self.run_once()
+            except Exception:
+                self.app.logger.exception("Account pool refill failed")
+                worked = False
+            if not worked:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def run_once(self):
+        """One refill round. Returns False when it made no progress (the loop then sleeps)."""
+        created = self._top_up()
+        funded = self._fund()
+        registered = self._register()
+        confirmed = self._confirm()
+        return bool(created or funded or registered or confirmed)
+
+    def _top_up(self):
+        counts = self.depth()
+        stocked = counts.get('ready', 0) + sum(counts.get(state, 0) for state in IN_PROGRESS_STATES)
+        if stocked >= self.low_watermark:
+            return 0
+        n = min(self.refill_batch, self.target - stocked)
+        with phase('crypto'):
+            accounts = [Account.create() for _ in range(n)]
+        db.session.execute(PoolAccount.__table__.insert(), [
+            {'address': acct.address, 'private_key': acct.key.hex(), 'state': 'fund', 'attempts': 0,
+             'created_at': datetime.utcnow()}
+            for acct in accounts
+        ])
+        db.session.commit()
+        self._count('created', n)
+        return n
+
+    def _due(self, state):
+        now = datetime.utcnow()
+        return (PoolAccount.query
+                .filter(PoolAccount.state == state,
+                        db.or_(PoolAccount.next_attempt_at.is_(None), PoolAccount.next_attempt_at <= now))
+                .order_by(PoolAccount.id)
+                .limit(self.refill_batch)
+                .all())
+
+    def _fund(self):
+        admin_key = self.app.config.get('PRIVATE_KEY')
+        value = self.bc.w3.to_wei(self.funding_ether, 'ether')
+        accounts = self._due('fund')
+        funded = 0
+        for account in accounts:
+            try:
+                account.fund_tx_hash = self.bc.send_value(admin_key, account.address, value)
+                account.submitted_at = datetime.utcnow()
+                account.state = 'register'
+                funded += 1
+            except Exception as e:
+                self._failed(account, e)
+        db.session.commit()
+        self._count('funded', funded)
+        return funded
+
+    def _register(self):
+        accounts = self._due('register')
+        if not accounts:
+            return 0
+        if not self.bc.contract:
+            # without a deployed contract there is nothing to register against
+            results = []
+        else:
+            try:
+                results = self.bc.register_voters(self.app.config.get('PRIVATE_KEY'),
+                                                  [account.address for account in accounts])
+            except Exception as e:
+                results = [{'addresses': [account.address for account in accounts], 'tx_hash': None,
+                            'error': str(e)}]
+        by_address = {address.lower(): result for result in results for address in result['addresses']}
+        registered = 0
+        for account in accounts:
+            result = by_address.get(account.address.lower())
+            if result and result['error']:
+                self._failed(account, result['error'])
+            else:
+                account.register_tx_hash = result['tx_hash'] if result else None
+                account.submitted_at = datetime.utcnow()
+                account.state = 'confirm'
+                registered += 1
+        db.session.commit()
+        self._count('registered', registered)
+        return registered
+
+    def _confirm(self):
+        accounts = (PoolAccount.query.filter_by(state='confirm')
+                    .order_by(PoolAccount.id).limit(self.refill_batch * 2).all())
+        if not accounts:
+            return 0
+        hashes = {h for account in accounts for h in (account.fund_tx_hash, account.register_tx_hash) if h}
+        receipts = self.bc.get_receipts(list(hashes))
+        ready = 0
+        now = datetime.utcnow()
+        stale = []
+        for account in accounts:
+            fund = receipts.get(account.fund_tx_hash) if account.fund_tx_hash else {'status': '0x1'}
+            register = receipts.get(account.register_tx_hash) if account.register_tx_hash else {'status': '0x1'}
+            if fund is None or register is None:
+                if account.submitted_at and now - account.submitted_at > timedelta(seconds=self.drop_after):
+                    stale.append((account, fund is None, register is None))
+                continue
+            if int(str(fund['status']), 0) != 1:
+                account.state = 'fund'
+                self._failed(account, 'funding tx %s reverted' % account.fund_tx_hash)
+            elif int(str(register['status']), 0) != 1:
+                account.state = 'register'
+                self._failed(account, 'registerVoters tx %s reverted' % account.register_tx_hash)
+            else:
+                account.state = 'ready'
+                account.ready_at = now
+                ready += 1
+        if stale:
+            self._requeue_dropped(stale)
+        db.session.commit()
+        if ready:
+            self._count('ready', ready)
+            with self._lock:
+                self._ready_events.append((time.time(), ready))
+        return ready
+
+    def _requeue_dropped(self, stale):
+        """Send accounts whose unmined fund/register tx the node no longer knows back a step."""
+        hashes = [h for account, fund_unmined, register_unmined in stale
+                  for h, unmined in ((account.fund_tx_hash, fund_unmined),
+                                     (account.register_tx_hash, register_unmined)) if unmined]
+        known = self.bc.get_transactions(hashes)
+        for account, fund_unmined, register_unmined in stale:
+            if fund_unmined and known.get(account.fund_tx_hash) is None:
+                error = 'funding tx %s dropped' % account.fund_tx_hash
+                account.state = 'fund'
+                account.fund_tx_hash = None
+            elif register_unmined and known.get(account.register_tx_hash) is None:
+                error = 'registerVoters tx %s dropped' % account.register_tx_hash
+                account.state = 'register'
+                account.register_tx_hash = None
+            else:
+                continue
+            self._failed(account, error)
+
+    def _failed(self, account, error):
+        account.attempts += 1
+        account.last_error = str(error)[:1000]
+        if account.attempts >= self.max_attempts:
+            account.state = 'failed'
+            self._count('failed')
+            self.app.logger.warning("Pool account %s failed: %s", account.address, error)
+        else:
+            delay = min(self.backoff * 2 ** (account.attempts - 1), MAX_BACKOFF_SECONDS)
+            account.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    # --------------------------------------------------------------------------
+    # STATUS
+    # --------------------------------------------------------------------------
+    def depth(self):
+        rows = db.session.query(PoolAccount.state, db.func.count(PoolAccount.id)).group_by(PoolAccount.state).all()
+        return {state: count for state, count in rows}
+
+    def refill_rate(self):
+        """Accounts made ready per second over the last RATE_WINDOW_SECONDS."""
+        cutoff = time.time() - RATE_WINDOW_SECONDS
+        with self._lock:
+            while self._ready_events and self._ready_events[0][0] < cutoff:
+                self._ready_events.popleft()
+            return round(sum(n for _, n in self._ready_events) / RATE_WINDOW_SECONDS, 3)
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+        data.update(enabled=self.enabled, target=self.target, low_watermark=self.low_watermark,
+                    depth=self.depth(), refill_rate=self.refill_rate())
+        return data
+
+    def render_prometheus(self, prefix='voting_account_pool'):
+        if not self.enabled:
+            return ''
+        depth = self.depth()
+        rate = self.refill_rate()
+        lines = [
+            '# HELP %s_accounts Pool accounts by state.' % prefix,
+            '# TYPE %s_accounts gauge' % prefix,
+        ]
+        lines += ['%s_accounts{state="%s"} %d' % (prefix, state, depth.get(state, 0))
+                  for state in IN_PROGRESS_STATES + ('ready', 'claimed', 'failed')]
+        lines += [
+            '# HELP %s_refill_rate Accounts made ready per second (last %ds).' % (prefix, RATE_WINDOW_SECONDS),
+            '# TYPE %s_refill_rate gauge' % prefix,
+            '%s_refill_rate %s' % (prefix, rate),
+            '# HELP %s_events_total Accounts created, funded, registered, made ready, claimed; '
+            'claims that found the pool empty (exhausted).' % prefix,
+            '# TYPE %s_events_total counter' % prefix,
+        ]
+        with self._lock:
+            lines += ['%s_events_total{event="%s"} %d' % (prefix, name, n) for name, n in sorted(self._stats.items())]
+        return '\n'.join(lines) + '\n'
@@ -1,35 +1,77 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response, send_file
+from startup import StartupTimer
+startup = StartupTimer()
+
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, Response, stream_with_context
 from config import Config
-from models import db, User, Candidate, Vote, Election
+from models import db, User, Candidate, Vote, Election, OnboardingJob
+from eth_utils import is_address, to_checksum_address
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from passlib.hash import pbkdf2_sha256
-from blockchain import BlockchainClient
-import csv
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-import os
+from blockchain import BlockchainClient, AsyncBlockchainClient
+from onboarding import OnboardingWorker, job_to_dict
+from results_cache import ResultsCache
+from indexer import EventIndexer
+from streaming import ResultsBroadcaster
+from receipts import ReceiptTracker, vote_status_to_dict
+from voter_import import VoterImporter, iter_records
+from vote_queue import VoteQueue
+from roster import RosterCache
+from principal import PrincipalCache
+from auth import PasswordHasher
+from exports import iter_csv, iter_vote_audit_rows, VOTE_AUDIT_HEADER
+from profiling import RequestProfiler, phase
+from audit import AuditLog, root_to_dict
+from reconcile import Reconciler
+from account_pool import AccountPool
+from database import configure_engines, DatabaseRouter
+from sqlalchemy.exc import IntegrityError
+import click
+from werkzeug.serving import is_running_from_reloader
+import json
+import multiprocessing
+import threading
+import time
+from datetime import datetime
 import io
 import tempfile
-from web3 import Web3
 
+startup.mark('imports')
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 app.config.from_object(Config)
 
+configure_engines(app)
 db.init_app(app)
+db_router = DatabaseRouter(app, db)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
+profiler = RequestProfiler(app)
 
 bc = BlockchainClient(app)
+achain = AsyncBlockchainClient(app, bc)
+onboarding = OnboardingWorker(app, bc)
+hasher = PasswordHasher(app)
+importer = VoterImporter(app, onboarding, hasher)
+results_cache = ResultsCache(app, bc)
+indexer = EventIndexer(app, bc)
+broadcaster = ResultsBroadcaster()
+receipts = ReceiptTracker(app, bc, block_source=results_cache.current_block)
+vote_queue = VoteQueue()
+roster = RosterCache(app)
+principals = PrincipalCache(app)
+audit_log = AuditLog(app, bc)
+reconciler = Reconciler(app, bc)
+account_pool = AccountPool(app, bc)
+startup.mark('clients')
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # slim cached principal; routes that need the private key load it explicitly
+    return principals.load(int(user_id))
 
 with app.app_context():
     db.create_all()
+startup.mark('create_all')
 
 @app.route('/')
 def home():
@@ -54,11 +96,18 @@ def register():
             flash('Voter ID already used', 'danger')
             return redirect(url_for('register'))
 
-        acct = bc.w3.eth.account.create()
-        blockchain_address = acct.address
-        blockchain_private_key = acct.key.hex()
+        # a pooled account is already funded and registered on chain
+        pooled = account_pool.claim() if account_pool.enabled else None
+        if pooled:
+            blockchain_address = pooled.address
+            blockchain_private_key = pooled.private_key
+        else:
+            with phase('crypto'):
+                acct = bc.w3.eth.account.create()
+            blockchain_address = acct.address
+            blockchain_private_key = acct.key.hex()
 
-        hashed_password = pbkdf2_sha256.hash(password)
+        hashed_password = hasher.hash(password)
 
         user = User(
             username=username,
@@ -71,37 +120,14 @@ def register():
         )
 
         db.session.add(user)
+        if pooled:
+            account_pool.assign(pooled, user)
+        else:
+            # Funding and registerVoter are sent by the onboarding workers
+            onboarding.enqueue(user)
         db.session.commit()
-
-        # FUND VOTER (1 ETH)
-        try:
-            admin_key = app.config['PRIVATE_KEY']
-            admin_account = bc.w3.eth.account.from_key(admin_key)
-            admin_address = admin_account.address
-
-            fund_tx = {
-                'from': admin_address,
-                'to': blockchain_address,
-                'value': bc.w3.to_wei(1, 'ether'),
-                'gas': 21000,
-                'gasPrice': bc.w3.eth.gas_price,
-                'nonce': bc.w3.eth.get_transaction_count(admin_address),
-                'chainId': bc.w3.eth.chain_id
-            }
-
-            signed_fund_tx = bc.w3.eth.account.sign_transaction(fund_tx, admin_key)
-            tx_hash = bc.w3.eth.send_raw_transaction(signed_fund_tx.raw_transaction)
-            print("Funded voter with 1 ETH:", tx_hash.hex())
-
-        except Exception as e:
-            print("Funding failed:", str(e))
-
-        # Register voter on contract
-        try:
-            if bc.contract:
-                bc.register_voter(app.config['PRIVATE_KEY'], blockchain_address)
-        except Exception as e:
-            print("Contract register failed:", str(e))
+        if not pooled:
+            onboarding.notify()
 
         flash('Registration successful. Please log in.', 'success')
         return redirect(url_for('login'))
@@ -117,9 +143,17 @@ def login():
         email = request.form['email'].strip().lower()
         password = request.form['password']
         user = User.query.filter_by(email=email).first()
-        if user and pbkdf2_sha256.verify(password, user.password_hash):
-            login_user(user)
-            return redirect(url_for('vote'))
+        if not user:
+            hasher.dummy_verify()
+        else:
+            ok, new_hash = hasher.verify(password, user.password_hash)
+            if ok:
+                if new_hash:
+                    # PASSWORD_SCHEME / PASSWORD_ROUNDS changed since this hash was made
+                    user.password_hash = new_hash
+                    db.session.commit()
+                login_user(user)
+                return redirect(url_for('vote'))
         flash('Invalid credentials', 'danger')
     return render_template('login.html')
 
@@ -138,61 +172,259 @@ def logout():
 @app.route('/vote', methods=['GET','POST'])
 @login_required
 def vote():
-    candidates = Candidate.query.all()
-    election = Election.query.filter_by(is_active=True).first()
+    response, ballot = read_ballot()
+    if response is not None:
+        return response
+    candidate, election, voter_private_key, voter_address = ballot
+
+    try:
+        # This will create, sign and broadcast a tx from voter's account to the contract
+        tx_hash = bc.cast_vote(voter_private_key, candidate.candidate_number, voter_address)
+    except Exception as e:
+        app.logger.exception("Error casting vote: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return record_vote(candidate, election, tx_hash)
+
+async def vote_async():
+    # ASYNC_VIEWS variant of vote(): the broadcast is awaited instead of pinning the thread
+    response, ballot = read_ballot()
+    if response is not None:
+        return response
+    candidate, election, voter_private_key, voter_address = ballot
+
+    try:
+        tx_hash = await achain.cast_vote(voter_private_key, candidate.candidate_number, voter_address)
+    except Exception as e:
+        app.logger.exception("Error casting vote: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return record_vote(candidate, election, tx_hash)
+
+def read_ballot():
+    """
+    Shared front half of the sync and async /vote views.
+    Returns (response, None) when there is nothing to broadcast (GET page,
+    validation error, queued-vote 202), else (None, ballot) with ballot =
+    (candidate, election, voter key, voter address).
+    """
+    candidates = roster.candidates()
+    election = roster.active_election()
 
     if not election:
-        return render_template('vote.html', candidates=candidates, election=None)
+        return render_template('vote.html', candidates=candidates, election=None), None
 
-    if request.method == 'POST':
-        try:
-            candidate_db_id = int(request.form['candidate'])
-        except Exception:
-            return jsonify({'success': False, 'error': 'Invalid candidate id'}), 400
+    if request.method != 'POST':
+        return render_template('vote.html', candidates=candidates, election=election), None
 
-        candidate = Candidate.query.get(candidate_db_id)
-        if not candidate:
-            return jsonify({'success': False, 'error': 'Invalid candidate'}), 400
+    try:
+        candidate_db_id = int(request.form['candidate'])
+    except Exception:
+        return (jsonify({'success': False, 'error': 'Invalid candidate id'}), 400), None
 
-        # Prevent multiple votes in same election
-        if Vote.query.filter_by(user_id=current_user.id, election_id=election.id).first():
-            return jsonify({'success': False, 'error': 'You have already voted in this election'}), 400
+    candidate = roster.candidate(candidate_db_id)
+    if not candidate:
+        return (jsonify({'success': False, 'error': 'Invalid candidate'}), 400), None
 
-        candidate_number = candidate.candidate_number
+    # Prevent multiple votes in same election
+    if Vote.query.filter_by(user_id=current_user.id, election_id=election.id).first():
+        return (jsonify({'success': False, 'error': 'You have already voted in this election'}), 400), None
 
-        # The voter should sign their own transaction (we stored private key at registration for demo)
-        voter_private_key = getattr(current_user, 'blockchain_private_key', None)
-        voter_address = getattr(current_user, 'blockchain_address', None)
+    # The voter should sign their own transaction (we stored private key at registration for demo)
+    voter_private_key, voter_address = (db.session.query(User.blockchain_private_key, User.blockchain_address)
+                                        .filter(User.id == current_user.id)
+                                        .one())
 
-        if not voter_private_key or not voter_address:
-            return jsonify({'success': False, 'error': 'Voter blockchain account not set on server'}), 500
+    if not voter_private_key or not voter_address:
+        return (jsonify({'success': False, 'error': 'Voter blockchain account not set on server'}), 500), None
 
-        try:
-            # This will create, sign and broadcast a tx from voter's account to the contract
-            tx_hash = bc.cast_vote(voter_private_key, candidate_number, voter_address)
-        except Exception as e:
-            app.logger.exception("Error casting vote: %s", e)
-            return jsonify({'success': False, 'error': str(e)}), 500
+    if vote_queue.enabled:
+        return queue_vote(candidate, election), None
+    return None, (candidate, election, voter_private_key, voter_address)
+
+def record_vote(candidate, election, tx_hash):
+    # Save vote record referencing the tx_hash
+    vote = Vote(user_id=current_user.id, candidate_id=candidate.id, election_id=election.id, tx_hash=tx_hash)
+    db.session.add(vote)
+    db.session.commit()
+    vote_recorded()
+    return jsonify({'success': True, 'tx_hash': tx_hash})
+
+def queue_vote(candidate, election):
+    """Reserve the voter's slot and hand the vote to the submitter threads."""
+    if vote_queue.full():
+        vote_queue.reject()
+        return busy_response()
+
+    vote = Vote(user_id=current_user.id, candidate_id=candidate.id, election_id=election.id,
+                tx_status='queued', queued_at=datetime.utcnow(), submitted_at=None)
+    db.session.add(vote)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # the unique_vote constraint caught a concurrent duplicate
+        db.session.rollback()
+        return jsonify({'success': False, 'error': 'You have already voted in this election'}), 400
 
-        # Save vote record referencing the tx_hash
-        vote = Vote(user_id=current_user.id, candidate_id=candidate.id, election_id=election.id, tx_hash=tx_hash)
-        db.session.add(vote)
+    if not vote_queue.enqueue(vote.id):
+        db.session.delete(vote)
         db.session.commit()
-        return jsonify({'success': True, 'tx_hash': tx_hash})
+        return busy_response()
+    return jsonify({'success': True, 'queued': True, 'ticket': vote.id,
+                    'status_url': url_for('vote_ticket', ticket=vote.id)}), 202
+
+def busy_response():
+    response = jsonify({'success': False, 'error': 'Too many votes in progress, please retry shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(vote_queue.retry_after())
+    return response
+
+def vote_recorded():
+    results_cache.invalidate()
+    broadcaster.notify()
+    audit_log.notify()
 
-    return render_template('vote.html', candidates=candidates, election=election)
+vote_queue.init_app(app, bc, on_submitted=vote_recorded)
+
+@app.route('/vote/ticket/<int:ticket>')
+@login_required
+def vote_ticket(ticket):
+    vote = db.session.get(Vote, ticket)
+    if not vote or (vote.user_id != current_user.id and current_user.role != 'admin'):
+        return jsonify({'error': 'Unknown ticket'}), 404
+    return jsonify(dict(vote_status_to_dict(vote), ticket=vote.id))
+
+# -----------------------
+# Vote transaction status
+# -----------------------
+@app.route('/vote/status/<tx_hash>')
+@login_required
+def vote_status(tx_hash):
+    if tx_hash.startswith('0x'):
+        tx_hash = tx_hash[2:]
+    vote = Vote.query.filter_by(tx_hash=tx_hash).first()
+    if not vote or (vote.user_id != current_user.id and current_user.role != 'admin'):
+        return jsonify({'error': 'Unknown transaction'}), 404
+    return jsonify(vote_status_to_dict(vote))
 
 # -----------------------
 # API results
 # -----------------------
 @app.route('/api/results')
 def api_results():
-    candidates = Candidate.query.all()
+    return jsonify(cached_results())
+
+async def api_results_async():
+    return jsonify(await results_cache.get_or_compute_async('results', compute_results_async))
+
+def vote_counts(candidates):
+    numbers = [c.candidate_number for c in candidates]
+    if app.config['RESULTS_SOURCE'] == 'index':
+        return indexer.vote_counts(numbers)
+    return bc.get_all_vote_counts(numbers)
+
+def db_vote_counts(election_id, statuses=('pending', 'confirmed')):
+    """{candidate_number: votes} from the votes table for one election (one GROUP BY)."""
+    rows = (db.session.query(Candidate.candidate_number, db.func.count(Vote.id))
+            .join(Vote, Vote.candidate_id == Candidate.id)
+            .filter(Vote.election_id == election_id, Vote.tx_status.in_(statuses))
+            .group_by(Candidate.candidate_number)
+            .all())
+    return {number: count for number, count in rows}
+
+def compute_results():
+    candidates = roster.candidates()
+    return results_rows(candidates, vote_counts(candidates))
+
+async def compute_results_async():
+    candidates = roster.candidates()
+    if app.config['RESULTS_SOURCE'] == 'index':
+        return results_rows(candidates, vote_counts(candidates))
+    return results_rows(candidates, await achain.get_all_vote_counts([c.candidate_number for c in candidates]))
+
+def results_rows(candidates, counts):
     results = []
     for c in candidates:
-        count = bc.get_vote_count(c.candidate_number) if bc.contract else 0
+        count = counts.get(c.candidate_number, 0)
         results.append({'id': c.id, 'name': c.name, 'candidate_number': c.candidate_number, 'count': count})
-    return jsonify(results)
+    return results
+
+def cached_results():
+    return results_cache.get_or_compute('results', compute_results)
+
+broadcaster.init_app(app, cached_results)
+indexer.listeners.append(broadcaster.notify)
+
+# -----------------------
+# Live results stream (SSE)
+# -----------------------
+@app.route('/api/results/stream')
+def api_results_stream():
+    if not request.environ.get('wsgi.multithread'):
+        # a sync worker would be tied up for the whole stream (see gunicorn.conf.py)
+        return jsonify({'error': 'Streaming needs a threaded server, poll /api/results instead'}), 503
+    sub = broadcaster.subscribe(request.headers.get('Last-Event-ID'))
+    if sub is None:
+        return jsonify({'error': 'Too many subscribers, poll /api/results instead'}), 503
+    return Response(broadcaster.stream(sub), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# -----------------------
+# Vote verification
+# -----------------------
+@app.route('/api/verify/<address>')
+def api_verify(address):
+    if not is_address(address):
+        return jsonify({'error': 'Invalid address'}), 400
+    address = to_checksum_address(address)
+    if app.config['RESULTS_SOURCE'] == 'index':
+        voter = indexer.voter_state(address)
+        return jsonify({
+            'address': address,
+            'registered': bool(voter and voter.registered),
+            'has_voted': bool(voter and voter.has_voted),
+            'source': 'index',
+            'indexed_block': indexer.last_block(),
+        })
+    return jsonify({'address': address, 'has_voted': bc.verify_vote(address), 'source': 'chain'})
+
+@app.route('/api/verify/batch')
+async def api_verify_batch():
+    """?address=0x..&address=0x..: every verifyVote call in flight at once."""
+    addresses = request.args.getlist('address')
+    if not addresses or len(addresses) > app.config['VERIFY_BATCH_MAX']:
+        return jsonify({'error': 'Pass 1-%d address parameters' % app.config['VERIFY_BATCH_MAX']}), 400
+    if not all(is_address(a) for a in addresses):
+        return jsonify({'error': 'Invalid address'}), 400
+    addresses = [to_checksum_address(a) for a in addresses]
+    voted = await achain.verify_votes(addresses)
+    return jsonify({'results': [{'address': a, 'has_voted': voted[a]} for a in addresses], 'source': 'chain'})
+
+# -----------------------
+# Async views (ASYNC_VIEWS): same URLs and endpoints, chain calls awaited
+# -----------------------
+if app.config['ASYNC_VIEWS']:
+    app.view_functions['vote'] = login_required(vote_async)
+    app.view_functions['api_results'] = api_results_async
+
+# -----------------------
+# Merkle audit log (published roots + inclusion proofs)
+# -----------------------
+@app.route('/api/audit/root/<int:election_id>')
+def api_audit_root(election_id):
+    root = audit_log.latest_root(election_id)
+    if root is None:
+        return jsonify({'error': 'No root published for this election yet'}), 404
+    return jsonify(root_to_dict(root))
+
+@app.route('/api/audit/proof/<int:vote_id>')
+@login_required
+def api_audit_proof(vote_id):
+    vote = db.session.get(Vote, vote_id)
+    if not vote or (vote.user_id != current_user.id and current_user.role != 'admin'):
+        return jsonify({'error': 'Unknown vote'}), 404
+    proof = audit_log.proof(vote)
+    if proof is None:
+        return jsonify({'error': 'Vote is not in a published root yet', 'tx_status': vote.tx_status}), 404
+    return jsonify(proof)
 
 # -----------------------
 # Admin panel
@@ -215,13 +447,15 @@ def admin_panel():
         description = request.form.get('description', '')
         is_verified = True if request.form.get('is_verified') else False
 
-        last = Candidate.query.order_by(Candidate.candidate_number.desc()).first()
-        next_num = last.candidate_number + 1 if last and last.candidate_number else 1
+        last_num = db.session.query(db.func.max(Candidate.candidate_number)).scalar()
+        next_num = (last_num or 0) + 1
 
         cand = Candidate(name=name, party=party, age=age, qualification=qualification,
                          description=description, is_verified=is_verified, candidate_number=next_num)
         db.session.add(cand)
         db.session.commit()
+        roster.invalidate()
+        results_cache.invalidate()
 
         # Optionally sync to blockchain if contract present and admin key present
         try:
@@ -256,6 +490,8 @@ def edit_candidate(candidate_id):
         cand.description = request.form.get('description')
         cand.is_verified = True if request.form.get('is_verified') else False
         db.session.commit()
+        roster.invalidate()
+        results_cache.invalidate()
         flash('Candidate updated!', 'success')
         return redirect(url_for('admin_panel'))
     return render_template('edit_candidate.html', candidate=cand)
@@ -271,6 +507,8 @@ def delete_candidate(candidate_id):
     cand = Candidate.query.get_or_404(candidate_id)
     db.session.delete(cand)
     db.session.commit()
+    roster.invalidate()
+    results_cache.invalidate()
     flash('Candidate removed', 'danger')
     return redirect(url_for('admin_panel'))
 
@@ -285,6 +523,7 @@ def start_election():
     new = Election(is_active=True)
     db.session.add(new)
     db.session.commit()
+    roster.invalidate()
     flash('Election started!', 'success')
     return redirect(url_for('admin_panel'))
 
@@ -297,6 +536,7 @@ def stop_election():
     if e:
         e.is_active = False
         db.session.commit()
+        roster.invalidate()
     flash('Election stopped!', 'warning')
     return redirect(url_for('admin_panel'))
 
@@ -309,18 +549,11 @@ def export_csv():
     if current_user.role != 'admin':
         return redirect(url_for('home'))
 
-    candidates = Candidate.query.all()
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['Candidate No', 'Name', 'Party', 'Vote Count'])
-    for c in candidates:
-        vote_count = bc.get_vote_count(c.candidate_number) if bc.contract else 0
-        writer.writerow([c.candidate_number, c.name, c.party, vote_count])
-
-    response = make_response(output.getvalue())
-    response.headers['Content-Disposition'] = 'attachment; filename=results.csv'
-    response.mimetype='text/csv'
-    return response
+    candidates = roster.candidates()
+    counts = vote_counts(candidates)
+    rows = ([c.candidate_number, c.name, c.party, counts.get(c.candidate_number, 0)] for c in candidates)
+    return Response(iter_csv(['Candidate No', 'Name', 'Party', 'Vote Count'], rows), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=results.csv'})
 
 # -----------------------
 # Export PDF
@@ -331,19 +564,22 @@ def export_pdf():
     if current_user.role != 'admin':
         return redirect(url_for('home'))
 
-    candidates = Candidate.query.all()
-
-    # Use a temp file to avoid writing into the app root
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-    tmp_name = tmp.name
-    tmp.close()
+    candidates = roster.candidates()
 
     data = [['Candidate No', 'Name', 'Party', 'Vote Count']]
+    counts = vote_counts(candidates)
     for c in candidates:
-        vote_count = bc.get_vote_count(c.candidate_number) if bc.contract else 0
+        vote_count = counts.get(c.candidate_number, 0)
         data.append([c.candidate_number, c.name, c.party, vote_count])
 
-    pdf = SimpleDocTemplate(tmp_name, pagesize=letter)
+    # export-only dependency: imported on first use, not at worker boot
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib import colors
+
+    # Render in memory; nothing is left behind on disk
+    buf = io.BytesIO()
+    pdf = SimpleDocTemplate(buf, pagesize=letter)
     table = Table(data)
     table.setStyle(TableStyle([
         ('BACKGROUND', (0,0), (-1,0), colors.gray),
@@ -352,7 +588,246 @@ def export_pdf():
         ('ALIGN', (0,0), (-1,-1), 'CENTER')
     ]))
     pdf.build([table])
-    return send_file(tmp_name, as_attachment=True, download_name='results.pdf')
+    buf.seek(0)
+    return send_file(buf, as_attachment=True, download_name='results.pdf', mimetype='application/pdf')
+
+# -----------------------
+# Export per-vote audit CSV (streamed)
+# -----------------------
+@app.route('/admin/export-votes')
+@login_required
+def export_votes():
+    if current_user.role != 'admin':
+        return redirect(url_for('home'))
+    rows = iter_vote_audit_rows(app.config['EXPORT_BATCH_SIZE'])
+    return Response(stream_with_context(iter_csv(VOTE_AUDIT_HEADER, rows)), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=votes.csv'})
+
+# -----------------------
+# Runtime stats (admin)
+# -----------------------
+@app.route('/admin/stats')
+@login_required
+def admin_stats():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify({
+        'rpc': bc.rpc_metrics.snapshot(),
+        'chain_params': bc.chain_params(),
+        'providers': bc.provider_status(),
+        'nonces': bc.nonces.stats(),
+        'onboarding': onboarding.stats(),
+        'results_cache': results_cache.stats(),
+        'indexer': indexer.status(),
+        'results_stream': broadcaster.stats(),
+        'receipts': receipts.stats(),
+        'vote_queue': vote_queue.stats(),
+        'roster': roster.stats(),
+        'principals': principals.stats(),
+        'passwords': hasher.stats(),
+        'profiling': profiler.stats(),
+        'audit': audit_log.stats(),
+        'startup': startup.report(),
+        'account_pool': account_pool.stats(),
+        'database': db_router.stats(),
+    })
+
+# -----------------------
+# Event indexer status + audit against chain (admin)
+# -----------------------
+@app.route('/admin/indexer')
+@login_required
+def admin_indexer():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    numbers = [c.candidate_number for c in roster.candidates()]
+    return jsonify({'status': indexer.status(), 'mismatches': indexer.audit(numbers)})
+
+# -----------------------
+# DB tally vs chain counts (admin)
+# -----------------------
+@app.route('/admin/tally')
+@login_required
+def admin_tally():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    election_id = request.args.get('election_id', type=int)
+    if election_id is None:
+        election = roster.active_election()
+        if not election:
+            return jsonify({'error': 'No active election; pass election_id'}), 400
+        election_id = election.id
+    numbers = [c.candidate_number for c in roster.candidates()]
+    recorded = db_vote_counts(election_id)
+    confirmed = db_vote_counts(election_id, statuses=('confirmed',))
+    # the contract keeps one running tally, so this only lines up for the
+    # first election on a given deployment
+    on_chain = bc.get_all_vote_counts(numbers)
+    return jsonify({
+        'election_id': election_id,
+        'db': recorded,
+        'db_confirmed': confirmed,
+        'chain': on_chain,
+        'mismatches': [
+            {'candidate_number': n, 'db': recorded.get(n, 0), 'db_confirmed': confirmed.get(n, 0),
+             'chain': on_chain.get(n, 0)}
+            for n in numbers if recorded.get(n, 0) != on_chain.get(n, 0)
+        ],
+    })
+
+# -----------------------
+# Voter onboarding status (admin)
+# -----------------------
+@app.route('/admin/onboarding')
+@login_required
+def admin_onboarding():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    query = OnboardingJob.query.order_by(OnboardingJob.updated_at.desc())
+    step = request.args.get('step')
+    if step:
+        query = query.filter_by(step=step)
+    user_id = request.args.get('user_id', type=int)
+    if user_id:
+        query = query.filter_by(user_id=user_id)
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    jobs = query.limit(limit).all()
+    return jsonify({'counts': onboarding.stats(), 'jobs': [job_to_dict(j) for j in jobs]})
+
+# -----------------------
+# Prometheus metrics
+# -----------------------
+@app.route('/metrics')
+def metrics():
+    token = app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != 'Bearer ' + token:
+        return Response('unauthorized\n', status=401, mimetype='text/plain')
+    body = (bc.rpc_metrics.render_prometheus() + vote_queue.render_prometheus() + hasher.render_prometheus()
+            + profiler.render_prometheus() + startup.render_prometheus() + account_pool.render_prometheus()
+            + db_router.render_prometheus())
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+# -----------------------
+# Slowest sampled requests (admin, PROFILING_SAMPLING)
+# -----------------------
+@app.route('/admin/profiles')
+@login_required
+def admin_profiles():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(profiler.profiles(request.args.get('endpoint')))
+
+@app.route('/admin/profiles/<int:profile_id>.folded')
+@login_required
+def admin_profile_folded(profile_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    folded = profiler.folded(profile_id)
+    if folded is None:
+        return jsonify({'error': 'Unknown profile'}), 404
+    return Response(folded, mimetype='text/plain',
+                    headers={'Content-Disposition': 'attachment; filename=profile-%d.folded' % profile_id})
+
+# -----------------------
+# Bulk voter import (admin upload)
+# -----------------------
+@app.route('/admin/import-voters', methods=['POST'])
+@login_required
+def import_voters():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'error': 'No file uploaded'}), 400
+    fmt = request.form.get('format') or ('jsonl' if upload.filename.lower().endswith('.jsonl') else 'csv')
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({'error': 'Format must be csv or jsonl'}), 400
+
+    # spool to disk so the import thread can stream it after this request ends
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.' + fmt)
+    upload.save(tmp)
+    tmp.close()
+    job_id = importer.start_job(tmp.name, fmt)
+    return jsonify({'job_id': job_id, 'status_url': url_for('import_voters_status', job_id=job_id)}), 202
+
+@app.route('/admin/import-voters/<job_id>')
+@login_required
+def import_voters_status(job_id):
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    job = importer.job_status(job_id)
+    if not job:
+        return jsonify({'error': 'Unknown import job'}), 404
+    return jsonify(job)
+
+@app.cli.command('import-voters')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='Input format (default: from file extension).')
+@click.option('--chunk-size', type=int, default=None, help='Rows per bulk insert.')
+@click.option('--processes', type=int, default=None, help='Hashing processes (default: one per CPU).')
+@click.option('--wait/--no-wait', default=False, help='Keep running until onboarding has drained.')
+def import_voters_command(path, fmt, chunk_size, processes, wait):
+    """Bulk-import voters from a CSV or JSONL file (username,email,password,voter_id)."""
+    fmt = fmt or ('jsonl' if path.lower().endswith('.jsonl') else 'csv')
+    if chunk_size:
+        importer.chunk_size = chunk_size
+    if processes:
+        importer.processes = processes
+
+    def progress(stats):
+        click.echo('read %(read)d  imported %(imported)d  skipped %(skipped)d  (%(per_second)s/s)' % stats)
+
+    with open(path, newline='', encoding='utf-8') as f:
+        stats = importer.run(iter_records(f, fmt), progress)
+    for error in stats['errors']:
+        click.echo('  skipped: ' + error, err=True)
+
+    if wait:
+        # CLI processes do not start the background workers on their own
+        onboarding.start()
+    while wait:
+        counts = onboarding.stats()
+        pending = sum(counts.get(step, 0) for step in ('fund', 'register', 'confirm'))
+        click.echo('onboarding: %s' % counts)
+        if not pending:
+            break
+        time.sleep(5)
+
+@app.cli.command('reconcile')
+@click.option('--election-id', type=int, default=None, help='Election whose votes are checked (default: active).')
+@click.option('--report', 'report_path', default='reconcile-report.jsonl', show_default=True,
+              help='JSONL file the mismatches are written to.')
+@click.option('--checkpoint', 'checkpoint_path', default='reconcile-checkpoint.json', show_default=True,
+              help='Progress file, rewritten after every page.')
+@click.option('--resume/--no-resume', default=False, help='Continue from the checkpoint (and append to the report).')
+@click.option('--workers', type=int, default=None, help='Concurrent JSON-RPC batches.')
+@click.option('--batch-size', type=int, default=None, help='Addresses per JSON-RPC batch.')
+@click.option('--page-size', type=int, default=None, help='Users per DB page.')
+def reconcile_command(election_id, report_path, checkpoint_path, resume, workers, batch_size, page_size):
+    """Check every voter's DB registration/vote against registeredVoter/hasVoted on chain."""
+    if election_id is None:
+        election = Election.query.filter_by(is_active=True).first()
+        if not election:
+            raise click.ClickException('No active election; pass --election-id')
+        election_id = election.id
+    if workers:
+        reconciler.workers = workers
+    if batch_size:
+        reconciler.batch_size = batch_size
+    if page_size:
+        reconciler.page_size = page_size
+
+    def progress(stats):
+        click.echo('users %(users)d  mismatches %(db)d/%(chain)d/%(unregistered)d  (%(per_second)s/s)'
+                   % dict(stats, db=stats['voted_in_db_not_on_chain'], chain=stats['voted_on_chain_not_in_db']))
+
+    stats = reconciler.run(election_id, report_path, checkpoint_path, resume, progress)
+    click.echo(json.dumps(stats, indent=2))
+    if not stats['first_election']:
+        click.echo('Note: hasVoted covers every election on the contract, so chain votes without a '
+                   'confirmed vote in election %d are counted as voted_on_chain_unattributed, '
+                   'not as mismatches.' % election_id)
 
 # -----------------------
 # Make admin (demo route; remove after testing)
@@ -369,9 +844,72 @@ def make_admin(user_id):
         return redirect(url_for('admin_panel'))
     u.role = 'admin'
     db.session.commit()
+    principals.invalidate(u.id)
     flash('User promoted to admin', 'success')
     return redirect(url_for('admin_panel'))
 
+startup.mark('routes')
+
+# -----------------------
+# Background threads
+# -----------------------
+request_workers_lock = threading.Lock()
+request_workers_started = False
+
+def start_request_workers():
+    """Threads that serve this web process: block watcher, SSE broadcaster, vote submitters."""
+    global request_workers_started
+    with request_workers_lock:
+        if request_workers_started:
+            return
+        request_workers_started = True
+    results_cache.start_watcher()
+    broadcaster.start()
+    if vote_queue.enabled:
+        vote_queue.start()
+
+def start_background_workers():
+    """Chain-writing workers: onboarding, indexer, receipt tracker, audit log, account pool refill."""
+    onboarding.start()
+    if app.config['INDEXER_ENABLED']:
+        indexer.start()
+    if app.config['RECEIPT_TRACKER_ENABLED']:
+        receipts.start()
+    if audit_log.enabled:
+        receipts.listeners.append(audit_log.notify)
+        audit_log.start()
+    if account_pool.enabled and account_pool.refill_enabled:
+        account_pool.start()
+
+@app.before_request
+def ensure_request_workers():
+    # covers `flask run`, which imports the app through the CLI
+    if not request_workers_started:
+        start_request_workers()
+
+@app.cli.command('workers')
+def workers_command():
+    """Run the background workers in the foreground; start exactly one of these next to the web workers."""
+    start_background_workers()
+    click.echo('Background workers running; Ctrl+C to stop.')
+    while True:
+        time.sleep(3600)
+
+# Imported by the flask CLI (reconcile, import-voters, db ...): start nothing;
+# commands that need a worker start it themselves. Hashing pool workers
+# (auth.process_pool) re-import the main script, and with it this module.
+if click.get_current_context(silent=True) is None and multiprocessing.current_process().name == 'MainProcess':
+    start_request_workers()
+    if app.config['BACKGROUND_WORKERS_ENABLED']:
+        start_background_workers()
+startup.mark('background')
+app.logger.info("Worker started in %.0f ms (%s)", startup.total * 1000,
+                ', '.join('%s %.0f ms' % (step, seconds * 1000) for step, seconds in startup.steps))
+
 if __name__ == '__main__':
+    # the development server is the only process, so it runs the background
+    # workers too (in the reloader's serving child, not the file watcher)
+    if is_running_from_reloader() and not app.config['BACKGROUND_WORKERS_ENABLED']:
+        start_background_workers()
     # debug True is fine for local Ganache development
     app.run(host='0.0.0.0', port=5000, debug=True)
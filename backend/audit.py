@@ -0,0 +1,298 @@
+import hashlib
+import threading
+import time
+from sqlalchemy.exc import IntegrityError
+from models import db, Vote, Candidate, AuditLeaf, AuditNode, AuditRoot
+
+EMPTY_ROOT = hashlib.sha256(b'').hexdigest()
+ANCHOR_PREFIX = b'VOTEROOT'
+
+
+# ------------------------------------------------------------------------------
+# MERKLE TREE (RFC 6962 hashing: 0x00 prefix for leaves, 0x01 for nodes)
+# ------------------------------------------------------------------------------
+def leaf_data(election_id, vote_id, user_id, candidate_number, tx_hash):
+    return ('v1|%d|%d|%d|%d|%s' % (election_id, vote_id, user_id, candidate_number, tx_hash or '')).encode()
+
+
+def parse_leaf_data(data):
+    _, election_id, vote_id, user_id, candidate_number, tx_hash = data.split('|')
+    return {'election_id': int(election_id), 'vote_id': int(vote_id), 'user_id': int(user_id),
+            'candidate_number': int(candidate_number), 'tx_hash': tx_hash or None}
+
+
+def hash_leaf(data):
+    return hashlib.sha256(b'\x00' + data).hexdigest()
+
+
+def hash_children(left, right):
+    return hashlib.sha256(b'\x01' + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def _split(n):
+    """Largest power of two strictly below n (n > 1)."""
+    k = 1
+    while k * 2 < n:
+        k *= 2
+    return k
+
+
+def _subtree(start, end, get):
+    """Hash of leaves [start, end); aligned power-of-two ranges are stored nodes."""
+    n = end - start
+    if n & (n - 1) == 0:
+        level = n.bit_length() - 1
+        return get(level, start >> level)
+    k = _split(n)
+    return hash_children(_subtree(start, start + k, get), _subtree(start + k, end, get))
+
+
+def _path(index, start, end, get):
+    """RFC 6962 audit path for leaf `index` within [start, end), leaf to root."""
+    n = end - start
+    if n == 1:
+        return []
+    k = _split(n)
+    if index - start < k:
+        return _path(index, start, start + k, get) + [_subtree(start + k, end, get)]
+    return _path(index, start + k, end, get) + [_subtree(start, start + k, get)]
+
+
+def verify_inclusion(leaf_hash, index, size, proof, root):
+    """Check an inclusion proof (RFC 9162 section 2.1.3.2); usable by any auditor."""
+    if index >= size:
+        return False
+    fn, sn, r = index, size - 1, leaf_hash
+    for p in proof:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            r = hash_children(p, r)
+            if not fn & 1:
+                while not fn & 1 and fn != 0:
+                    fn >>= 1
+                    sn >>= 1
+        else:
+            r = hash_children(r, p)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and r == root
+
+
+class AuditLog:
+    """
+    Incremental Merkle log of recorded votes, one tree per election.
+    - A builder thread appends a leaf per vote (in AUDIT_STATUSES) in vote id
+      order; only complete subtrees are stored, so an append writes O(1)
+      amortized nodes and a root or inclusion proof reads O(log n) nodes in
+      one query.
+    - Each pass that adds leaves publishes a root (audit_roots) unless one
+      of that size or larger is already published; with
+      AUDIT_ANCHOR_ENABLED the root is also written on-chain as the calldata
+      of a 0-value admin self-transfer, at most every AUDIT_ANCHOR_INTERVAL.
+    - Off by default; set AUDIT_ENABLED=true in one process only. A second
+      builder loses the unique (election_id, position) race and backs off.
+    """
+    def __init__(self, app=None, bc=None):
+        self.bc = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._last_anchor = {}
+        self._stats = {'passes': 0, 'leaves': 0, 'roots': 0, 'anchors': 0, 'conflicts': 0}
+        if app:
+            self.init_app(app, bc)
+
+    def init_app(self, app, bc):
+        self.app = app
+        self.bc = bc
+        self.enabled = app.config.get('AUDIT_ENABLED', False)
+        self.statuses = tuple(app.config.get('AUDIT_STATUSES') or ('confirmed',))
+        self.batch_size = app.config.get('AUDIT_BATCH_SIZE', 1000)
+        self.poll_interval = app.config.get('AUDIT_POLL_INTERVAL', 5)
+        self.anchor_enabled = app.config.get('AUDIT_ANCHOR_ENABLED', False)
+        self.anchor_interval = app.config.get('AUDIT_ANCHOR_INTERVAL', 300)
+
+    # --------------------------------------------------------------------------
+    # BUILDER
+    # --------------------------------------------------------------------------
+    def notify(self, *args):
+        self._wake.set()
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name='audit-log', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    while self.run_once() == self.batch_size:
+                        pass
+            except Exception:
+                self.app.logger.exception("Audit log pass failed")
+
+    def run_once(self):
+        """Append one batch of new votes and publish roots. Returns leaves added."""
+        rows = (db.session.query(Vote.id, Vote.election_id, Vote.user_id, Candidate.candidate_number, Vote.tx_hash)
+                .join(Candidate, Candidate.id == Vote.candidate_id)
+                .outerjoin(AuditLeaf, AuditLeaf.vote_id == Vote.id)
+                .filter(AuditLeaf.id.is_(None), Vote.tx_status.in_(self.statuses))
+                .order_by(Vote.id)
+                .limit(self.batch_size)
+                .all())
+        if not rows:
+            return 0
+
+        sizes = {}
+        created = {}
+        try:
+            for vote_id, election_id, user_id, candidate_number, tx_hash in rows:
+                if election_id not in sizes:
+                    sizes[election_id] = self.size(election_id)
+                data = leaf_data(election_id, vote_id, user_id, candidate_number, tx_hash)
+                self._append(election_id, sizes[election_id], vote_id, data, created)
+                sizes[election_id] += 1
+            db.session.commit()
+        except IntegrityError:
+            # another builder appended first; its leaves will be visible next pass
+            db.session.rollback()
+            with self._lock:
+                self._stats['conflicts'] += 1
+            return 0
+
+        for election_id, size in sizes.items():
+            self._publish(election_id, size)
+        with self._lock:
+            self._stats['passes'] += 1
+            self._stats['leaves'] += len(rows)
+        return len(rows)
+
+    def _append(self, election_id, position, vote_id, data, created):
+        leaf_hash = hash_leaf(data)
+        # the hashed data is kept: the vote row can change later (e.g. a re-sent tx_hash)
+        db.session.add(AuditLeaf(election_id=election_id, position=position, vote_id=vote_id,
+                                 leaf_data=data.decode(), leaf_hash=leaf_hash))
+        db.session.add(AuditNode(election_id=election_id, level=0, node_index=position, hash=leaf_hash))
+        created[(election_id, 0, position)] = leaf_hash
+        # a right child completes its parent; carry up while that keeps happening
+        level, index, current = 0, position, leaf_hash
+        while index & 1:
+            left = created.get((election_id, level, index - 1)) or self._node(election_id, level, index - 1)
+            current = hash_children(left, current)
+            level, index = level + 1, index >> 1
+            db.session.add(AuditNode(election_id=election_id, level=level, node_index=index, hash=current))
+            created[(election_id, level, index)] = current
+
+    def _node(self, election_id, level, index):
+        return db.session.get(AuditNode, (election_id, level, index)).hash
+
+    def size(self, election_id):
+        last = (db.session.query(db.func.max(AuditLeaf.position))
+                .filter(AuditLeaf.election_id == election_id).scalar())
+        return 0 if last is None else last + 1
+
+    # --------------------------------------------------------------------------
+    # ROOTS AND PROOFS
+    # --------------------------------------------------------------------------
+    def _nodes_for(self, election_id, compute):
+        """Run compute(get) twice: once to learn which nodes it reads, then for real."""
+        wanted = set()
+        compute(lambda level, index: wanted.add((level, index)) or EMPTY_ROOT)
+        if not wanted:
+            return compute(None)
+        rows = (AuditNode.query
+                .filter(AuditNode.election_id == election_id,
+                        db.or_(*[db.and_(AuditNode.level == level, AuditNode.node_index == index)
+                                 for level, index in wanted]))
+                .all())
+        nodes = {(row.level, row.node_index): row.hash for row in rows}
+        return compute(lambda level, index: nodes[(level, index)])
+
+    def root(self, election_id, size):
+        if size == 0:
+            return EMPTY_ROOT
+        return self._nodes_for(election_id, lambda get: _subtree(0, size, get))
+
+    def _publish(self, election_id, size):
+        latest = self.latest_root(election_id)
+        if latest and latest.tree_size >= size:
+            return
+        root = AuditRoot(election_id=election_id, tree_size=size, root=self.root(election_id, size))
+        db.session.add(root)
+        db.session.commit()
+        with self._lock:
+            self._stats['roots'] += 1
+        if self.anchor_enabled and time.time() - self._last_anchor.get(election_id, 0) >= self.anchor_interval:
+            self._anchor(root)
+
+    def _anchor(self, root):
+        admin_key = self.app.config.get('PRIVATE_KEY')
+        admin_address = self.bc.w3.eth.account.from_key(admin_key).address
+        data = (ANCHOR_PREFIX + root.election_id.to_bytes(32, 'big') + root.tree_size.to_bytes(32, 'big')
+                + bytes.fromhex(root.root))
+        try:
+            root.anchor_tx_hash = self.bc.send_value(admin_key, admin_address, 0,
+                                                     gas=21000 + 16 * len(data), data=data)
+        except Exception as e:
+            self.app.logger.warning("Anchoring audit root %s failed: %s", root.id, e)
+            return
+        db.session.commit()
+        self._last_anchor[root.election_id] = time.time()
+        with self._lock:
+            self._stats['anchors'] += 1
+
+    def latest_root(self, election_id):
+        return (AuditRoot.query.filter_by(election_id=election_id)
+                .order_by(AuditRoot.tree_size.desc(), AuditRoot.id.desc()).first())
+
+    def proof(self, vote):
+        """Inclusion proof for vote against the latest published root, or None."""
+        leaf = AuditLeaf.query.filter_by(vote_id=vote.id).first()
+        if leaf is None:
+            return None
+        published = self.latest_root(leaf.election_id)
+        if published is None or published.tree_size <= leaf.position:
+            return None
+        proof = self._nodes_for(leaf.election_id,
+                                lambda get: _path(leaf.position, 0, published.tree_size, get))
+        # leaves appended before leaf_data was stored are rebuilt from the vote
+        data = leaf.leaf_data or leaf_data(vote.election_id, vote.id, vote.user_id,
+                                           vote.candidate.candidate_number, vote.tx_hash).decode()
+        return {
+            'vote_id': vote.id,
+            'election_id': leaf.election_id,
+            'leaf': parse_leaf_data(data),
+            'leaf_data': data,
+            'leaf_hash': leaf.leaf_hash,
+            'leaf_index': leaf.position,
+            'tree_size': published.tree_size,
+            'root': published.root,
+            'anchor_tx_hash': published.anchor_tx_hash,
+            'proof': proof,
+            'hashing': 'sha256, leaf = H(0x00 || leaf_data), node = H(0x01 || left || right)',
+        }
+
+    # --------------------------------------------------------------------------
+    # STATUS
+    # --------------------------------------------------------------------------
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+        data['enabled'] = self.enabled
+        data['statuses'] = list(self.statuses)
+        return data
+
+
+def root_to_dict(root):
+    return {
+        'election_id': root.election_id,
+        'tree_size': root.tree_size,
+        'root': root.root,
+        'anchor_tx_hash': root.anchor_tx_hash,
+        'published_at': root.created_at.isoformat() if root.created_at else None,
+    }
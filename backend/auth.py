@@ -0,0 +1,140 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from passlib.context import CryptContext
+from rpc_metrics import Histogram
+from profiling import phase
+
+# hashes made by these schemes still verify (and are upgraded on login)
+LEGACY_SCHEMES = ('pbkdf2_sha256',)
+
+_contexts = {}
+
+
+def _context(settings):
+    """CryptContext for (scheme, rounds); built once per process."""
+    context = _contexts.get(settings)
+    if context is None:
+        scheme, rounds = settings
+        schemes = [scheme] + [s for s in LEGACY_SCHEMES if s != scheme]
+        # min == max == rounds: a hash at any other cost is flagged for update
+        kwargs = {'%s__%s' % (scheme, key): rounds for key in ('rounds', 'min_rounds', 'max_rounds')} if rounds else {}
+        context = _contexts[settings] = CryptContext(schemes=schemes, deprecated='auto', **kwargs)
+    return context
+
+
+def process_pool(max_workers=None):
+    """
+    ProcessPoolExecutor that never forks the calling process: by the time a
+    pool is needed the app runs many threads (DB pool, web3 session, logging)
+    whose held locks a forked child would inherit. Uses forkserver where
+    available, else spawn; workers import only this module and their task's.
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    context = multiprocessing.get_context(method)
+    if method == 'forkserver':
+        # the server imports these instead of __main__ (app.py) before forking workers
+        context.set_forkserver_preload(['auth', 'voter_import'])
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+
+
+def hash_password(settings, password):
+    return _context(settings).hash(password)
+
+
+def verify_password(settings, password, password_hash):
+    """(ok, new_hash); new_hash is set when the stored hash needs upgrading."""
+    return _context(settings).verify_and_update(password, password_hash)
+
+
+class PasswordHasher:
+    """
+    Password hashing for register/login/import.
+    - Scheme and cost come from PASSWORD_SCHEME / PASSWORD_ROUNDS; hashes made
+      with other settings still verify and verify() returns an upgraded hash.
+    - Work runs on a PASSWORD_HASH_PROCESSES process pool (0 = inline), so the
+      request thread waits without holding the GIL.
+    - Hash and verify latency (including pool queueing) go into histograms.
+    """
+    def __init__(self, app=None):
+        self._pool = None
+        self._lock = threading.Lock()
+        self._latency = {'hash': Histogram(), 'verify': Histogram()}
+        self._rehashed = 0
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.settings = (app.config.get('PASSWORD_SCHEME', 'pbkdf2_sha256'),
+                         app.config.get('PASSWORD_ROUNDS') or None)
+        self.processes = app.config.get('PASSWORD_HASH_PROCESSES', 2)
+        # fail fast on an unknown scheme or a missing backend
+        _context(self.settings).hash('')
+
+    def _run(self, kind, fn, *args):
+        start = time.perf_counter()
+        try:
+            with phase('crypto'):
+                if not self.processes:
+                    return fn(self.settings, *args)
+                return self._executor().submit(fn, self.settings, *args).result()
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._latency[kind].observe(elapsed)
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = process_pool(self.processes)
+            return self._pool
+
+    def hash(self, password):
+        return self._run('hash', hash_password, password)
+
+    def verify(self, password, password_hash):
+        """(ok, new_hash); store new_hash when it is not None."""
+        ok, new_hash = self._run('verify', verify_password, password, password_hash)
+        if new_hash:
+            with self._lock:
+                self._rehashed += 1
+        return ok, new_hash
+
+    def dummy_verify(self):
+        """Spend a verify's worth of time for unknown users (no timing oracle)."""
+        self._run('verify', hash_password, '')
+
+    def stats(self):
+        with self._lock:
+            latency = {
+                kind: {
+                    'count': h.count,
+                    'avg_ms': round(h.sum / h.count * 1000, 3) if h.count else None,
+                    'p50_le': h.quantile(0.5),
+                    'p95_le': h.quantile(0.95),
+                    'p99_le': h.quantile(0.99),
+                }
+                for kind, h in self._latency.items()
+            }
+            rehashed = self._rehashed
+        return {'scheme': self.settings[0], 'rounds': self.settings[1], 'processes': self.processes,
+                'rehashed': rehashed, 'latency': latency}
+
+    def render_prometheus(self, prefix='voting_password'):
+        lines = [
+            '# HELP %s_seconds Password hash/verify latency including pool wait.' % prefix,
+            '# TYPE %s_seconds histogram' % prefix,
+        ]
+        with self._lock:
+            for kind, h in sorted(self._latency.items()):
+                for bound, total in h.cumulative():
+                    lines.append('%s_seconds_bucket{op="%s",le="%s"} %d' % (prefix, kind, bound, total))
+                lines.append('%s_seconds_sum{op="%s"} %.6f' % (prefix, kind, h.sum))
+                lines.append('%s_seconds_count{op="%s"} %d' % (prefix, kind, h.count))
+            lines += [
+                '# HELP %s_rehashed_total Stored hashes upgraded on login.' % prefix,
+                '# TYPE %s_rehashed_total counter' % prefix,
+                '%s_rehashed_total %d' % (prefix, self._rehashed),
+            ]
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,465 @@
+"""
+Benchmark harness: boots the app on a throwaway SQLite database against a local
+chain and drives scripted scenarios through the Flask test client.
+
+    python benchmark.py                                  # eth-tester (py-evm), in-process
+    python benchmark.py --provider http://127.0.0.1:7545 # Ganache or any dev node
+    python benchmark.py --voters 500 --concurrency 8 --out results.json --compare old.json
+
+The in-process chain needs `pip install "eth-tester[py-evm]"`; the contract comes
+from Truffle's build/contracts/Voting.json (or py-solc-x when solc is installed).
+
+Scenarios: register, onboarding, login, vote, results_under_load, exports, and
+the opt-in tally (DB query timings over 1M synthetic votes, with and without the
+vote indexes):
+
+    python benchmark.py --scenarios tally --tally-votes 1000000
+
+Each reports throughput, p50/p95/p99 latency and RPC call counts; the whole run
+is saved as JSON (keyed by git commit) so runs can be compared across commits.
+results_polling runs alongside results_under_load, so their RPC counts overlap.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS = ('register', 'onboarding', 'login', 'vote', 'results_under_load', 'exports')
+# run only when asked for: tally bulk-loads --tally-votes synthetic rows
+EXTRA_SCENARIOS = ('tally',)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed, rpc_before, rpc_after):
+    latencies = sorted(latencies)
+    calls_before = rpc_before['calls']
+    calls = {method: n - calls_before.get(method, 0) for method, n in rpc_after['calls'].items()
+             if n - calls_before.get(method, 0)}
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_per_s': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+        'rpc_calls': sum(calls.values()),
+        'rpc_round_trips': rpc_after['round_trips'] - rpc_before['round_trips'],
+        'rpc_by_method': calls,
+    }
+
+
+def load_artifact(path):
+    """abi + bytecode from a Truffle/solc JSON artifact, or compile needed/voting.sol."""
+    if path and os.path.exists(path):
+        with open(path) as f:
+            artifact = json.load(f)
+        return artifact['abi'], artifact['bytecode']
+    try:
+        import solcx
+    except ImportError:
+        sys.exit('No artifact at %s and py-solc-x is not installed; run `truffle compile` '
+                 'or pass --artifact' % path)
+    source = os.path.join(HERE, '..', 'needed', 'voting.sol')
+    compiled = solcx.compile_files([source], output_values=['abi', 'bin'])
+    contract = next(v for k, v in compiled.items() if k.endswith(':Voting'))
+    return contract['abi'], contract['bin']
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.results = {}
+
+    # --------------------------------------------------------------------------
+    # SETUP
+    # --------------------------------------------------------------------------
+    def setup(self):
+        """Point the app at a temp SQLite DB and a fresh chain, then import it."""
+        from web3 import Web3, EthereumTesterProvider
+
+        workdir = tempfile.mkdtemp(prefix='voting-bench-')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+        os.environ['RESULTS_CACHE_PATH'] = os.path.join(workdir, 'results_cache.sqlite3')
+        # the benchmark drives onboarding itself so it can be timed as a scenario
+        os.environ['ONBOARDING_WORKERS'] = '0'
+        os.environ.setdefault('INDEXER_ENABLED', 'false')
+        os.environ.setdefault('RECEIPT_TRACKER_ENABLED', 'false')
+
+        if self.args.provider:
+            os.environ['WEB3_PROVIDER'] = self.args.provider
+            w3 = Web3(Web3.HTTPProvider(self.args.provider))
+            if not self.args.private_key:
+                sys.exit('--private-key is required with --provider')
+            os.environ['PRIVATE_KEY'] = self.args.private_key
+        else:
+            provider = EthereumTesterProvider()
+            # py-evm is not thread-safe: let requests run concurrently in the
+            # app but serialize them at the chain
+            chain_lock = threading.Lock()
+            make_request = provider.make_request
+
+            def locked_make_request(method, params):
+                with chain_lock:
+                    return make_request(method, params)
+            provider.make_request = locked_make_request
+            make_batch_request = getattr(provider, 'make_batch_request', None)
+            if make_batch_request:
+                def locked_make_batch_request(requests):
+                    with chain_lock:
+                        return make_batch_request(requests)
+                provider.make_batch_request = locked_make_batch_request
+            w3 = Web3(provider)
+            os.environ['PRIVATE_KEY'] = str(provider.ethereum_tester.backend.account_keys[0])
+
+        # deploy from the key the app signs with, so its onlyOwner calls succeed
+        abi, bytecode = load_artifact(self.args.artifact)
+        admin = w3.eth.account.from_key(os.environ['PRIVATE_KEY'])
+        tx = w3.eth.contract(abi=abi, bytecode=bytecode).constructor().build_transaction({
+            'from': admin.address,
+            'nonce': w3.eth.get_transaction_count(admin.address, 'pending'),
+            'chainId': w3.eth.chain_id,
+        })
+        tx_hash = w3.eth.send_raw_transaction(admin.sign_transaction(tx).raw_transaction)
+        address = w3.eth.wait_for_transaction_receipt(tx_hash).contractAddress
+
+        sys.path.insert(0, HERE)
+        import app as app_module
+        if not self.args.provider:
+            app_module.bc.set_web3(w3)
+        app_module.bc.set_contract(address, abi)
+        self.m = app_module
+        self.app = app_module.app
+        self.app.config['WTF_CSRF_ENABLED'] = False
+
+        from models import db, User, Candidate, Election
+        with self.app.app_context():
+            admin_user = User(username='bench-admin', email='admin@bench.local', voter_id='bench-admin',
+                              password_hash=self.m.hasher.hash('admin'), role='admin')
+            db.session.add(admin_user)
+            db.session.add(Election(is_active=True))
+            for n in range(1, self.args.candidates + 1):
+                db.session.add(Candidate(candidate_number=n, name='Candidate %d' % n, party='P%d' % n))
+                self.m.bc.add_candidate(os.environ['PRIVATE_KEY'], 'Candidate %d' % n)
+            db.session.commit()
+            self.m.roster.invalidate()
+            self.admin_id = admin_user.id
+            self.candidate_ids = [c.id for c in Candidate.query.order_by(Candidate.id)]
+        self.admin_client = self.client_for(self.admin_id)
+        self.voter_clients = []
+
+    def client_for(self, user_id):
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        return client
+
+    # --------------------------------------------------------------------------
+    # DRIVER
+    # --------------------------------------------------------------------------
+    def run_requests(self, name, calls, concurrency=None):
+        """Run callables (each returning a response) and record one scenario."""
+        latencies = []
+        errors = [0]
+        lock = threading.Lock()
+
+        def timed(call):
+            start = time.perf_counter()
+            try:
+                response = call()
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors[0] += 1
+
+        rpc_before = self.m.bc.rpc_metrics.snapshot()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency or self.args.concurrency) as pool:
+            list(pool.map(timed, calls))
+        elapsed = time.perf_counter() - start
+        self.results[name] = summarize(latencies, errors[0], elapsed, rpc_before, self.m.bc.rpc_metrics.snapshot())
+        return self.results[name]
+
+    # --------------------------------------------------------------------------
+    # SCENARIOS
+    # --------------------------------------------------------------------------
+    def register(self):
+        """Registration burst: hash + insert + onboarding enqueue per request."""
+        def call(i):
+            return lambda: self.app.test_client().post('/register', data={
+                'username': 'voter%d' % i, 'email': 'voter%d@bench.local' % i,
+                'password': 'pw%d' % i, 'voter_id': 'V%06d' % i})
+        self.run_requests('register', [call(i) for i in range(self.args.voters)])
+
+    def onboarding(self):
+        """Drain the onboarding queue: funding + batched registerVoters + confirm."""
+        from models import User
+        rpc_before = self.m.bc.rpc_metrics.snapshot()
+        latencies = []
+        start = time.perf_counter()
+        with self.app.app_context():
+            while True:
+                t = time.perf_counter()
+                if not self.m.onboarding.run_once():
+                    break
+                latencies.append(time.perf_counter() - t)
+            pending = {k: v for k, v in self.m.onboarding.stats().items() if k != 'done'}
+            self.voter_ids = [uid for (uid,) in User.query.filter(User.role == 'voter')
+                              .with_entities(User.id).order_by(User.id)]
+        self.results['onboarding'] = summarize(latencies, sum(pending.values()), time.perf_counter() - start,
+                                               rpc_before, self.m.bc.rpc_metrics.snapshot())
+        self.results['onboarding']['not_done'] = pending
+
+    def login(self):
+        """Login burst: password verify per request; keeps the clients for voting."""
+        clients = {}
+
+        def call(i, uid):
+            def go():
+                client = self.app.test_client()
+                response = client.post('/login', data={'email': 'voter%d@bench.local' % i, 'password': 'pw%d' % i})
+                clients[uid] = client
+                return response
+            return go
+        self.run_requests('login', [call(i, uid) for i, uid in enumerate(self.voter_ids)])
+        self.voter_clients = [clients.get(uid) or self.client_for(uid) for uid in self.voter_ids]
+
+    def _vote_calls(self, clients):
+        return [lambda c=c, i=i: c.post('/vote', data={'candidate': self.candidate_ids[i % len(self.candidate_ids)]})
+                for i, c in enumerate(clients)]
+
+    def vote(self):
+        """Vote burst from the first half of the voters."""
+        half = self.voter_clients[:len(self.voter_clients) // 2]
+        self.run_requests('vote', self._vote_calls(half))
+
+    def results_under_load(self):
+        """Remaining voters vote while pollers hit /api/results."""
+        rest = self.voter_clients[len(self.voter_clients) // 2:]
+        done = threading.Event()
+        pollers = max(1, self.args.pollers)
+        poll_thread = threading.Thread(
+            target=lambda: self.run_requests('results_polling', self._poll_calls(done), concurrency=pollers))
+        poll_thread.start()
+        try:
+            self.run_requests('results_under_load', self._vote_calls(rest))
+        finally:
+            done.set()
+            poll_thread.join()
+
+    def _poll_calls(self, done):
+        client = self.app.test_client()
+        while not done.is_set():
+            yield lambda: client.get('/api/results')
+            time.sleep(self.args.poll_interval)
+
+    def exports(self):
+        """CSV, PDF and streamed per-vote audit exports."""
+        calls = []
+        for _ in range(self.args.export_rounds):
+            for path in ('/admin/export-csv', '/admin/export-pdf', '/admin/export-votes'):
+                calls.append(lambda p=path: self._drain(self.admin_client.get(p)))
+        self.run_requests('exports', calls, concurrency=1)
+
+    def tally(self):
+        """Hot DB queries over --tally-votes synthetic votes, indexed vs unindexed."""
+        from models import db, Vote, Election
+        with self.app.app_context():
+            total, elections = self.args.tally_votes, self.args.tally_elections
+            start = time.perf_counter()
+            db.session.execute(db.insert(Election), [{'is_active': False} for _ in range(elections - 1)])
+            election_ids = [e.id for e in Election.query.order_by(Election.id)]
+            batch = 50000
+            for offset in range(0, total, batch):
+                db.session.execute(db.insert(Vote), [{
+                    'user_id': 1000000 + i // elections,
+                    'election_id': election_ids[i % elections],
+                    'candidate_id': self.candidate_ids[(i * 7919) % len(self.candidate_ids)],
+                    'tx_hash': '%064x' % i,
+                    'tx_status': 'confirmed' if i % 10 else 'pending',
+                } for i in range(offset, min(offset + batch, total))])
+            db.session.commit()
+            load_seconds = time.perf_counter() - start
+            active_id = Election.query.filter_by(is_active=True).first().id
+            probe_hash = '%064x' % (total // 2)
+
+            queries = {
+                'active_election': lambda: Election.query.filter_by(is_active=True).first(),
+                'db_tally': lambda: self.m.db_vote_counts(active_id),
+                'tx_hash_lookup': lambda: Vote.query.filter_by(tx_hash=probe_hash).first(),
+                'next_candidate_number': lambda: self.m.db.session.query(
+                    db.func.max(self.m.Candidate.candidate_number)).scalar(),
+            }
+            indexed = self._time_queries(queries)
+            dropped = self._drop_vote_indexes()
+            unindexed = self._time_queries(queries) if dropped else None
+            self.results['tally'] = {
+                'votes': total,
+                'elections': elections,
+                'load_s': round(load_seconds, 3),
+                'indexed': indexed,
+                'unindexed': unindexed,
+                'dropped_indexes': dropped,
+            }
+
+    def _time_queries(self, queries):
+        from models import db
+        out = {}
+        for name, query in queries.items():
+            latencies = []
+            for _ in range(self.args.tally_repeats):
+                start = time.perf_counter()
+                query()
+                latencies.append(time.perf_counter() - start)
+                db.session.rollback()
+            latencies.sort()
+            out[name] = {'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+                         'p95_ms': round(percentile(latencies, 0.95) * 1000, 3)}
+        return out
+
+    def _drop_vote_indexes(self):
+        """Drop the indexes added for tallies/lookups (SQLite only) to time the scan path."""
+        from models import db
+        if db.engine.dialect.name != 'sqlite':
+            return []
+        names = ['idx_votes_election_candidate', 'idx_votes_candidate', 'ix_votes_tx_hash', 'ix_elections_is_active']
+        for name in names:
+            db.session.execute(db.text('DROP INDEX IF EXISTS %s' % name))
+        db.session.commit()
+        return names
+
+    @staticmethod
+    def _drain(response):
+        # streamed responses only do their work when consumed
+        for _ in response.response:
+            pass
+        return response
+
+    # --------------------------------------------------------------------------
+    # REPORT
+    # --------------------------------------------------------------------------
+    def report(self):
+        config = {k: self.app.config.get(k) for k in (
+            'VOTE_QUEUE_ENABLED', 'RESULTS_SOURCE', 'PASSWORD_SCHEME', 'PASSWORD_ROUNDS',
+            'PASSWORD_HASH_PROCESSES', 'ONBOARDING_REGISTER_BATCH', 'RESULTS_CACHE_TTL')}
+        return {
+            'meta': {
+                'commit': git_commit(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'provider': self.args.provider or 'eth-tester',
+                'voters': self.args.voters,
+                'candidates': self.args.candidates,
+                'concurrency': self.args.concurrency,
+                'config': config,
+            },
+            'scenarios': self.results,
+        }
+
+
+def compare(current, previous):
+    """Print throughput / p95 change per scenario against an earlier run."""
+    print('\nvs %s (%s)' % (previous['meta'].get('commit'), previous['meta'].get('timestamp')))
+    for name, now in current['scenarios'].items():
+        before = previous.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        def pct(key):
+            if not before.get(key) or now.get(key) is None:
+                return 'n/a'
+            return '%+.1f%%' % ((now[key] - before[key]) / before[key] * 100)
+        print('  %-20s throughput %-8s p95 %-8s rpc_calls %s -> %s' % (
+            name, pct('throughput_per_s'), pct('p95_ms'), before.get('rpc_calls'), now.get('rpc_calls')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--provider', help='JSON-RPC URL of a dev node (default: in-process eth-tester)')
+    parser.add_argument('--private-key', help='funded admin key on --provider')
+    parser.add_argument('--artifact', default=os.path.join(HERE, 'build', 'contracts', 'Voting.json'),
+                        help='compiled Voting artifact (abi + bytecode)')
+    parser.add_argument('--voters', type=int, default=100)
+    parser.add_argument('--candidates', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--pollers', type=int, default=4)
+    parser.add_argument('--poll-interval', type=float, default=0.01)
+    parser.add_argument('--export-rounds', type=int, default=3)
+    parser.add_argument('--tally-votes', type=int, default=1000000)
+    parser.add_argument('--tally-elections', type=int, default=4)
+    parser.add_argument('--tally-repeats', type=int, default=20)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help='comma-separated subset of: %s' % ', '.join(SCENARIOS + EXTRA_SCENARIOS))
+    parser.add_argument('--out', help='write results JSON here (default: bench-<commit>.json)')
+    parser.add_argument('--compare', help='earlier results JSON to diff against')
+    args = parser.parse_args(argv)
+
+    wanted = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(wanted) - set(SCENARIOS + EXTRA_SCENARIOS)
+    if unknown:
+        parser.error('unknown scenario(s): %s' % ', '.join(sorted(unknown)))
+
+    bench = Bench(args)
+    bench.setup()
+    for name in SCENARIOS + EXTRA_SCENARIOS:
+        # later scenarios need the voters created by earlier ones
+        if name in wanted or (name in ('register', 'onboarding', 'login') and
+                              set(wanted) & {'vote', 'results_under_load'}):
+            print('running %s...' % name, file=sys.stderr)
+            getattr(bench, name)()
+
+    report = bench.report()
+    out = args.out or 'bench-%s.json' % (report['meta']['commit'] or 'local')
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+
+    print('%-20s %8s %8s %10s %9s %9s %9s %9s' % ('scenario', 'requests', 'errors', 'req/s',
+                                                  'p50 ms', 'p95 ms', 'p99 ms', 'rpc'))
+    for name, r in report['scenarios'].items():
+        if name == 'tally':
+            continue
+        print('%-20s %8s %8s %10s %9s %9s %9s %9s' % (name, r['requests'], r['errors'], r['throughput_per_s'],
+                                                      r['p50_ms'], r['p95_ms'], r['p99_ms'], r['rpc_calls']))
+    tally = report['scenarios'].get('tally')
+    if tally:
+        print('\ntally over %d votes (%d elections, loaded in %ss), p50 ms:' % (
+            tally['votes'], tally['elections'], tally['load_s']))
+        for query, timing in tally['indexed'].items():
+            slow = (tally['unindexed'] or {}).get(query, {}).get('p50_ms', 'n/a')
+            print('  %-24s indexed %10s   unindexed %10s' % (query, timing['p50_ms'], slow))
+    print('saved %s' % out)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
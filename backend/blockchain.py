@@ -1,7 +1,211 @@
+import asyncio
+import hashlib
 import json
 import os
-from web3 import Web3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from web3 import Web3, AsyncWeb3
 from eth_utils import to_checksum_address
+from web3.exceptions import TransactionNotFound
+from rpc_metrics import RPCMetrics, metrics_middleware
+from provider import build_provider, build_async_provider
+from profiling import phase
+
+# Gas model for registerVoters(address[]): tx overhead plus per-address cost
+# (fresh SSTORE ~22.1k, VoterRegistered log ~1.9k, calldata and loop overhead).
+REGISTER_BATCH_BASE_GAS = 35000
+REGISTER_BATCH_PER_VOTER_GAS = 27000
+
+# Node error fragments meaning our local nonce is stale (geth, Ganache, py-evm wording)
+NONCE_ERRORS = (
+    'nonce too low',
+    'replacement transaction underpriced',
+    'correct nonce',
+    'invalid transaction nonce',
+)
+# Node error fragments meaning it already holds this exact signed tx: the send
+# went through (e.g. a retried request), so the nonce is not stale
+ALREADY_KNOWN_ERRORS = (
+    'already known',
+    'known transaction',
+)
+
+
+def _0x(tx_hash):
+    return tx_hash if tx_hash.startswith('0x') else '0x' + tx_hash
+
+
+def _extract_abi(js):
+    # Truffle artifact: has "abi" key. Some build tools produce the ABI directly.
+    if isinstance(js, dict) and 'abi' in js:
+        return js['abi']
+    if isinstance(js, list):
+        return js
+    # try to find nested abi
+    if 'output' in js and 'abi' in js['output']:
+        return js['output']['abi']
+    if 'contracts' in js:
+        # try to pull the first contract ABI
+        for k, v in js['contracts'].items():
+            if isinstance(v, dict) and 'abi' in v:
+                return v['abi']
+    return None
+
+
+def load_abi(artifact_path, cache_dir=None):
+    """
+    Contract ABI from a build artifact (Truffle, solc combined JSON or a bare ABI).
+    - With cache_dir, the extracted ABI is kept as a compact abi-<sha256>.json
+      keyed by the artifact's content hash, so worker boots hash the artifact
+      instead of parsing it (bytecode, AST, source maps) again.
+    - Returns None when the artifact is missing or unreadable.
+    """
+    if not artifact_path or not os.path.exists(artifact_path):
+        return None
+    try:
+        with open(artifact_path, 'rb') as f:
+            raw = f.read()
+        cache_path = None
+        if cache_dir:
+            cache_path = os.path.join(cache_dir, 'abi-%s.json' % hashlib.sha256(raw).hexdigest())
+            try:
+                with open(cache_path, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+
+        abi = _extract_abi(json.loads(raw))
+        if cache_path and abi is not None:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp_path = '%s.%d.tmp' % (cache_path, os.getpid())
+                with open(tmp_path, 'w') as f:
+                    json.dump(abi, f, separators=(',', ':'))
+                # atomic, so concurrently booting workers never read a partial file
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                pass
+        return abi
+    except Exception:
+        return None
+
+
+class NonceManager:
+    """
+    Thread-safe, per-sender nonce allocator backed by a local counter.
+    - The first allocation for an address reads the pending transaction count once.
+    - Later allocations are served locally, so concurrent sends never share a nonce.
+    - resync() re-reads the chain when the node rejects a nonce as stale.
+    - Tracks at most max_addresses senders (LRU); an evicted address re-reads
+      the chain on its next allocation. Addresses in use are never evicted.
+    """
+    def __init__(self, w3=None, max_addresses=10000):
+        self.w3 = w3
+        self.max_addresses = max_addresses
+        self._lock = threading.Lock()
+        # address -> [lock, threads using it], least recently used first
+        self._address_locks = OrderedDict()
+        self._next = {}
+        self._stats = {'allocations': 0, 'resyncs': 0, 'gaps': 0, 'releases': 0, 'evictions': 0}
+
+    @contextmanager
+    def _address_lock(self, address):
+        with self._lock:
+            entry = self._address_locks.get(address)
+            if entry is None:
+                entry = self._address_locks[address] = [threading.Lock(), 0]
+            else:
+                self._address_locks.move_to_end(address)
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                self._evict()
+
+    def _evict(self):
+        # caller holds self._lock
+        excess = len(self._address_locks) - self.max_addresses
+        if excess <= 0:
+            return
+        idle = []
+        for address, (_, users) in self._address_locks.items():
+            if len(idle) >= excess:
+                break
+            if not users:
+                idle.append(address)
+        for address in idle:
+            del self._address_locks[address]
+            self._next.pop(address, None)
+        self._stats['evictions'] += len(idle)
+
+    def _chain_nonce(self, address):
+        return self.w3.eth.get_transaction_count(address, 'pending')
+
+    def allocate(self, address):
+        address = to_checksum_address(address)
+        with self._address_lock(address):
+            if address not in self._next:
+                self._next[address] = self._chain_nonce(address)
+            nonce = self._next[address]
+            self._next[address] = nonce + 1
+        with self._lock:
+            self._stats['allocations'] += 1
+        return nonce
+
+    def release(self, address, nonce):
+        """Give back a nonce whose transaction was never broadcast."""
+        address = to_checksum_address(address)
+        with self._address_lock(address):
+            if self._next.get(address) == nonce + 1:
+                self._next[address] = nonce
+                gap = False
+            else:
+                # later nonces are already out; force a resync on next use
+                self._next.pop(address, None)
+                gap = True
+        with self._lock:
+            self._stats['releases'] += 1
+            if gap:
+                self._stats['gaps'] += 1
+
+    def resync(self, address):
+        address = to_checksum_address(address)
+        with self._address_lock(address):
+            chain_nonce = self._chain_nonce(address)
+            local = self._next.get(address)
+            self._next[address] = chain_nonce
+        with self._lock:
+            self._stats['resyncs'] += 1
+            if local is not None and local > chain_nonce:
+                # nonces we handed out never reached the pool
+                self._stats['gaps'] += local - chain_nonce
+        return chain_nonce
+
+    def reset(self):
+        with self._lock:
+            self._next.clear()
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data['tracked_addresses'] = len(self._next)
+        return data
+
+    @staticmethod
+    def is_nonce_error(exc):
+        msg = str(exc).lower()
+        return any(fragment in msg for fragment in NONCE_ERRORS)
+
+    @staticmethod
+    def is_already_known(exc):
+        msg = str(exc).lower()
+        return any(fragment in msg for fragment in ALREADY_KNOWN_ERRORS)
+
 
 class BlockchainClient:
     def __init__(self, app=None):
@@ -10,43 +214,29 @@ class BlockchainClient:
         self.contract_abi = None
         self.contract_address = None
         self.private_key = None
+        self.nonces = NonceManager()
+        self.rpc_metrics = RPCMetrics()
+        self.gas_price_ttl = 15
+        self.gas_estimate_ttl = 600
+        self.gas_estimate_margin = 1.2
+        self._params_lock = threading.Lock()
+        self._chain_id = None
+        self._gas_price = None
+        self._gas_price_at = 0.0
+        self._gas_estimates = {}
         if app:
             self.init_app(app)
 
     def init_app(self, app):
-        self.w3 = Web3(Web3.HTTPProvider(app.config.get('WEB3_PROVIDER')))
-        # Some local providers (Ganache) may not support ENS; avoid unexpected behavior
-        try:
-            self.w3.ens = None
-        except Exception:
-            pass
+        self.gas_price_ttl = app.config.get('GAS_PRICE_TTL', 15)
+        self.gas_estimate_ttl = app.config.get('GAS_ESTIMATE_TTL', 600)
+        self.gas_estimate_margin = app.config.get('GAS_ESTIMATE_MARGIN', 1.2)
+        self.nonces.max_addresses = app.config.get('NONCE_TRACKED_ADDRESSES', 10000)
+        self.set_web3(Web3(build_provider(app.config, self.rpc_metrics)))
 
         self.private_key = app.config.get('PRIVATE_KEY')
 
-        # Load ABI JSON robustly
-        self.contract_abi = None
-        abi_path = app.config.get('CONTRACT_ABI_PATH')
-        if abi_path and os.path.exists(abi_path):
-            try:
-                with open(abi_path, 'r') as f:
-                    js = json.load(f)
-                    # Truffle artifact: has "abi" key. Some build tools produce the ABI directly.
-                    if isinstance(js, dict) and 'abi' in js:
-                        self.contract_abi = js['abi']
-                    elif isinstance(js, list):
-                        self.contract_abi = js
-                    else:
-                        # try to find nested abi
-                        if 'output' in js and 'abi' in js['output']:
-                            self.contract_abi = js['output']['abi']
-                        elif 'contracts' in js:
-                            # try to pull the first contract ABI
-                            for k, v in js['contracts'].items():
-                                if isinstance(v, dict) and 'abi' in v:
-                                    self.contract_abi = v['abi']
-                                    break
-            except Exception:
-                self.contract_abi = None
+        self.contract_abi = load_abi(app.config.get('CONTRACT_ABI_PATH'), app.config.get('ABI_CACHE_DIR'))
 
         self.contract_address = app.config.get('CONTRACT_ADDRESS') or None
 
@@ -60,6 +250,90 @@ class BlockchainClient:
                 # If something goes wrong, leave contract as None
                 self.contract = None
 
+    def set_web3(self, w3):
+        """Attach a Web3 instance: RPC counters, nonce manager and chain parameters."""
+        self.w3 = w3
+        # Some local providers (Ganache) may not support ENS; avoid unexpected behavior
+        try:
+            self.w3.ens = None
+        except Exception:
+            pass
+        # innermost layer, so latency covers the provider round trip only
+        self.w3.middleware_onion.inject(metrics_middleware(self.rpc_metrics), name='rpc_metrics', layer=0)
+        self.nonces.w3 = self.w3
+        self.nonces.reset()
+        with self._params_lock:
+            self._chain_id = None
+            self._gas_price = None
+            self._gas_estimates.clear()
+        # chain_id never changes for a provider; fetch it once up front if the node is up
+        self.get_chain_id()
+        if self.contract_address and self.contract_abi and self.contract is not None:
+            self.contract = self.w3.eth.contract(address=self.contract_address, abi=self.contract_abi)
+
+    # --------------------------------------------------------------------------
+    # CACHED CHAIN PARAMETERS
+    # --------------------------------------------------------------------------
+    def get_chain_id(self):
+        if self._chain_id is None:
+            try:
+                self._chain_id = self.w3.eth.chain_id
+            except Exception:
+                # fallback: Ganache often supports chain_id 1337 or 5777; leave None if unknown
+                return None
+        return self._chain_id
+
+    def get_gas_price(self):
+        """Gas price, refreshed at most every GAS_PRICE_TTL seconds."""
+        gas_price = self._fresh_gas_price()
+        if gas_price is None:
+            gas_price = self._store_gas_price(self.w3.eth.gas_price)
+        return gas_price
+
+    def _fresh_gas_price(self):
+        with self._params_lock:
+            if self._gas_price is not None and time.time() - self._gas_price_at < self.gas_price_ttl:
+                return self._gas_price
+        return None
+
+    def _store_gas_price(self, gas_price):
+        with self._params_lock:
+            self._gas_price = gas_price
+            self._gas_price_at = time.time()
+        return gas_price
+
+    def estimate_gas(self, func, from_address):
+        """
+        Gas limit for func, memoized per contract function signature for
+        GAS_ESTIMATE_TTL seconds and padded by GAS_ESTIMATE_MARGIN since
+        arguments differ between calls.
+        """
+        key = getattr(func, 'abi_element_identifier', None) or func.fn_name
+        now = time.time()
+        with self._params_lock:
+            cached = self._gas_estimates.get(key)
+            if cached and now - cached[1] < self.gas_estimate_ttl:
+                return cached[0]
+        gas = int(func.estimate_gas({"from": from_address}) * self.gas_estimate_margin)
+        with self._params_lock:
+            self._gas_estimates[key] = (gas, now)
+        return gas
+
+    def provider_status(self):
+        provider = self.w3.provider
+        if hasattr(provider, 'status'):
+            return provider.status()
+        return [{'url': getattr(provider, 'endpoint_uri', str(provider)), 'healthy': None}]
+
+    def chain_params(self):
+        with self._params_lock:
+            return {
+                'chain_id': self._chain_id,
+                'gas_price': self._gas_price,
+                'gas_price_age': round(time.time() - self._gas_price_at, 3) if self._gas_price is not None else None,
+                'gas_estimates': {key: gas for key, (gas, _) in self._gas_estimates.items()},
+            }
+
     def set_contract(self, address, abi):
         if not self.w3:
             raise RuntimeError("Web3 provider not initialized")
@@ -84,48 +358,89 @@ class BlockchainClient:
         else:
             from_address = account.address
 
-        nonce = self.w3.eth.get_transaction_count(from_address)
+        chain_id = self.get_chain_id()
 
-        chain_id = None
-        try:
-            chain_id = self.w3.eth.chain_id
-        except Exception:
-            # fallback: Ganache often supports chain_id 1337 or 5777; leave None if unknown
-            chain_id = None
-
-        # Build tx using build_transaction (Web3.py v6+)
-        tx_params = {
-            "from": from_address,
-            "nonce": nonce,
-        }
-        # include chainId if available
-        if chain_id:
-            tx_params["chainId"] = chain_id
-
-        # gas: either provided or estimate
+        # gas: either provided or estimate (memoized per function)
         try:
             if gas:
-                tx_params["gas"] = gas
+                gas_limit = gas
             else:
-                tx_params["gas"] = func.estimate_gas({"from": from_address})
+                gas_limit = self.estimate_gas(func, from_address)
         except Exception:
             # fallback
-            tx_params["gas"] = 300000
+            gas_limit = 300000
 
+        gas_price = None
         try:
-            tx_params["gasPrice"] = self.w3.eth.gas_price
+            gas_price = self.get_gas_price()
         except Exception:
             # Ganache may return 0; leave out if unavailable
             pass
 
-        # build the tx dict
-        built = func.build_transaction(tx_params)
+        def build(nonce):
+            # Build tx using build_transaction (Web3.py v6+)
+            tx_params = {
+                "from": from_address,
+                "nonce": nonce,
+                "gas": gas_limit,
+            }
+            # include chainId if available
+            if chain_id:
+                tx_params["chainId"] = chain_id
+            if gas_price is not None:
+                tx_params["gasPrice"] = gas_price
+            return func.build_transaction(tx_params)
 
-        # sign transaction
-        signed = self.w3.eth.account.sign_transaction(built, private_key)
-        raw = signed.raw_transaction
-        tx_hash = self.w3.eth.send_raw_transaction(raw)
-        return tx_hash.hex()
+        return self._sign_and_send(build, private_key, from_address)
+
+    def _sign_and_send(self, build, private_key, from_address):
+        """
+        Allocate a nonce from the local NonceManager, build the tx with build(nonce),
+        sign and broadcast it.
+        - If the node rejects the nonce as stale, resync from chain and retry once.
+        - If the node already holds this exact tx, it was sent: return its hash.
+        - If sending fails for any other reason the nonce is released.
+        """
+        for attempt in range(2):
+            nonce = self.nonces.allocate(from_address)
+            signed = None
+            try:
+                tx = build(nonce)
+                with phase('crypto'):
+                    signed = self.w3.eth.account.sign_transaction(tx, private_key)
+                tx_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
+            except Exception as e:
+                if signed is not None and NonceManager.is_already_known(e):
+                    return Web3.keccak(signed.raw_transaction).hex()
+                if attempt == 0 and NonceManager.is_nonce_error(e):
+                    self.nonces.resync(from_address)
+                    continue
+                self.nonces.release(from_address, nonce)
+                raise
+            return tx_hash.hex()
+
+    # --------------------------------------------------------------------------
+    # FUND ACCOUNT (plain value transfer)
+    # --------------------------------------------------------------------------
+    def send_value(self, private_key, to_address, value_wei, gas=21000, data=None):
+        from_address = self.w3.eth.account.from_key(private_key).address
+        to_address = to_checksum_address(to_address)
+        chain_id = self.get_chain_id()
+        gas_price = self.get_gas_price()
+
+        def build(nonce):
+            return {
+                'from': from_address,
+                'to': to_address,
+                'value': value_wei,
+                'gas': gas,
+                'gasPrice': gas_price,
+                'nonce': nonce,
+                'chainId': chain_id,
+                **({'data': data} if data else {}),
+            }
+
+        return self._sign_and_send(build, private_key, from_address)
 
     # --------------------------------------------------------------------------
     # REGISTER VOTER (admin only)
@@ -140,6 +455,57 @@ class BlockchainClient:
         func = self.contract.functions.registerVoter(voter_address)
         return self._send_tx(func, admin_private_key, admin_address, gas=300000)
 
+    # --------------------------------------------------------------------------
+    # REGISTER VOTERS IN BATCHES (admin only)
+    # --------------------------------------------------------------------------
+    def register_voters(self, admin_private_key, voter_addresses, chunk_size=None, block_fraction=0.5):
+        """
+        Register many voters with registerVoters(address[]), one tx per chunk.
+        - Chunks are capped so each tx uses at most block_fraction of the block gas limit.
+        - Returns [{'addresses': [...], 'tx_hash': str or None, 'gas': int, 'error': str or None}].
+        - A contract without registerVoters falls back to one registerVoter tx per address.
+        """
+        if not self.contract:
+            raise RuntimeError("Contract not set")
+
+        addresses = [to_checksum_address(a) for a in voter_addresses]
+        admin_address = self.w3.eth.account.from_key(admin_private_key).address
+
+        if not self._has_function('registerVoters'):
+            results = []
+            for address in addresses:
+                try:
+                    tx_hash = self.register_voter(admin_private_key, address)
+                    results.append({'addresses': [address], 'tx_hash': tx_hash, 'gas': 300000, 'error': None})
+                except Exception as e:
+                    results.append({'addresses': [address], 'tx_hash': None, 'gas': 300000, 'error': str(e)})
+            return results
+
+        max_chunk = self.max_register_chunk(block_fraction)
+        chunk_size = min(chunk_size or max_chunk, max_chunk)
+
+        results = []
+        for start in range(0, len(addresses), chunk_size):
+            chunk = addresses[start:start + chunk_size]
+            gas = REGISTER_BATCH_BASE_GAS + REGISTER_BATCH_PER_VOTER_GAS * len(chunk)
+            try:
+                func = self.contract.functions.registerVoters(chunk)
+                tx_hash = self._send_tx(func, admin_private_key, admin_address, gas=gas)
+                results.append({'addresses': chunk, 'tx_hash': tx_hash, 'gas': gas, 'error': None})
+            except Exception as e:
+                results.append({'addresses': chunk, 'tx_hash': None, 'gas': gas, 'error': str(e)})
+        return results
+
+    def max_register_chunk(self, block_fraction=0.5):
+        """Largest registerVoters chunk that fits in block_fraction of the block gas limit."""
+        try:
+            gas_limit = self.w3.eth.get_block('latest')['gasLimit']
+        except Exception:
+            # Ganache's default block gas limit
+            gas_limit = 6721975
+        budget = int(gas_limit * block_fraction) - REGISTER_BATCH_BASE_GAS
+        return max(1, budget // REGISTER_BATCH_PER_VOTER_GAS)
+
     # --------------------------------------------------------------------------
     # ADD CANDIDATE (admin only)
     # --------------------------------------------------------------------------
@@ -174,6 +540,40 @@ class BlockchainClient:
         except Exception:
             return 0
 
+    # --------------------------------------------------------------------------
+    # GET ALL VOTE COUNTS (one round trip)
+    # --------------------------------------------------------------------------
+    def get_all_vote_counts(self, candidate_numbers):
+        """
+        Return {candidate_number: count} for every number in candidate_numbers.
+        - Uses the contract's getAllVoteCounts() view when the ABI has it (one eth_call).
+        - Otherwise sends all getVoteCount calls as a single JSON-RPC batch.
+        - Falls back to one call per candidate if the provider cannot batch.
+        """
+        numbers = [int(n) for n in candidate_numbers if n]
+        if not self.contract or not numbers:
+            return {n: 0 for n in numbers}
+
+        if self._has_function('getAllVoteCounts'):
+            try:
+                counts = self.contract.functions.getAllVoteCounts().call()
+                return {n: counts[n - 1] if 0 < n <= len(counts) else 0 for n in numbers}
+            except Exception:
+                pass
+
+        try:
+            with self.w3.batch_requests() as batch:
+                for n in numbers:
+                    batch.add(self.contract.functions.getVoteCount(n))
+                responses = batch.execute()
+            return {n: int(count) for n, count in zip(numbers, responses)}
+        except Exception:
+            return {n: self.get_vote_count(n) for n in numbers}
+
+    def _has_function(self, name):
+        return any(item.get('type') == 'function' and item.get('name') == name
+                   for item in (self.contract_abi or []))
+
     # --------------------------------------------------------------------------
     # VERIFY VOTE
     # --------------------------------------------------------------------------
@@ -186,3 +586,267 @@ class BlockchainClient:
             return self.contract.functions.verifyVote(voter_address).call()
         except Exception:
             return False
+
+    def has_voted(self, voter_address):
+        """verify_vote() for callers that act on the answer: RPC errors raise instead of reading as False."""
+        if not self.contract:
+            raise RuntimeError("Contract not set")
+        return self.contract.functions.verifyVote(to_checksum_address(voter_address)).call()
+
+    # --------------------------------------------------------------------------
+    # TRANSACTION RECEIPT
+    # --------------------------------------------------------------------------
+    def get_receipt(self, tx_hash):
+        """Return the receipt for tx_hash, or None if it has not been mined yet."""
+        try:
+            return self.w3.eth.get_transaction_receipt(_0x(tx_hash))
+        except TransactionNotFound:
+            return None
+
+    # --------------------------------------------------------------------------
+    # CONTRACT EVENTS
+    # --------------------------------------------------------------------------
+    def get_events(self, from_block, to_block, names=('VoterRegistered', 'VoteCast')):
+        """
+        Fetch and decode contract events in [from_block, to_block] with a single
+        eth_getLogs call. Returns decoded logs ordered by (blockNumber, logIndex).
+        """
+        if not self.contract:
+            return []
+
+        events_by_topic = {}
+        for name in names:
+            event = self.contract.events[name]()
+            events_by_topic[event.topic.lower()] = event
+
+        logs = self.w3.eth.get_logs({
+            'address': self.contract_address,
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'topics': [list(events_by_topic)],
+        })
+        decoded = []
+        for log in logs:
+            event = events_by_topic.get(Web3.to_hex(log['topics'][0]).lower())
+            if event is not None:
+                decoded.append(event.process_log(log))
+        decoded.sort(key=lambda e: (e['blockNumber'], e['logIndex']))
+        return decoded
+
+    # --------------------------------------------------------------------------
+    # BATCHED RAW JSON-RPC
+    # --------------------------------------------------------------------------
+    def batch_rpc(self, calls):
+        """
+        Send [(method, params), ...] as one JSON-RPC batch and return the raw
+        results in order (None for null results or per-call errors).
+        Providers that cannot batch get one request per call.
+        """
+        if not calls:
+            return []
+        provider = self.w3.provider
+        try:
+            # raw provider calls skip the middleware, so instrument them here
+            with self.rpc_metrics.track([method for method, _ in calls]):
+                responses = provider.make_batch_request(calls)
+        except Exception:
+            responses = []
+            for method, params in calls:
+                try:
+                    with self.rpc_metrics.track((method,)):
+                        responses.append(provider.make_request(method, params))
+                except Exception:
+                    responses.append({})
+        if isinstance(responses, dict):
+            # a batch-level error object instead of a list
+            return [None] * len(calls)
+        return [response.get('result') if isinstance(response, dict) else None for response in responses]
+
+    def get_receipts(self, tx_hashes):
+        """Return {tx_hash: receipt dict or None} using one batched request."""
+        calls = [('eth_getTransactionReceipt', [_0x(h)]) for h in tx_hashes]
+        return dict(zip(tx_hashes, self.batch_rpc(calls)))
+
+    def get_transactions(self, tx_hashes):
+        """Return {tx_hash: tx dict or None}; None means the node does not know the tx."""
+        calls = [('eth_getTransactionByHash', [_0x(h)]) for h in tx_hashes]
+        return dict(zip(tx_hashes, self.batch_rpc(calls)))
+
+    def get_revert_reason(self, tx_hash):
+        """Replay a mined, reverted tx as eth_call to recover its revert message."""
+        tx = self.w3.eth.get_transaction(_0x(tx_hash))
+        try:
+            self.w3.eth.call({'from': tx['from'], 'to': tx['to'], 'data': tx['input'], 'gas': tx['gas']},
+                             tx['blockNumber'] - 1)
+        except Exception as e:
+            return str(e)
+        return None
+
+    def get_block_hash(self, block_number):
+        return Web3.to_hex(self.w3.eth.get_block(block_number)['hash'])
+
+
+class AsyncBlockchainClient:
+    """
+    asyncio counterpart of BlockchainClient for async views.
+    - Same API for cast_vote / register_voter / add_candidate and the reads
+      (get_vote_count, get_all_vote_counts, verify_vote, verify_votes); a
+      coroutine waiting on the node holds no worker thread, so callers can
+      fan calls out with asyncio.gather.
+    - Shares the sync client's contract, NonceManager, cached chain params and
+      RPC metrics, so both can send from the same accounts without nonce clashes.
+    """
+    def __init__(self, app=None, bc=None):
+        self.w3 = None
+        self.bc = None
+        self._contract = None
+        if app:
+            self.init_app(app, bc)
+
+    def init_app(self, app, bc):
+        self.bc = bc
+        self.set_web3(AsyncWeb3(build_async_provider(app.config)))
+
+    def set_web3(self, w3):
+        self.w3 = w3
+        self.w3.middleware_onion.inject(metrics_middleware(self.bc.rpc_metrics), name='rpc_metrics', layer=0)
+        self._contract = None
+
+    @property
+    def nonces(self):
+        return self.bc.nonces
+
+    @property
+    def contract(self):
+        """AsyncContract for the sync client's current address/ABI (rebuilt after set_contract)."""
+        if not self.bc.contract:
+            return None
+        if self._contract is None or self._contract.address != self.bc.contract_address:
+            self._contract = self.w3.eth.contract(address=self.bc.contract_address, abi=self.bc.contract_abi)
+        return self._contract
+
+    # --------------------------------------------------------------------------
+    # CACHED CHAIN PARAMETERS (shared with the sync client)
+    # --------------------------------------------------------------------------
+    async def get_chain_id(self):
+        if self.bc._chain_id is None:
+            try:
+                self.bc._chain_id = await self.w3.eth.chain_id
+            except Exception:
+                return None
+        return self.bc._chain_id
+
+    async def get_gas_price(self):
+        gas_price = self.bc._fresh_gas_price()
+        if gas_price is None:
+            gas_price = self.bc._store_gas_price(await self.w3.eth.gas_price)
+        return gas_price
+
+    # --------------------------------------------------------------------------
+    # TRANSACTION HELPER
+    # --------------------------------------------------------------------------
+    async def _send_tx(self, func, private_key, from_address, gas):
+        """
+        Async _send_tx/_sign_and_send: build, sign and broadcast a call to func.
+        Nonce bookkeeping runs in a worker thread since the NonceManager may
+        read the chain synchronously (first use of an address, resync).
+        """
+        from_address = to_checksum_address(from_address)
+        chain_id = await self.get_chain_id()
+        try:
+            gas_price = await self.get_gas_price()
+        except Exception:
+            gas_price = None
+
+        for attempt in range(2):
+            nonce = await asyncio.to_thread(self.nonces.allocate, from_address)
+            signed = None
+            try:
+                tx_params = {'from': from_address, 'nonce': nonce, 'gas': gas}
+                if chain_id:
+                    tx_params['chainId'] = chain_id
+                if gas_price is not None:
+                    tx_params['gasPrice'] = gas_price
+                tx = await func.build_transaction(tx_params)
+                signed = self.w3.eth.account.sign_transaction(tx, private_key)
+                tx_hash = await self.w3.eth.send_raw_transaction(signed.raw_transaction)
+            except Exception as e:
+                if signed is not None and NonceManager.is_already_known(e):
+                    return Web3.keccak(signed.raw_transaction).hex()
+                if attempt == 0 and NonceManager.is_nonce_error(e):
+                    await asyncio.to_thread(self.nonces.resync, from_address)
+                    continue
+                await asyncio.to_thread(self.nonces.release, from_address, nonce)
+                raise
+            return tx_hash.hex()
+
+    # --------------------------------------------------------------------------
+    # TRANSACTIONS
+    # --------------------------------------------------------------------------
+    async def register_voter(self, admin_private_key, voter_address):
+        if not self.contract:
+            raise RuntimeError("Contract not set")
+
+        admin_address = self.w3.eth.account.from_key(admin_private_key).address
+        func = self.contract.functions.registerVoter(to_checksum_address(voter_address))
+        return await self._send_tx(func, admin_private_key, admin_address, gas=300000)
+
+    async def add_candidate(self, admin_private_key, name):
+        if not self.contract:
+            raise RuntimeError("Contract not set")
+
+        admin_address = self.w3.eth.account.from_key(admin_private_key).address
+        func = self.contract.functions.addCandidate(name)
+        return await self._send_tx(func, admin_private_key, admin_address, gas=400000)
+
+    async def cast_vote(self, voter_private_key, candidate_number, from_address):
+        if not self.contract:
+            raise RuntimeError("Contract not set")
+
+        func = self.contract.functions.castVote(int(candidate_number))
+        return await self._send_tx(func, voter_private_key, from_address, gas=300000)
+
+    # --------------------------------------------------------------------------
+    # READS
+    # --------------------------------------------------------------------------
+    async def get_vote_count(self, candidate_number):
+        if not self.contract:
+            return 0
+
+        try:
+            return await self.contract.functions.getVoteCount(int(candidate_number)).call()
+        except Exception:
+            return 0
+
+    async def get_all_vote_counts(self, candidate_numbers):
+        """
+        {candidate_number: count}: one getAllVoteCounts() eth_call when the ABI
+        has it, otherwise every getVoteCount call concurrently.
+        """
+        numbers = [int(n) for n in candidate_numbers if n]
+        if not self.contract or not numbers:
+            return {n: 0 for n in numbers}
+
+        if self.bc._has_function('getAllVoteCounts'):
+            try:
+                counts = await self.contract.functions.getAllVoteCounts().call()
+                return {n: counts[n - 1] if 0 < n <= len(counts) else 0 for n in numbers}
+            except Exception:
+                pass
+
+        counts = await asyncio.gather(*[self.get_vote_count(n) for n in numbers])
+        return dict(zip(numbers, counts))
+
+    async def verify_vote(self, voter_address):
+        if not self.contract:
+            return False
+
+        try:
+            return await self.contract.functions.verifyVote(to_checksum_address(voter_address)).call()
+        except Exception:
+            return False
+
+    async def verify_votes(self, voter_addresses):
+        """{address: has_voted} with the verifyVote calls in flight concurrently."""
+        results = await asyncio.gather(*[self.verify_vote(a) for a in voter_addresses])
+        return dict(zip(voter_addresses, results))
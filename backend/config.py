@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key')
@@ -6,8 +7,164 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'mysql://root:@localhost/votingdb')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pool (per engine; ignored for in-memory SQLite)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # below MySQL wait_timeout
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+
+    # Optional read replica: GET/HEAD requests to DB_REPLICA_ENDPOINTS (and the
+    # login user lookup) read from it; after a write a user's reads stay on the
+    # primary for DB_REPLICA_STICKY_SECONDS
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    DB_REPLICA_STICKY_SECONDS = float(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5))
+    DB_REPLICA_ENDPOINTS = [e.strip() for e in
+                            os.environ.get('DB_REPLICA_ENDPOINTS',
+                                           'vote,api_results,export_csv,export_pdf,export_votes,'
+                                           'admin_tally,api_audit_root').split(',')
+                            if e.strip()]
+
     # Web3 / Blockchain config (local Ganache)
-    WEB3_PROVIDER = os.environ.get('WEB3_PROVIDER', 'http://127.0.0.1:7545')
+    WEB3_PROVIDER = os.environ.get('WEB3_PROVIDER', 'http://127.0.0.1:7545')  # comma-separated for failover
+    WEB3_POOL_CONNECTIONS = int(os.environ.get('WEB3_POOL_CONNECTIONS', 4))
+    WEB3_POOL_SIZE = int(os.environ.get('WEB3_POOL_SIZE', 20))  # keep-alive connections per node
+    WEB3_POOL_BLOCK = os.environ.get('WEB3_POOL_BLOCK', 'false').lower() == 'true'
+    WEB3_CONNECT_TIMEOUT = float(os.environ.get('WEB3_CONNECT_TIMEOUT', 3))
+    WEB3_READ_TIMEOUT = float(os.environ.get('WEB3_READ_TIMEOUT', 10))
+    WEB3_FAILOVER_COOLDOWN = float(os.environ.get('WEB3_FAILOVER_COOLDOWN', 30))
     CONTRACT_ABI_PATH = os.environ.get('CONTRACT_ABI_PATH', 'build/contracts/Voting.json')
+    # compact ABI extracted from the artifact, cached by artifact hash ('' disables)
+    ABI_CACHE_DIR = os.environ.get('ABI_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'voting_abi_cache'))
     CONTRACT_ADDRESS = os.environ.get('CONTRACT_ADDRESS', '...')  # Fill after deploying
-    PRIVATE_KEY = os.environ.get('PRIVATE_KEY', '.......')  # Fill with your Ganache account private key
\ No newline at end of file
+    PRIVATE_KEY = os.environ.get('PRIVATE_KEY', '.......')  # Fill with your Ganache account private key
+    # senders whose next nonce is tracked locally (LRU; evicted ones re-read the chain)
+    NONCE_TRACKED_ADDRESSES = int(os.environ.get('NONCE_TRACKED_ADDRESSES', 10000))
+
+    # Background workers (onboarding, indexer, receipt tracker, audit log, account
+    # pool refill) run once, in `flask workers` (or `python app.py` in development).
+    # true also starts them in every web process: only for a single-process server.
+    # flask CLI commands never start them.
+    BACKGROUND_WORKERS_ENABLED = os.environ.get('BACKGROUND_WORKERS_ENABLED', 'false').lower() == 'true'
+
+    # Voter onboarding queue (funding + registerVoter run in background workers)
+    ONBOARDING_WORKERS = int(os.environ.get('ONBOARDING_WORKERS', 2))
+    ONBOARDING_MAX_ATTEMPTS = int(os.environ.get('ONBOARDING_MAX_ATTEMPTS', 8))
+    ONBOARDING_BACKOFF_SECONDS = float(os.environ.get('ONBOARDING_BACKOFF_SECONDS', 2))
+    ONBOARDING_POLL_INTERVAL = float(os.environ.get('ONBOARDING_POLL_INTERVAL', 1))
+    VOTER_FUNDING_ETHER = float(os.environ.get('VOTER_FUNDING_ETHER', 1))
+    # voters registered per registerVoters transaction by the onboarding workers
+    ONBOARDING_REGISTER_BATCH = int(os.environ.get('ONBOARDING_REGISTER_BATCH', 100))
+
+    # Pool of voter accounts created, funded and registered ahead of signup;
+    # refilled up to TARGET in REFILL_BATCH rounds once below LOW_WATERMARK
+    ACCOUNT_POOL_ENABLED = os.environ.get('ACCOUNT_POOL_ENABLED', 'false').lower() == 'true'
+    # the refill thread creates and funds accounts; enable it in exactly one process
+    ACCOUNT_POOL_REFILL_ENABLED = os.environ.get('ACCOUNT_POOL_REFILL_ENABLED', 'false').lower() == 'true'
+    ACCOUNT_POOL_TARGET = int(os.environ.get('ACCOUNT_POOL_TARGET', 500))
+    ACCOUNT_POOL_LOW_WATERMARK = int(os.environ.get('ACCOUNT_POOL_LOW_WATERMARK', 200))
+    ACCOUNT_POOL_REFILL_BATCH = int(os.environ.get('ACCOUNT_POOL_REFILL_BATCH', 100))
+    ACCOUNT_POOL_POLL_INTERVAL = float(os.environ.get('ACCOUNT_POOL_POLL_INTERVAL', 2))
+
+    # Results cache keyed by block number, shared by workers through a SQLite file
+    RESULTS_CACHE_PATH = os.environ.get('RESULTS_CACHE_PATH',
+                                        os.path.join(tempfile.gettempdir(), 'voting_results_cache.sqlite3'))
+    RESULTS_CACHE_TTL = float(os.environ.get('RESULTS_CACHE_TTL', 30))
+    RESULTS_CACHE_MAX_ENTRIES = int(os.environ.get('RESULTS_CACHE_MAX_ENTRIES', 64))
+    BLOCK_WATCH_INTERVAL = float(os.environ.get('BLOCK_WATCH_INTERVAL', 1))
+
+    # Event indexer: local read-model of VoterRegistered / VoteCast events
+    INDEXER_ENABLED = os.environ.get('INDEXER_ENABLED', 'true').lower() == 'true'
+    INDEXER_CONFIRMATIONS = int(os.environ.get('INDEXER_CONFIRMATIONS', 0))  # 0 is fine for Ganache automine
+    INDEXER_PAGE_SIZE = int(os.environ.get('INDEXER_PAGE_SIZE', 2000))
+    INDEXER_START_BLOCK = int(os.environ.get('INDEXER_START_BLOCK', 0))  # contract deployment block
+    INDEXER_POLL_INTERVAL = float(os.environ.get('INDEXER_POLL_INTERVAL', 2))
+    # 'chain' reads tallies with eth_call, 'index' serves them from the indexed tables
+    RESULTS_SOURCE = os.environ.get('RESULTS_SOURCE', 'chain')
+
+    # Server-Sent Events stream of results deltas (/api/results/stream)
+    RESULTS_STREAM_POLL_INTERVAL = float(os.environ.get('RESULTS_STREAM_POLL_INTERVAL', 2))
+    RESULTS_STREAM_HEARTBEAT = float(os.environ.get('RESULTS_STREAM_HEARTBEAT', 15))
+    RESULTS_STREAM_HISTORY = int(os.environ.get('RESULTS_STREAM_HISTORY', 256))
+    # open streams per process (multiply by GUNICORN_WORKERS for the total). Each
+    # holds one server thread, so this caps how many of GUNICORN_THREADS streams
+    # may take; viewers past the cap get a 503 and main.js polls /api/results
+    RESULTS_STREAM_MAX_SUBSCRIBERS = int(os.environ.get('RESULTS_STREAM_MAX_SUBSCRIBERS', 16))
+    RESULTS_STREAM_QUEUE_SIZE = int(os.environ.get('RESULTS_STREAM_QUEUE_SIZE', 64))
+
+    # Vote receipt tracking (pending -> confirmed / failed / dropped)
+    RECEIPT_TRACKER_ENABLED = os.environ.get('RECEIPT_TRACKER_ENABLED', 'true').lower() == 'true'
+    RECEIPT_BATCH_SIZE = int(os.environ.get('RECEIPT_BATCH_SIZE', 200))
+    RECEIPT_POLL_INTERVAL = float(os.environ.get('RECEIPT_POLL_INTERVAL', 1))
+    RECEIPT_DROP_AFTER_SECONDS = int(os.environ.get('RECEIPT_DROP_AFTER_SECONDS', 300))
+    VOTE_MAX_RETRIES = int(os.environ.get('VOTE_MAX_RETRIES', 3))
+    # first wait before re-sending a "Not registered" revert; doubles per retry
+    RECEIPT_RETRY_BACKOFF_SECONDS = float(os.environ.get('RECEIPT_RETRY_BACKOFF_SECONDS', 5))
+
+    # Queued vote submission: /vote answers 202 and submitter threads broadcast
+    # at most VOTE_QUEUE_RATE tx/s per web worker process (the total is this times
+    # GUNICORN_WORKERS); a full queue answers 503 with Retry-After
+    VOTE_QUEUE_ENABLED = os.environ.get('VOTE_QUEUE_ENABLED', 'false').lower() == 'true'
+    VOTE_QUEUE_WORKERS = int(os.environ.get('VOTE_QUEUE_WORKERS', 4))
+    VOTE_QUEUE_RATE = float(os.environ.get('VOTE_QUEUE_RATE', 20))
+    VOTE_QUEUE_MAX_DEPTH = int(os.environ.get('VOTE_QUEUE_MAX_DEPTH', 5000))
+
+    # Active election + candidate roster cached per process; the DB version
+    # counter is checked at most this often
+    ROSTER_VERSION_CHECK_INTERVAL = float(os.environ.get('ROSTER_VERSION_CHECK_INTERVAL', 1))
+
+    # Flask-Login principal cache (id, role, address); role changes made by
+    # another worker show up after at most PRINCIPAL_CACHE_TTL seconds
+    PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 10000))
+    PRINCIPAL_CACHE_TTL = float(os.environ.get('PRINCIPAL_CACHE_TTL', 60))
+
+    # Password hashing (passlib scheme name; 0 rounds = passlib's default cost).
+    # Stored hashes made with other settings are upgraded on the next login.
+    PASSWORD_SCHEME = os.environ.get('PASSWORD_SCHEME', 'pbkdf2_sha256')
+    PASSWORD_ROUNDS = int(os.environ.get('PASSWORD_ROUNDS', 0))
+    PASSWORD_HASH_PROCESSES = int(os.environ.get('PASSWORD_HASH_PROCESSES', 2))
+
+    # Rows fetched per keyset page by the streamed per-vote audit export
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 5000))
+
+    # Per-request timing breakdown (Server-Timing header + per-endpoint histograms);
+    # sampling keeps stacks of the slowest requests to the listed endpoints
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_SAMPLING = os.environ.get('PROFILING_SAMPLING', 'false').lower() == 'true'
+    PROFILING_SAMPLE_INTERVAL = float(os.environ.get('PROFILING_SAMPLE_INTERVAL', 0.005))
+    PROFILING_KEEP_SLOWEST = int(os.environ.get('PROFILING_KEEP_SLOWEST', 10))
+    PROFILING_SAMPLE_ENDPOINTS = [e.strip() for e in
+                                  os.environ.get('PROFILING_SAMPLE_ENDPOINTS', 'vote,register,api_results').split(',')
+                                  if e.strip()]
+
+    # Merkle audit log of recorded votes (/api/audit/root, /api/audit/proof); votes
+    # in AUDIT_STATUSES become leaves, roots can be anchored on-chain as calldata.
+    # Enable the builder in exactly one process (e.g. the `flask workers` one).
+    AUDIT_ENABLED = os.environ.get('AUDIT_ENABLED', 'false').lower() == 'true'
+    AUDIT_STATUSES = [s.strip() for s in os.environ.get('AUDIT_STATUSES', 'confirmed').split(',') if s.strip()]
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 1000))
+    AUDIT_POLL_INTERVAL = float(os.environ.get('AUDIT_POLL_INTERVAL', 5))
+    AUDIT_ANCHOR_ENABLED = os.environ.get('AUDIT_ANCHOR_ENABLED', 'false').lower() == 'true'
+    AUDIT_ANCHOR_INTERVAL = float(os.environ.get('AUDIT_ANCHOR_INTERVAL', 300))
+
+    # Async views: /vote and /api/results run as coroutines on AsyncBlockchainClient
+    # (Flask[async]); /api/verify/batch is always async and takes up to VERIFY_BATCH_MAX addresses
+    ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'false').lower() == 'true'
+    VERIFY_BATCH_MAX = int(os.environ.get('VERIFY_BATCH_MAX', 100))
+
+    # flask reconcile: DB-versus-chain audit of registrations and votes
+    RECONCILE_PAGE_SIZE = int(os.environ.get('RECONCILE_PAGE_SIZE', 5000))
+    RECONCILE_BATCH_SIZE = int(os.environ.get('RECONCILE_BATCH_SIZE', 250))  # addresses (2 eth_calls each)
+    RECONCILE_WORKERS = int(os.environ.get('RECONCILE_WORKERS', 8))
+
+    # Cached chain parameters for transaction building
+    GAS_PRICE_TTL = float(os.environ.get('GAS_PRICE_TTL', 15))
+    GAS_ESTIMATE_TTL = float(os.environ.get('GAS_ESTIMATE_TTL', 600))
+    GAS_ESTIMATE_MARGIN = float(os.environ.get('GAS_ESTIMATE_MARGIN', 1.2))
+
+    # /metrics (Prometheus text format); set a token to require "Authorization: Bearer <token>"
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Bulk voter import (flask import-voters / POST /admin/import-voters)
+    VOTER_IMPORT_CHUNK_SIZE = int(os.environ.get('VOTER_IMPORT_CHUNK_SIZE', 1000))
+    VOTER_IMPORT_PROCESSES = int(os.environ.get('VOTER_IMPORT_PROCESSES', 0))  # 0 = one per CPU
@@ -0,0 +1,212 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, has_app_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.dml import UpdateBase
+from rpc_metrics import Histogram
+
+REPLICA_BIND = 'replica'
+READ_METHODS = ('GET', 'HEAD')
+# Flask session key: until when this user's reads stay on the primary
+STICKY_KEY = '_db_primary_until'
+
+# set by reads()/primary(); None leaves the choice to the request (g._db_replica)
+_use_replica = ContextVar('db_use_replica', default=None)
+
+
+def _pool_options(app, url):
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # in-memory SQLite gets a StaticPool from Flask-SQLAlchemy; sizing does not apply
+        return {}
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': app.config.get('DB_POOL_SIZE', 10),
+        'max_overflow': app.config.get('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': app.config.get('DB_POOL_TIMEOUT', 10),
+        'pool_recycle': app.config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': app.config.get('DB_POOL_PRE_PING', True),
+    }
+
+
+def configure_engines(app):
+    """
+    Fill SQLALCHEMY_ENGINE_OPTIONS / SQLALCHEMY_BINDS from the DB_* settings;
+    call before db.init_app(app). Explicit SQLALCHEMY_ENGINE_OPTIONS win.
+    """
+    options = _pool_options(app, app.config['SQLALCHEMY_DATABASE_URI'])
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    replica_url = app.config.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        # Flask-SQLAlchemy does not apply SQLALCHEMY_ENGINE_OPTIONS to binds
+        app.config.setdefault('SQLALCHEMY_BINDS', {})
+        app.config['SQLALCHEMY_BINDS'][REPLICA_BIND] = dict(_pool_options(app, replica_url), url=replica_url)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_lock = threading.Lock()
+        self.checkout_wait = Histogram()
+        self.checkout_timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self.wait_lock:
+                self.checkout_timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.wait_lock:
+                self.checkout_wait.observe(elapsed)
+
+
+def _replica_wanted():
+    wanted = _use_replica.get()
+    if wanted is not None:
+        return wanted
+    return has_app_context() and g.get('_db_replica', False)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to the 'replica' bind when the current request
+    (or a reads() block) asks for it. Flushes and INSERT/UPDATE/DELETE
+    statements always go to the primary.
+    """
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, UpdateBase) and _replica_wanted():
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def _route(replica):
+    token = _use_replica.set(replica)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def reads():
+    """Route the enclosed queries to the read replica (no-op without one)."""
+    return _route(True)
+
+
+def primary():
+    """Keep the enclosed queries on the primary, even in a replica-routed request."""
+    return _route(False)
+
+
+class DatabaseRouter:
+    """
+    Read-replica routing and connection pool metrics.
+    - GET/HEAD requests to DB_REPLICA_ENDPOINTS read from DATABASE_REPLICA_URL.
+    - Read-your-writes: after a successful write request the user's reads stay
+      on the primary for DB_REPLICA_STICKY_SECONDS (kept in the Flask session,
+      so it holds across workers).
+    - Pool utilization and checkout waits of every engine for /admin/stats
+      and /metrics.
+    """
+    def __init__(self, app=None, db=None):
+        if app:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.app = app
+        self.db = db
+        self.endpoints = set(app.config.get('DB_REPLICA_ENDPOINTS') or ())
+        self.sticky_seconds = app.config.get('DB_REPLICA_STICKY_SECONDS', 5)
+        self.enabled = bool(app.config.get('DATABASE_REPLICA_URL'))
+        if self.enabled:
+            app.before_request(self._before)
+            app.after_request(self._after)
+
+    def _before(self):
+        if (request.method in READ_METHODS and request.endpoint in self.endpoints
+                and session.get(STICKY_KEY, 0) < time.time()):
+            g._db_replica = True
+
+    def _after(self, response):
+        if request.method not in READ_METHODS and response.status_code < 400:
+            session[STICKY_KEY] = time.time() + self.sticky_seconds
+        return response
+
+    # --------------------------------------------------------------------------
+    # METRICS
+    # --------------------------------------------------------------------------
+    def _pools(self):
+        with self.app.app_context():
+            engines = dict(self.db.engines)
+        for key, engine in sorted(engines.items(), key=lambda item: str(item[0])):
+            yield 'primary' if key is None else key, engine.pool
+
+    def stats(self):
+        data = {'replica': self.enabled, 'pools': {}}
+        for name, pool in self._pools():
+            entry = {'status': pool.status()}
+            if isinstance(pool, QueuePool):
+                entry.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+            if isinstance(pool, TimedQueuePool):
+                with pool.wait_lock:
+                    h = pool.checkout_wait
+                    entry.update(checkouts=h.count, timeouts=pool.checkout_timeouts,
+                                 avg_wait_ms=round(h.sum / h.count * 1000, 3) if h.count else None,
+                                 p95_wait_le=h.quantile(0.95), p99_wait_le=h.quantile(0.99))
+            data['pools'][name] = entry
+        return data
+
+    def render_prometheus(self, prefix='voting_db_pool'):
+        gauges = []
+        waits = []
+        for name, pool in self._pools():
+            if isinstance(pool, QueuePool):
+                gauges.append((name, pool.size(), pool.checkedout(), pool.overflow()))
+            if isinstance(pool, TimedQueuePool):
+                with pool.wait_lock:
+                    waits.append((name, pool.checkout_wait.cumulative(), pool.checkout_wait.sum,
+                                  pool.checkout_wait.count, pool.checkout_timeouts))
+        lines = [
+            '# HELP %s_size Configured pool size.' % prefix,
+            '# TYPE %s_size gauge' % prefix,
+        ]
+        lines += ['%s_size{pool="%s"} %d' % (prefix, name, size) for name, size, _, _ in gauges]
+        lines += [
+            '# HELP %s_checked_out Connections currently checked out.' % prefix,
+            '# TYPE %s_checked_out gauge' % prefix,
+        ]
+        lines += ['%s_checked_out{pool="%s"} %d' % (prefix, name, out) for name, _, out, _ in gauges]
+        lines += [
+            '# HELP %s_overflow Connections open beyond pool size (negative: unused capacity).' % prefix,
+            '# TYPE %s_overflow gauge' % prefix,
+        ]
+        lines += ['%s_overflow{pool="%s"} %d' % (prefix, name, overflow) for name, _, _, overflow in gauges]
+        lines += [
+            '# HELP %s_checkout_timeouts_total Checkouts that gave up after DB_POOL_TIMEOUT.' % prefix,
+            '# TYPE %s_checkout_timeouts_total counter' % prefix,
+        ]
+        lines += ['%s_checkout_timeouts_total{pool="%s"} %d' % (prefix, name, timeouts)
+                  for name, _, _, _, timeouts in waits]
+        lines += [
+            '# HELP %s_checkout_wait_seconds Time spent waiting for a pooled connection.' % prefix,
+            '# TYPE %s_checkout_wait_seconds histogram' % prefix,
+        ]
+        for name, cumulative, total_sum, count, _ in waits:
+            for bound, total in cumulative:
+                lines.append('%s_checkout_wait_seconds_bucket{pool="%s",le="%s"} %d' % (prefix, name, bound, total))
+            lines.append('%s_checkout_wait_seconds_sum{pool="%s"} %.6f' % (prefix, name, total_sum))
+            lines.append('%s_checkout_wait_seconds_count{pool="%s"} %d' % (prefix, name, count))
+        return '\n'.join(lines) + '\n'
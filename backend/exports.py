@@ -0,0 +1,47 @@
+import csv
+import io
+from models import db, User, Candidate, Vote
+
+VOTE_AUDIT_HEADER = ['Vote ID', 'Username', 'Voter ID', 'Candidate No', 'Candidate', 'Election ID',
+                     'Tx Hash', 'Status', 'Block', 'Submitted At', 'Confirmed At']
+
+
+def iter_csv(header, rows):
+    """Yield CSV text one row at a time (constant memory, for streamed responses)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= 8192:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def iter_vote_audit_rows(batch_size=5000):
+    """
+    Every vote joined with its voter and candidate, in id order.
+    Keyset-paginated column queries: nothing accumulates in the session,
+    so memory stays flat however many votes there are.
+    """
+    last_id = 0
+    while True:
+        batch = (db.session.query(Vote.id, User.username, User.voter_id, Candidate.candidate_number,
+                                  Candidate.name, Vote.election_id, Vote.tx_hash, Vote.tx_status,
+                                  Vote.block_number, Vote.submitted_at, Vote.confirmed_at)
+                 .join(User, User.id == Vote.user_id)
+                 .join(Candidate, Candidate.id == Vote.candidate_id)
+                 .filter(Vote.id > last_id)
+                 .order_by(Vote.id)
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            return
+        for row in batch:
+            yield [value.isoformat() if hasattr(value, 'isoformat') else value for value in row]
+        last_id = batch[-1][0]
+        # end the read transaction between pages so long exports do not pin a snapshot
+        db.session.commit()
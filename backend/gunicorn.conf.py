@@ -0,0 +1,16 @@
+# gunicorn -c gunicorn.conf.py app:app
+#
+# Each /api/results/stream (SSE) subscriber holds a server thread for as long
+# as it stays connected, so a sync worker would be blocked by one open
+# dashboard. gthread keeps GUNICORN_THREADS connections per worker; keep
+# RESULTS_STREAM_MAX_SUBSCRIBERS well below it so streams cannot starve
+# ordinary requests.
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+# SSE responses send a heartbeat every RESULTS_STREAM_HEARTBEAT seconds
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+keepalive = 5
@@ -0,0 +1,194 @@
+import threading
+from models import db, IndexerState, ChainEvent, ChainTally, ChainVoter
+
+STATE_NAME = 'voting'
+
+
+class EventIndexer:
+    """
+    Incremental indexer for the Voting contract's VoterRegistered and VoteCast events.
+    - Pages through logs in block ranges of INDEXER_PAGE_SIZE up to head - confirmations.
+    - Checkpoints the last processed block (and its hash) in indexer_state.
+    - If the checkpointed block hash changes (reorg), rewinds and rebuilds the
+      derived tables from the surviving events.
+    - Tallies and voter state are updated in the same transaction as the events,
+      so a page is either fully indexed or not at all.
+    """
+    def __init__(self, app=None, bc=None):
+        self.bc = None
+        self.listeners = []
+        self._thread = None
+        self._stop = threading.Event()
+        if app:
+            self.init_app(app, bc)
+
+    def init_app(self, app, bc):
+        self.app = app
+        self.bc = bc
+        self.confirmations = app.config.get('INDEXER_CONFIRMATIONS', 0)
+        self.page_size = app.config.get('INDEXER_PAGE_SIZE', 2000)
+        self.start_block = app.config.get('INDEXER_START_BLOCK', 0)
+        self.poll_interval = app.config.get('INDEXER_POLL_INTERVAL', 2)
+
+    # --------------------------------------------------------------------------
+    # BACKGROUND LOOP
+    # --------------------------------------------------------------------------
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name='event-indexer', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self.run_once()
+            except Exception:
+                self.app.logger.exception("Event indexer pass failed")
+            self._stop.wait(self.poll_interval)
+
+    # --------------------------------------------------------------------------
+    # INDEXING
+    # --------------------------------------------------------------------------
+    def _state(self):
+        state = IndexerState.query.filter_by(name=STATE_NAME).first()
+        if state is None:
+            state = IndexerState(name=STATE_NAME, last_block=self.start_block - 1,
+                                 contract_address=self.bc.contract_address)
+            db.session.add(state)
+            db.session.commit()
+        elif state.contract_address != self.bc.contract_address:
+            # a redeployed contract starts from an empty read-model
+            self._rewind(state, self.start_block - 1)
+            state.contract_address = self.bc.contract_address
+            db.session.commit()
+        return state
+
+    def run_once(self):
+        """Index every confirmed block not yet processed. Returns the number of new events."""
+        if not self.bc.contract:
+            return 0
+        state = self._state()
+        head = self.bc.w3.eth.block_number
+        safe_block = head - self.confirmations
+
+        if state.last_block >= 0 and state.last_block_hash:
+            if self.bc.get_block_hash(state.last_block) != state.last_block_hash:
+                self.app.logger.warning("Reorg detected at block %s; rewinding", state.last_block)
+                self._rewind(state, state.last_block - max(self.confirmations, 1))
+                db.session.commit()
+
+        indexed = 0
+        from_block = state.last_block + 1
+        while from_block <= safe_block:
+            to_block = min(from_block + self.page_size - 1, safe_block)
+            events = self.bc.get_events(from_block, to_block)
+            try:
+                for event in events:
+                    self._apply(event)
+                state.last_block = to_block
+                state.last_block_hash = self.bc.get_block_hash(to_block)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            indexed += len(events)
+            from_block = to_block + 1
+        if indexed:
+            for listener in self.listeners:
+                listener(indexed)
+        return indexed
+
+    def _apply(self, event):
+        voter_address = event['args']['voter']
+        candidate_number = event['args'].get('candidateId')
+        db.session.add(ChainEvent(
+            event=event['event'],
+            voter_address=voter_address,
+            candidate_number=candidate_number,
+            block_number=event['blockNumber'],
+            block_hash=self.bc.w3.to_hex(event['blockHash']),
+            tx_hash=self.bc.w3.to_hex(event['transactionHash']),
+            log_index=event['logIndex'],
+        ))
+
+        voter = db.session.get(ChainVoter, voter_address)
+        if voter is None:
+            voter = ChainVoter(address=voter_address, registered=False, has_voted=False)
+            db.session.add(voter)
+
+        if event['event'] == 'VoterRegistered':
+            voter.registered = True
+        elif event['event'] == 'VoteCast':
+            voter.has_voted = True
+            voter.candidate_number = candidate_number
+            voter.vote_block = event['blockNumber']
+            tally = db.session.get(ChainTally, candidate_number)
+            if tally is None:
+                tally = ChainTally(candidate_number=candidate_number, vote_count=0)
+                db.session.add(tally)
+            tally.vote_count += 1
+
+    def _rewind(self, state, to_block):
+        """Drop events after to_block and rebuild tallies and voter state from the rest."""
+        ChainEvent.query.filter(ChainEvent.block_number > to_block).delete(synchronize_session=False)
+        ChainTally.query.delete(synchronize_session=False)
+        ChainVoter.query.delete(synchronize_session=False)
+        db.session.flush()
+
+        voters = {}
+        for event in ChainEvent.query.order_by(ChainEvent.block_number, ChainEvent.log_index).yield_per(1000):
+            voter = voters.get(event.voter_address)
+            if voter is None:
+                voter = voters[event.voter_address] = ChainVoter(
+                    address=event.voter_address, registered=False, has_voted=False)
+            if event.event == 'VoterRegistered':
+                voter.registered = True
+            else:
+                voter.has_voted = True
+                voter.candidate_number = event.candidate_number
+                voter.vote_block = event.block_number
+        db.session.add_all(voters.values())
+
+        for number, count in (db.session.query(ChainEvent.candidate_number, db.func.count(ChainEvent.id))
+                              .filter(ChainEvent.event == 'VoteCast')
+                              .group_by(ChainEvent.candidate_number)):
+            db.session.add(ChainTally(candidate_number=number, vote_count=count))
+
+        state.last_block = to_block
+        state.last_block_hash = self.bc.get_block_hash(to_block) if to_block >= 0 else None
+
+    # --------------------------------------------------------------------------
+    # READS
+    # --------------------------------------------------------------------------
+    def vote_counts(self, candidate_numbers):
+        numbers = [int(n) for n in candidate_numbers if n]
+        rows = ChainTally.query.filter(ChainTally.candidate_number.in_(numbers)).all() if numbers else []
+        counts = {row.candidate_number: row.vote_count for row in rows}
+        return {n: counts.get(n, 0) for n in numbers}
+
+    def voter_state(self, address):
+        return db.session.get(ChainVoter, address)
+
+    def last_block(self):
+        state = IndexerState.query.filter_by(name=STATE_NAME).first()
+        return state.last_block if state else None
+
+    def status(self):
+        state = IndexerState.query.filter_by(name=STATE_NAME).first()
+        return {
+            'last_block': state.last_block if state else None,
+            'last_block_hash': state.last_block_hash if state else None,
+            'events': ChainEvent.query.count(),
+            'confirmations': self.confirmations,
+        }
+
+    def audit(self, candidate_numbers):
+        """Compare indexed tallies with live chain counts; returns the mismatches."""
+        indexed = self.vote_counts(candidate_numbers)
+        on_chain = self.bc.get_all_vote_counts(candidate_numbers)
+        return [
+            {'candidate_number': n, 'indexed': indexed[n], 'chain': on_chain.get(n, 0)}
+            for n in indexed if indexed[n] != on_chain.get(n, 0)
+        ]
@@ -1,8 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+from database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model, UserMixin):
     __tablename__ = 'users'
@@ -25,6 +26,12 @@ class Election(db.Model):
     is_active = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # index names match sql/schema.sql and sql/migrations
+    __table_args__ = (
+        db.Index('idx_elections_active', 'is_active'),
+    )
+
+
 class Candidate(db.Model):
     __tablename__ = 'candidates'
     id = db.Column(db.Integer, primary_key=True)
@@ -46,6 +53,184 @@ class Vote(db.Model):
     election_id = db.Column(db.Integer, db.ForeignKey('elections.id'), nullable=False)
     tx_hash = db.Column(db.String(200))
 
+    # receipt tracking (maintained by receipts.ReceiptTracker);
+    # 'queued' rows are reserved by /vote and not yet broadcast (vote_queue.VoteQueue)
+    tx_status = db.Column(db.Enum('queued', 'pending', 'confirmed', 'failed', 'dropped', name='vote_tx_status'),
+                          default='pending', nullable=False)
+    block_number = db.Column(db.Integer, nullable=True)
+    gas_used = db.Column(db.Integer, nullable=True)
+    tx_error = db.Column(db.String(255), nullable=True)
+    retries = db.Column(db.Integer, default=0, nullable=False)
+    submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    confirmed_at = db.Column(db.DateTime, nullable=True)
+    queued_at = db.Column(db.DateTime, nullable=True)
+    # lease held by the submitter broadcasting it or the tracker re-sending it
+    locked_until = db.Column(db.DateTime, nullable=True)
+    # retryable revert: the tracker re-sends once this has passed
+    next_retry_at = db.Column(db.DateTime, nullable=True)
+
+    user = db.relationship('User', backref=db.backref('votes', lazy=True))
+
     __table_args__ = (
         db.UniqueConstraint('user_id', 'election_id', name='unique_vote'),
+        db.Index('idx_votes_tx_hash', 'tx_hash'),
+        db.Index('idx_votes_tx_status', 'tx_status'),
+        # covers the per-election GROUP BY candidate tally without touching rows
+        db.Index('idx_votes_election_candidate', 'election_id', 'candidate_id', 'tx_status'),
+        db.Index('idx_votes_candidate', 'candidate_id'),
+    )
+
+
+class OnboardingJob(db.Model):
+    __tablename__ = 'onboarding_jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=False)
+    # fund -> register -> confirm -> done (or failed once attempts run out)
+    step = db.Column(db.Enum('fund', 'register', 'confirm', 'done', 'failed', name='onboarding_step'),
+                     default='fund', nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    fund_tx_hash = db.Column(db.String(200))
+    register_tx_hash = db.Column(db.String(200))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = db.relationship('User', backref=db.backref('onboarding', uselist=False))
+
+    __table_args__ = (
+        db.Index('idx_onboarding_step', 'step'),
+    )
+
+
+# --------------------------------------------------------------------------
+# Local read-model of contract events (maintained by indexer.EventIndexer)
+# --------------------------------------------------------------------------
+class IndexerState(db.Model):
+    __tablename__ = 'indexer_state'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    contract_address = db.Column(db.String(42))
+    last_block = db.Column(db.Integer, nullable=False, default=-1)
+    last_block_hash = db.Column(db.String(66))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ChainEvent(db.Model):
+    __tablename__ = 'chain_events'
+    id = db.Column(db.Integer, primary_key=True)
+    event = db.Column(db.String(32), nullable=False)
+    voter_address = db.Column(db.String(42), nullable=False)
+    candidate_number = db.Column(db.Integer, nullable=True)
+    block_number = db.Column(db.Integer, nullable=False)
+    block_hash = db.Column(db.String(66), nullable=False)
+    tx_hash = db.Column(db.String(66), nullable=False)
+    log_index = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('tx_hash', 'log_index', name='unique_chain_event'),
+        db.Index('idx_chain_events_voter', 'voter_address'),
+        db.Index('idx_chain_events_block', 'block_number'),
+    )
+
+
+class ChainTally(db.Model):
+    __tablename__ = 'chain_tallies'
+    candidate_number = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    vote_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ChainVoter(db.Model):
+    __tablename__ = 'chain_voters'
+    address = db.Column(db.String(42), primary_key=True)
+    registered = db.Column(db.Boolean, nullable=False, default=False)
+    has_voted = db.Column(db.Boolean, nullable=False, default=False)
+    candidate_number = db.Column(db.Integer, nullable=True)
+    vote_block = db.Column(db.Integer, nullable=True)
+
+
+class CacheVersion(db.Model):
+    # bumped by admin changes so every worker's in-process caches reload
+    __tablename__ = 'cache_versions'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class AuditLeaf(db.Model):
+    # append-only Merkle leaves, one per recorded vote (audit.AuditLog)
+    __tablename__ = 'audit_leaves'
+    id = db.Column(db.Integer, primary_key=True)
+    election_id = db.Column(db.Integer, db.ForeignKey('elections.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    vote_id = db.Column(db.Integer, db.ForeignKey('votes.id'), unique=True, nullable=False)
+    # exactly what was hashed, so proofs hold even if the vote row changes later
+    leaf_data = db.Column(db.String(255), nullable=True)
+    leaf_hash = db.Column(db.String(64), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('election_id', 'position', name='unique_audit_position'),
+    )
+
+
+class AuditNode(db.Model):
+    # complete subtrees only: (level, node_index) covers leaves
+    # [node_index * 2**level, (node_index + 1) * 2**level)
+    __tablename__ = 'audit_nodes'
+    election_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    level = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    node_index = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    hash = db.Column(db.String(64), nullable=False)
+
+
+class AuditRoot(db.Model):
+    __tablename__ = 'audit_roots'
+    id = db.Column(db.Integer, primary_key=True)
+    election_id = db.Column(db.Integer, db.ForeignKey('elections.id'), nullable=False)
+    tree_size = db.Column(db.Integer, nullable=False)
+    root = db.Column(db.String(64), nullable=False)
+    anchor_tx_hash = db.Column(db.String(66), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_audit_roots_election', 'election_id'),
+    )
+
+
+class PoolAccount(db.Model):
+    # pre-created voter accounts (account_pool.AccountPool):
+    # fund -> register -> confirm -> ready -> claimed (or failed once attempts run out)
+    __tablename__ = 'account_pool'
+    id = db.Column(db.Integer, primary_key=True)
+    address = db.Column(db.String(255), unique=True, nullable=False)
+    private_key = db.Column(db.String(255), nullable=False)
+    state = db.Column(db.Enum('fund', 'register', 'confirm', 'ready', 'claimed', 'failed', name='pool_account_state'),
+                      default='fund', nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    fund_tx_hash = db.Column(db.String(200))
+    register_tx_hash = db.Column(db.String(200))
+    last_error = db.Column(db.Text)
+    # when the last fund/register tx went out (drop timeout) and the failure backoff
+    submitted_at = db.Column(db.DateTime, nullable=True)
+    next_attempt_at = db.Column(db.DateTime, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    ready_at = db.Column(db.DateTime, nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_account_pool_state', 'state'),
     )
+
+
+class ImportJob(db.Model):
+    # admin voter uploads (voter_import.VoterImporter); in the DB so any worker can report on them
+    __tablename__ = 'import_jobs'
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.Enum('running', 'done', 'failed', name='import_job_status'),
+                       default='running', nullable=False)
+    stats = db.Column(db.Text)  # JSON, updated after every chunk
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
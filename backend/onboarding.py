@@ -0,0 +1,222 @@
+import threading
+from datetime import datetime, timedelta
+from models import db, OnboardingJob
+
+ACTIVE_STEPS = ('fund', 'register', 'confirm')
+# how long a claimed job stays invisible to other workers
+LEASE_SECONDS = 60
+MAX_BACKOFF_SECONDS = 300
+
+
+class OnboardingWorker:
+    """
+    Background queue that funds new voters and registers them on the contract.
+    - /register only inserts an OnboardingJob row; worker threads drain the table.
+    - Jobs are claimed with a conditional UPDATE so several threads or processes
+      can share the same table without double-sending.
+    - Due register steps are claimed together and sent through registerVoters,
+      so one transaction registers up to ONBOARDING_REGISTER_BATCH voters.
+    - Failed steps are retried with exponential backoff until max attempts.
+    """
+    def __init__(self, app=None, bc=None):
+        self.app = None
+        self.bc = None
+        self._threads = []
+        self._wake = threading.Event()
+        if app:
+            self.init_app(app, bc)
+
+    def init_app(self, app, bc):
+        self.app = app
+        self.bc = bc
+        self.workers = app.config.get('ONBOARDING_WORKERS', 2)
+        self.max_attempts = app.config.get('ONBOARDING_MAX_ATTEMPTS', 8)
+        self.backoff = app.config.get('ONBOARDING_BACKOFF_SECONDS', 2)
+        self.poll_interval = app.config.get('ONBOARDING_POLL_INTERVAL', 1)
+        self.funding_ether = app.config.get('VOTER_FUNDING_ETHER', 1)
+        self.register_batch = app.config.get('ONBOARDING_REGISTER_BATCH', 100)
+
+    # --------------------------------------------------------------------------
+    # PRODUCER SIDE
+    # --------------------------------------------------------------------------
+    def enqueue(self, user):
+        """Add an onboarding job for user to the current session (caller commits)."""
+        job = OnboardingJob(user=user, step='fund')
+        db.session.add(job)
+        return job
+
+    def notify(self):
+        self._wake.set()
+
+    # --------------------------------------------------------------------------
+    # WORKERS
+    # --------------------------------------------------------------------------
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name='onboarding-%d' % i, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    worked = self.run_once()
+            except Exception:
+                self.app.logger.exception("Onboarding worker crashed; continuing")
+                worked = False
+            if not worked:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def run_once(self):
+        """Claim and process due jobs. Returns False when the queue is idle."""
+        # register steps accumulate while funding is in progress and go out as
+        # registerVoters chunks once a full batch is due or nothing else is
+        full_batch = self._due().filter(OnboardingJob.step == 'register').count() >= self.register_batch
+        jobs = [] if full_batch else self._claim(('fund', 'confirm'))
+        if jobs:
+            self._process(jobs[0])
+            return True
+        jobs = self._claim(('register',), limit=self.register_batch)
+        if not jobs:
+            return False
+        self._register_batch(jobs)
+        return True
+
+    def _due(self, now=None):
+        now = now or datetime.utcnow()
+        return OnboardingJob.query.filter(
+            OnboardingJob.next_attempt_at <= now,
+            db.or_(OnboardingJob.locked_until.is_(None), OnboardingJob.locked_until < now))
+
+    def _claim(self, steps=ACTIVE_STEPS, limit=1):
+        now = datetime.utcnow()
+        due = (self._due(now)
+               .filter(OnboardingJob.step.in_(steps))
+               .order_by(OnboardingJob.next_attempt_at)
+               .with_entities(OnboardingJob.id)
+               .limit(limit + 4)
+               .all())
+        claimed_ids = []
+        for (job_id,) in due:
+            claimed = (OnboardingJob.query
+                       .filter(OnboardingJob.id == job_id,
+                               db.or_(OnboardingJob.locked_until.is_(None), OnboardingJob.locked_until < now))
+                       .update({'locked_until': now + timedelta(seconds=LEASE_SECONDS)},
+                               synchronize_session=False))
+            if claimed:
+                claimed_ids.append(job_id)
+                if len(claimed_ids) >= limit:
+                    break
+        db.session.commit()
+        return [db.session.get(OnboardingJob, job_id) for job_id in claimed_ids]
+
+    def _process(self, job):
+        admin_key = self.app.config.get('PRIVATE_KEY')
+        address = job.user.blockchain_address
+        try:
+            if job.step == 'fund':
+                value = self.bc.w3.to_wei(self.funding_ether, 'ether')
+                job.fund_tx_hash = self.bc.send_value(admin_key, address, value)
+                job.step = 'register'
+                self._succeeded(job)
+            elif job.step == 'register':
+                # without a deployed contract there is nothing to register against
+                if self.bc.contract:
+                    job.register_tx_hash = self.bc.register_voter(admin_key, address)
+                job.step = 'confirm'
+                self._succeeded(job)
+            elif job.step == 'confirm':
+                if self._confirm(job):
+                    job.step = 'done'
+                    self._succeeded(job)
+                else:
+                    # still waiting on a receipt: look again later, not a failed attempt
+                    job.next_attempt_at = datetime.utcnow() + timedelta(seconds=self.poll_interval)
+        except Exception as e:
+            self._failed(job, e)
+        job.locked_until = None
+        db.session.commit()
+
+    def _register_batch(self, jobs):
+        """Register every claimed job's address with as few registerVoters txs as fit."""
+        admin_key = self.app.config.get('PRIVATE_KEY')
+        if not self.bc.contract:
+            results = []
+        else:
+            try:
+                results = self.bc.register_voters(admin_key, [job.user.blockchain_address for job in jobs])
+            except Exception as e:
+                results = [{'addresses': [job.user.blockchain_address for job in jobs],
+                            'tx_hash': None, 'error': str(e)}]
+        by_address = {address.lower(): result for result in results for address in result['addresses']}
+        for job in jobs:
+            result = by_address.get(job.user.blockchain_address.lower())
+            if result and result['error']:
+                self._failed(job, result['error'])
+            else:
+                job.register_tx_hash = result['tx_hash'] if result else None
+                job.step = 'confirm'
+                self._succeeded(job)
+            job.locked_until = None
+        db.session.commit()
+
+    def _succeeded(self, job):
+        job.attempts = 0
+        job.last_error = None
+        job.next_attempt_at = datetime.utcnow()
+
+    def _failed(self, job, error):
+        job.attempts += 1
+        job.last_error = str(error)[:1000]
+        if job.attempts >= self.max_attempts:
+            job.step = 'failed'
+            self.app.logger.warning("Onboarding failed for user %s: %s", job.user_id, error)
+        else:
+            delay = min(self.backoff * 2 ** (job.attempts - 1), MAX_BACKOFF_SECONDS)
+            job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+    def _confirm(self, job):
+        """True once both txs are mined and succeeded, False while one is still pending."""
+        for label, tx_hash in (('funding', job.fund_tx_hash), ('registerVoter', job.register_tx_hash)):
+            if not tx_hash:
+                continue
+            receipt = self.bc.get_receipt(tx_hash)
+            if receipt is None:
+                return False
+            if receipt['status'] != 1:
+                # a reverted tx has to be sent again from its own step
+                if label == 'funding':
+                    job.step = 'fund'
+                    job.fund_tx_hash = None
+                else:
+                    job.step = 'register'
+                    job.register_tx_hash = None
+                raise RuntimeError('%s tx %s reverted' % (label, tx_hash))
+        return True
+
+    # --------------------------------------------------------------------------
+    # STATUS
+    # --------------------------------------------------------------------------
+    def stats(self):
+        rows = (db.session.query(OnboardingJob.step, db.func.count(OnboardingJob.id))
+                .group_by(OnboardingJob.step).all())
+        return {step: count for step, count in rows}
+
+
+def job_to_dict(job):
+    return {
+        'user_id': job.user_id,
+        'username': job.user.username if job.user else None,
+        'blockchain_address': job.user.blockchain_address if job.user else None,
+        'step': job.step,
+        'attempts': job.attempts,
+        'next_attempt_at': job.next_attempt_at.isoformat() if job.next_attempt_at else None,
+        'fund_tx_hash': job.fund_tx_hash,
+        'register_tx_hash': job.register_tx_hash,
+        'last_error': job.last_error,
+        'updated_at': job.updated_at.isoformat() if job.updated_at else None,
+    }
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+from flask_login import UserMixin
+from models import db, User
+from database import primary
+
+
+class Principal(UserMixin):
+    """Slim read-only stand-in for User as current_user (no password hash or key)."""
+    __slots__ = ('id', 'username', 'role', 'blockchain_address')
+
+    def __init__(self, id, username, role, blockchain_address):
+        object.__setattr__(self, 'id', id)
+        object.__setattr__(self, 'username', username)
+        object.__setattr__(self, 'role', role)
+        object.__setattr__(self, 'blockchain_address', blockchain_address)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Principal is read-only')
+
+    def __repr__(self):
+        return '<Principal %s %s>' % (self.id, self.role)
+
+
+class PrincipalCache:
+    """
+    LRU + TTL cache behind Flask-Login's user_loader.
+    - Stores Principal objects loaded with a column-only query on the primary:
+      a lagging replica would cache a stale role for the whole TTL (a miss is
+      at most one small query per user per TTL).
+    - invalidate(user_id) drops an entry after a role change in this process;
+      other workers pick the change up once their entry's TTL runs out.
+    """
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0}
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_size = app.config.get('PRINCIPAL_CACHE_SIZE', 10000)
+        self.ttl = app.config.get('PRINCIPAL_CACHE_TTL', 60)
+
+    def load(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                principal, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(user_id)
+                    self._stats['hits'] += 1
+                    return principal
+                del self._entries[user_id]
+                self._stats['expired'] += 1
+            self._stats['misses'] += 1
+
+        query = (db.session.query(User.id, User.username, User.role, User.blockchain_address)
+                 .filter(User.id == user_id))
+        with primary():
+            row = query.first()
+        if row is None:
+            return None
+        principal = Principal(*row)
+        with self._lock:
+            self._entries[user_id] = (principal, now + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return principal
+
+    def invalidate(self, user_id):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self._stats['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data['size'] = len(self._entries)
+            data['max_size'] = self.max_size
+            data['ttl'] = self.ttl
+        lookups = data['hits'] + data['misses']
+        data['hit_rate'] = round(data['hits'] / lookups, 4) if lookups else None
+        return data
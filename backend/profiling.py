@@ -0,0 +1,236 @@
+import heapq
+import itertools
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PHASES = ('db', 'rpc', 'crypto', 'render')
+
+# per-thread phase accounting for the request being profiled (None = not profiling)
+_local = threading.local()
+
+
+@contextmanager
+def phase(name):
+    """
+    Attribute the enclosed time to `name` for the current request's breakdown.
+    Phases are exclusive: time in a nested phase is taken out of its parent.
+    A no-op outside profiled requests.
+    """
+    _begin(name)
+    try:
+        yield
+    finally:
+        _end(name)
+
+
+def _begin(name):
+    if getattr(_local, 'timings', None) is None:
+        return
+    _local.stack.append(name)
+    _local.starts.append(time.perf_counter())
+
+
+def _end(name):
+    if getattr(_local, 'timings', None) is None or not _local.stack:
+        return
+    elapsed = time.perf_counter() - _local.starts.pop()
+    _local.stack.pop()
+    timings = _local.timings
+    timings[name] = timings.get(name, 0.0) + elapsed
+    if _local.stack:
+        timings[_local.stack[-1]] = timings.get(_local.stack[-1], 0.0) - elapsed
+
+
+class RequestProfiler:
+    """
+    Opt-in (PROFILING_ENABLED) per-request timing breakdown.
+    - Wall time is split into db (SQLAlchemy cursor executes), rpc (JSON-RPC
+      round trips), crypto (password hashing, signing, key generation),
+      render (Jinja templates) and app (everything else).
+    - Each response gets a Server-Timing header; per-endpoint histograms per
+      phase are kept for /admin/stats and /metrics.
+    - With PROFILING_SAMPLING, a sampler thread records stacks of requests to
+      PROFILING_SAMPLE_ENDPOINTS every PROFILING_SAMPLE_INTERVAL seconds and keeps
+      the slowest PROFILING_KEEP_SLOWEST per endpoint as folded stacks
+      (flamegraph.pl / speedscope input) under /admin/profiles.
+    """
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._slowest = {}
+        self._active = {}
+        self._ids = itertools.count(1)
+        self._sampler = None
+        self.enabled = False
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        self.sampling = app.config.get('PROFILING_SAMPLING', False)
+        self.sample_interval = app.config.get('PROFILING_SAMPLE_INTERVAL', 0.005)
+        self.keep_slowest = app.config.get('PROFILING_KEEP_SLOWEST', 10)
+        self.sample_endpoints = set(app.config.get('PROFILING_SAMPLE_ENDPOINTS') or ())
+        if not self.enabled:
+            return
+
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.teardown_request(self._teardown)
+        before_render_template.connect(lambda *a, **kw: _begin('render'), app, weak=False)
+        template_rendered.connect(lambda *a, **kw: _end('render'), app, weak=False)
+        event.listen(Engine, 'before_cursor_execute', self._before_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_execute)
+        if self.sampling:
+            self._sampler = threading.Thread(target=self._sample_loop, name='request-sampler', daemon=True)
+            self._sampler.start()
+
+    # --------------------------------------------------------------------------
+    # REQUEST HOOKS
+    # --------------------------------------------------------------------------
+    def _before(self):
+        _local.timings = {}
+        _local.stack = []
+        _local.starts = []
+        _local.queries = 0
+        g._profile_start = time.perf_counter()
+        if self.sampling and request.endpoint in self.sample_endpoints:
+            with self._lock:
+                self._active[threading.get_ident()] = Counter()
+
+    @staticmethod
+    def _before_execute(*args):
+        if getattr(_local, 'timings', None) is not None:
+            _local.queries += 1
+            _begin('db')
+
+    @staticmethod
+    def _after_execute(*args):
+        _end('db')
+
+    def _after(self, response):
+        timings = getattr(_local, 'timings', None)
+        start = g.get('_profile_start')
+        if timings is None or start is None:
+            return response
+        total = time.perf_counter() - start
+        breakdown = {name: timings.get(name, 0.0) for name in PHASES}
+        breakdown['app'] = max(0.0, total - sum(breakdown.values()))
+
+        parts = ['%s;dur=%.2f' % (name, seconds * 1000) for name, seconds in breakdown.items()]
+        parts[0] += ';desc="%d queries"' % _local.queries
+        parts.append('total;dur=%.2f' % (total * 1000))
+        response.headers['Server-Timing'] = ', '.join(parts)
+
+        endpoint = request.endpoint or 'unknown'
+        self._record(endpoint, breakdown, total)
+        return response
+
+    def _teardown(self, exc=None):
+        stacks = None
+        with self._lock:
+            stacks = self._active.pop(threading.get_ident(), None)
+        start = g.get('_profile_start')
+        if stacks is not None and start is not None:
+            self._keep_profile(request.endpoint, time.perf_counter() - start, stacks)
+        _local.timings = None
+
+    # --------------------------------------------------------------------------
+    # AGGREGATION
+    # --------------------------------------------------------------------------
+    def _record(self, endpoint, breakdown, total):
+        from rpc_metrics import Histogram
+        with self._lock:
+            for name, seconds in list(breakdown.items()) + [('total', total)]:
+                key = (endpoint, name)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram()
+                histogram.observe(seconds)
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(self.sample_interval)
+            with self._lock:
+                active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, stacks in active.items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append('%s (%s:%d)' % (code.co_name, code.co_filename.rsplit('/', 1)[-1],
+                                                 code.co_firstlineno))
+                    frame = frame.f_back
+                stacks[';'.join(reversed(names))] += 1
+
+    def _keep_profile(self, endpoint, duration, stacks):
+        entry = (duration, next(self._ids), {'endpoint': endpoint, 'duration_ms': round(duration * 1000, 3),
+                                             'samples': sum(stacks.values()), 'stacks': stacks,
+                                             'at': time.time()})
+        with self._lock:
+            heap = self._slowest.setdefault(endpoint, [])
+            if len(heap) < self.keep_slowest:
+                heapq.heappush(heap, entry)
+            elif duration > heap[0][0]:
+                heapq.heapreplace(heap, entry)
+
+    # --------------------------------------------------------------------------
+    # REPORTING
+    # --------------------------------------------------------------------------
+    def stats(self):
+        with self._lock:
+            endpoints = {}
+            for (endpoint, name), h in self._histograms.items():
+                endpoints.setdefault(endpoint, {})[name] = {
+                    'count': h.count,
+                    'avg_ms': round(h.sum / h.count * 1000, 3) if h.count else None,
+                    'p50_le': h.quantile(0.5),
+                    'p95_le': h.quantile(0.95),
+                    'p99_le': h.quantile(0.99),
+                }
+        return {'enabled': self.enabled, 'sampling': self.sampling, 'endpoints': endpoints}
+
+    def profiles(self, endpoint=None):
+        """Slowest sampled requests, slowest first (without their stacks)."""
+        with self._lock:
+            entries = [e for ep, heap in self._slowest.items() if endpoint in (None, ep) for e in heap]
+        entries.sort(key=lambda e: e[0], reverse=True)
+        return [dict({k: v for k, v in data.items() if k != 'stacks'}, id=profile_id)
+                for _, profile_id, data in entries]
+
+    def folded(self, profile_id):
+        """Folded stacks ("frame;frame;frame count" lines) for one kept profile."""
+        with self._lock:
+            for heap in self._slowest.values():
+                for _, entry_id, data in heap:
+                    if entry_id == profile_id:
+                        return ''.join('%s %d\n' % (stack, n) for stack, n in sorted(data['stacks'].items()))
+        return None
+
+    def render_prometheus(self, prefix='voting_request_phase'):
+        if not self.enabled:
+            return ''
+        lines = [
+            '# HELP %s_seconds Request wall time by endpoint and phase.' % prefix,
+            '# TYPE %s_seconds histogram' % prefix,
+        ]
+        with self._lock:
+            for (endpoint, name), h in sorted(self._histograms.items()):
+                labels = 'endpoint="%s",phase="%s"' % (endpoint, name)
+                for bound, total in h.cumulative():
+                    lines.append('%s_seconds_bucket{%s,le="%s"} %d' % (prefix, labels, bound, total))
+                lines.append('%s_seconds_sum{%s} %.6f' % (prefix, labels, h.sum))
+                lines.append('%s_seconds_count{%s} %d' % (prefix, labels, h.count))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,112 @@
+import threading
+import time
+import requests
+from aiohttp import ClientTimeout
+from requests.adapters import HTTPAdapter
+from web3 import Web3, AsyncHTTPProvider
+from web3.providers import JSONBaseProvider
+
+# errors that mean "this node is unreachable", as opposed to a JSON-RPC error
+FAILOVER_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+def build_session(config):
+    """requests.Session with a sized keep-alive connection pool."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=config.get('WEB3_POOL_CONNECTIONS', 4),
+        pool_maxsize=config.get('WEB3_POOL_SIZE', 20),
+        pool_block=config.get('WEB3_POOL_BLOCK', False),
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def build_provider(config, metrics=None):
+    """
+    Provider for config['WEB3_PROVIDER'].
+    - A single URL gives a pooled keep-alive HTTPProvider.
+    - A comma-separated list gives a FailoverHTTPProvider over those URLs.
+    """
+    urls = [u.strip() for u in (config.get('WEB3_PROVIDER') or '').split(',') if u.strip()]
+    session = build_session(config)
+    request_kwargs = {'timeout': (config.get('WEB3_CONNECT_TIMEOUT', 3), config.get('WEB3_READ_TIMEOUT', 10))}
+    if len(urls) <= 1:
+        return Web3.HTTPProvider(urls[0] if urls else None, request_kwargs=request_kwargs, session=session)
+    return FailoverHTTPProvider(urls, request_kwargs, session,
+                                cooldown=config.get('WEB3_FAILOVER_COOLDOWN', 30), metrics=metrics)
+
+
+def build_async_provider(config):
+    """
+    AsyncHTTPProvider for the first URL in config['WEB3_PROVIDER'] (no failover:
+    async callers are expected to be the fan-out paths, the sync client keeps
+    serving background work).
+    """
+    urls = [u.strip() for u in (config.get('WEB3_PROVIDER') or '').split(',') if u.strip()]
+    timeout = ClientTimeout(connect=config.get('WEB3_CONNECT_TIMEOUT', 3),
+                            sock_read=config.get('WEB3_READ_TIMEOUT', 10))
+    return AsyncHTTPProvider(urls[0] if urls else None, request_kwargs={'timeout': timeout})
+
+
+class FailoverHTTPProvider(JSONBaseProvider):
+    """
+    Sends each request to the first healthy URL in order.
+    - A connection error or timeout marks that URL down for `cooldown` seconds
+      and the request moves on to the next URL.
+    - When every URL is down the least recently failed one is tried anyway.
+    """
+    def __init__(self, urls, request_kwargs, session, cooldown=30, metrics=None):
+        super().__init__()
+        # each child gets no retries of its own; moving to the next node is the retry
+        self.providers = [Web3.HTTPProvider(url, request_kwargs=request_kwargs, session=session,
+                                            exception_retry_configuration=None)
+                          for url in urls]
+        self.cooldown = cooldown
+        self.metrics = metrics
+        self._down_until = [0.0] * len(urls)
+        self._lock = threading.Lock()
+
+    @property
+    def endpoint_uri(self):
+        return self.providers[self._order()[0]].endpoint_uri
+
+    def __str__(self):
+        return 'Failover RPC connection %s' % ', '.join(p.endpoint_uri for p in self.providers)
+
+    def _order(self):
+        now = time.time()
+        with self._lock:
+            healthy = [i for i, until in enumerate(self._down_until) if until <= now]
+            if healthy:
+                return healthy
+            return sorted(range(len(self.providers)), key=lambda i: self._down_until[i])
+
+    def _call(self, fn):
+        last_error = None
+        for attempt, index in enumerate(self._order()):
+            if attempt and self.metrics:
+                self.metrics.record_failover()
+            try:
+                return fn(self.providers[index])
+            except FAILOVER_ERRORS as e:
+                last_error = e
+                with self._lock:
+                    self._down_until[index] = time.time() + self.cooldown
+        raise last_error
+
+    def make_request(self, method, params):
+        return self._call(lambda provider: provider.make_request(method, params))
+
+    def make_batch_request(self, requests_info):
+        return self._call(lambda provider: provider.make_batch_request(requests_info))
+
+    def is_connected(self, show_traceback=False):
+        return any(provider.is_connected() for provider in self.providers)
+
+    def status(self):
+        now = time.time()
+        with self._lock:
+            return [{'url': provider.endpoint_uri, 'healthy': until <= now}
+                    for provider, until in zip(self.providers, self._down_until)]
@@ -0,0 +1,230 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from models import db, Vote
+
+# reverts that can succeed later (e.g. onboarding has not registered the voter yet)
+RETRYABLE_REVERTS = ('not registered',)
+# how long a tracker may take to re-send a claimed vote before another one can
+LEASE_SECONDS = 60
+MAX_RETRY_BACKOFF_SECONDS = 300
+
+
+def _int(value):
+    if value is None:
+        return None
+    return int(value, 16) if isinstance(value, str) else int(value)
+
+
+class ReceiptTracker:
+    """
+    Follows cast-vote transactions until they are mined, reverted or dropped.
+    - Runs once per new block and pages through every pending vote by id,
+      RECEIPT_BATCH_SIZE hashes per batched eth_getTransactionReceipt request.
+    - Mined votes get status, block number and gas used recorded on the Vote row.
+    - Reverted votes get their revert reason; "Not registered" and dropped
+      transactions are re-sent up to VOTE_MAX_RETRIES, anything else is flagged.
+      "Not registered" re-sends wait RECEIPT_RETRY_BACKOFF_SECONDS, doubling per
+      retry (next_retry_at), to give onboarding time to register the voter.
+    - Every write is a conditional UPDATE on the (tx_hash, retries) it read and a
+      re-send is first claimed with a lease (locked_until), so trackers in
+      several processes never send a vote twice or overwrite a newer tx_hash.
+    """
+    def __init__(self, app=None, bc=None, block_source=None):
+        self.bc = None
+        self.listeners = []
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {'passes': 0, 'checked': 0, 'confirmed': 0, 'failed': 0, 'dropped': 0, 'resent': 0,
+                       'deferred': 0, 'confirm_seconds_total': 0.0}
+        if app:
+            self.init_app(app, bc, block_source)
+
+    def init_app(self, app, bc, block_source=None):
+        self.app = app
+        self.bc = bc
+        self.block_source = block_source or (lambda: bc.w3.eth.block_number)
+        self.batch_size = app.config.get('RECEIPT_BATCH_SIZE', 200)
+        self.poll_interval = app.config.get('RECEIPT_POLL_INTERVAL', 1)
+        self.drop_after = app.config.get('RECEIPT_DROP_AFTER_SECONDS', 300)
+        self.max_retries = app.config.get('VOTE_MAX_RETRIES', 3)
+        self.retry_backoff = app.config.get('RECEIPT_RETRY_BACKOFF_SECONDS', 5)
+
+    # --------------------------------------------------------------------------
+    # BACKGROUND LOOP
+    # --------------------------------------------------------------------------
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name='receipt-tracker', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        last_block = None
+        while True:
+            try:
+                block = self.block_source()
+                if block is not None and block != last_block:
+                    with self.app.app_context():
+                        self.run_once()
+                    last_block = block
+            except Exception:
+                self.app.logger.exception("Receipt tracker pass failed")
+            time.sleep(self.poll_interval)
+
+    # --------------------------------------------------------------------------
+    # TRACKING
+    # --------------------------------------------------------------------------
+    def run_once(self):
+        """Check every pending vote, one batch at a time. Returns the number of votes checked."""
+        checked, after_id = 0, 0
+        while True:
+            count, after_id = self._check_batch(after_id)
+            checked += count
+            if count < self.batch_size:
+                break
+        with self._lock:
+            self._stats['passes'] += 1
+        return checked
+
+    def _check_batch(self, after_id):
+        """Check the next batch of pending votes with id > after_id. Returns (checked, last id)."""
+        # plain rows: every write below is conditional on the values read here
+        now = datetime.utcnow()
+        votes = (db.session.query(Vote.id, Vote.tx_hash, Vote.retries, Vote.submitted_at, Vote.next_retry_at)
+                 .filter(Vote.id > after_id, Vote.tx_status == 'pending', Vote.tx_hash.isnot(None),
+                         db.or_(Vote.locked_until.is_(None), Vote.locked_until < now),
+                         db.or_(Vote.next_retry_at.is_(None), Vote.next_retry_at <= now))
+                 .order_by(Vote.id)
+                 .limit(self.batch_size)
+                 .all())
+        if not votes:
+            return 0, after_id
+
+        receipts = self.bc.get_receipts([v.tx_hash for v in votes])
+        unmined = [v for v in votes if receipts.get(v.tx_hash) is None
+                   and v.submitted_at and now - v.submitted_at > timedelta(seconds=self.drop_after)]
+        known = self.bc.get_transactions([v.tx_hash for v in unmined]) if unmined else {}
+
+        confirmed = 0
+        for vote in votes:
+            receipt = receipts.get(vote.tx_hash)
+            if receipt is not None:
+                confirmed += self._record_receipt(vote, receipt, now)
+            elif vote in unmined and known.get(vote.tx_hash) is None:
+                self._record_failure(vote, 'dropped', 'transaction dropped from mempool')
+        db.session.commit()
+
+        if confirmed:
+            for listener in self.listeners:
+                listener(confirmed)
+
+        with self._lock:
+            self._stats['checked'] += len(votes)
+        return len(votes), votes[-1].id
+
+    @staticmethod
+    def _update(vote_id, tx_hash, retries, values):
+        """
+        UPDATE the vote only if it is still pending with this tx_hash and retry
+        count, so trackers in other processes never overwrite each other.
+        """
+        return (Vote.query
+                .filter(Vote.id == vote_id, Vote.tx_status == 'pending', Vote.tx_hash == tx_hash,
+                        Vote.retries == retries)
+                .update(values, synchronize_session=False)) == 1
+
+    def _record_receipt(self, vote, receipt, now):
+        """Returns True when this call confirmed the vote."""
+        values = {'block_number': _int(receipt.get('blockNumber')), 'gas_used': _int(receipt.get('gasUsed'))}
+        if _int(receipt.get('status')) == 1:
+            values.update(tx_status='confirmed', confirmed_at=now, tx_error=None)
+            if not self._update(vote.id, vote.tx_hash, vote.retries, values):
+                return False
+            with self._lock:
+                self._stats['confirmed'] += 1
+                if vote.submitted_at:
+                    self._stats['confirm_seconds_total'] += (now - vote.submitted_at).total_seconds()
+            return True
+        try:
+            reason = self.bc.get_revert_reason(vote.tx_hash) or 'reverted'
+        except Exception:
+            reason = 'reverted'
+        self._record_failure(vote, 'failed', reason, values)
+        return False
+
+    def _record_failure(self, vote, status, reason, values=None):
+        retries = vote.retries
+        retryable = status == 'dropped' or any(r in reason.lower() for r in RETRYABLE_REVERTS)
+        if retryable and retries < self.max_retries:
+            if status == 'failed' and vote.next_retry_at is None:
+                # the receipt stays reverted; look again once the backoff has passed
+                delay = min(self.retry_backoff * 2 ** retries, MAX_RETRY_BACKOFF_SECONDS)
+                self._update(vote.id, vote.tx_hash, retries,
+                             dict(values or {}, next_retry_at=datetime.utcnow() + timedelta(seconds=delay)))
+                with self._lock:
+                    self._stats['deferred'] += 1
+                return
+            if not self._claim(vote):
+                # another tracker has already re-sent or settled it
+                return
+            retries += 1
+            if self._resend(vote, dropped=status == 'dropped'):
+                return
+        values = dict(values or {}, tx_status=status, tx_error=reason[:255], locked_until=None)
+        if not self._update(vote.id, vote.tx_hash, retries, values):
+            return
+        with self._lock:
+            self._stats[status] += 1
+        self.app.logger.warning("Vote %s %s: %s", vote.id, status, reason)
+
+    def _claim(self, vote):
+        """Take the re-send of this tx (retries + 1), committed before anything is broadcast."""
+        claimed = self._update(vote.id, vote.tx_hash, vote.retries,
+                               {'retries': Vote.retries + 1,
+                                'locked_until': datetime.utcnow() + timedelta(seconds=LEASE_SECONDS)})
+        db.session.commit()
+        return claimed
+
+    def _resend(self, vote, dropped=False):
+        """Re-send a claimed vote (its retries already counted); releases the lease when sent."""
+        row = db.session.get(Vote, vote.id)
+        user = row.user
+        try:
+            if dropped:
+                # its nonce was never used, so start again from the chain's count
+                self.bc.nonces.resync(user.blockchain_address)
+            tx_hash = self.bc.cast_vote(user.blockchain_private_key, row.candidate.candidate_number,
+                                        user.blockchain_address)
+        except Exception as e:
+            self.app.logger.warning("Re-sending vote %s failed: %s", vote.id, e)
+            return False
+        self._update(vote.id, vote.tx_hash, vote.retries + 1,
+                     {'tx_hash': tx_hash, 'submitted_at': datetime.utcnow(), 'block_number': None,
+                      'gas_used': None, 'locked_until': None, 'next_retry_at': None})
+        with self._lock:
+            self._stats['resent'] += 1
+        return True
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+        confirmed = data.pop('confirm_seconds_total')
+        data['avg_confirm_seconds'] = round(confirmed / data['confirmed'], 3) if data['confirmed'] else None
+        data['by_status'] = {status: count for status, count in
+                             db.session.query(Vote.tx_status, db.func.count(Vote.id)).group_by(Vote.tx_status)}
+        return data
+
+
+def vote_status_to_dict(vote):
+    return {
+        'tx_hash': vote.tx_hash,
+        'status': vote.tx_status,
+        'block_number': vote.block_number,
+        'gas_used': vote.gas_used,
+        'error': vote.tx_error,
+        'retries': vote.retries,
+        'queued_at': vote.queued_at.isoformat() if vote.queued_at else None,
+        'submitted_at': vote.submitted_at.isoformat() if vote.submitted_at else None,
+        'confirmed_at': vote.confirmed_at.isoformat() if vote.confirmed_at else None,
+    }
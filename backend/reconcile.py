@@ -0,0 +1,189 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from web3 import Web3
+from models import db, User, Vote, OnboardingJob, Election
+
+IN_FLIGHT_STATUSES = ('queued', 'pending')
+ONBOARDING_STEPS = ('fund', 'register', 'confirm')
+
+
+def _selector(signature):
+    return Web3.keccak(text=signature)[:4].hex().removeprefix('0x')
+
+
+# public mapping getters, both (address) -> bool
+REGISTERED_SELECTOR = _selector('registeredVoter(address)')
+VOTED_SELECTOR = _selector('hasVoted(address)')
+
+
+def _calldata(selector, address):
+    return '0x' + selector + address[2:].lower().rjust(64, '0')
+
+
+def _bool(result):
+    return None if result is None else int(result, 16) != 0
+
+
+class Reconciler:
+    """
+    DB-versus-chain audit of every voter's registration and vote.
+    - Voters stream from the DB in keyset pages of RECONCILE_PAGE_SIZE (id
+      order), each with its vote in the election and its onboarding step.
+    - Chain state is read with registeredVoter/hasVoted eth_calls pinned to one
+      block, RECONCILE_BATCH_SIZE addresses per JSON-RPC batch, on a pool of
+      RECONCILE_WORKERS threads; the next page is read while a page's batches
+      are in flight.
+    - Mismatches are appended to a JSONL report; after each page the last
+      user id and running totals go to a checkpoint file so a run can resume.
+    - hasVoted is one flag per deployment, not per election: a chain vote
+      without a confirmed DB vote is only a mismatch for the first election.
+      For later ones it is counted as voted_on_chain_unattributed instead
+      (see admin_tally).
+    """
+    def __init__(self, app=None, bc=None):
+        if app:
+            self.init_app(app, bc)
+
+    def init_app(self, app, bc):
+        self.app = app
+        self.bc = bc
+        self.page_size = app.config.get('RECONCILE_PAGE_SIZE', 5000)
+        self.batch_size = app.config.get('RECONCILE_BATCH_SIZE', 250)
+        self.workers = app.config.get('RECONCILE_WORKERS', 8)
+
+    # --------------------------------------------------------------------------
+    # RUN
+    # --------------------------------------------------------------------------
+    def run(self, election_id, report_path, checkpoint_path=None, resume=False, progress=None):
+        """Audit every voter; returns the totals (also left in the checkpoint)."""
+        if not self.bc.contract:
+            raise RuntimeError("Contract not set")
+
+        state = self._load_checkpoint(checkpoint_path) if resume else None
+        if state and state['election_id'] != election_id:
+            raise ValueError("Checkpoint is for election %s" % state['election_id'])
+        if state is None:
+            state = {
+                'election_id': election_id,
+                'block': self.bc.w3.eth.block_number,
+                'last_user_id': 0,
+                'stats': {'users': 0, 'voted_in_db_not_on_chain': 0, 'voted_on_chain_not_in_db': 0,
+                          'voted_on_chain_unattributed': 0, 'unregistered': 0, 'in_flight': 0,
+                          'onboarding': 0, 'chain_errors': 0},
+                'seconds': 0.0,
+            }
+        if 'first_election' not in state:
+            state['first_election'] = election_id == db.session.query(db.func.min(Election.id)).scalar()
+        stats = state['stats']
+        stats.setdefault('voted_on_chain_unattributed', 0)
+        started = time.perf_counter() - state['seconds']
+
+        with open(report_path, 'a' if resume else 'w') as report, \
+                ThreadPoolExecutor(max_workers=self.workers) as pool:
+            page = self._page(election_id, state['last_user_id'])
+            while page:
+                futures = [pool.submit(self._check, page[i:i + self.batch_size], state['block'])
+                           for i in range(0, len(page), self.batch_size)]
+                next_page = self._page(election_id, page[-1][0])
+
+                for batch, future in zip(range(0, len(page), self.batch_size), futures):
+                    rows = page[batch:batch + self.batch_size]
+                    for row, (registered, voted) in zip(rows, future.result()):
+                        mismatch = self._classify(row, registered, voted, stats, state['first_election'])
+                        if mismatch:
+                            report.write(json.dumps(mismatch) + '\n')
+                report.flush()
+
+                stats['users'] += len(page)
+                state['last_user_id'] = page[-1][0]
+                state['seconds'] = time.perf_counter() - started
+                self._save_checkpoint(checkpoint_path, state)
+                if progress:
+                    progress(self._summary(state))
+                page = next_page
+
+        state['seconds'] = time.perf_counter() - started
+        self._save_checkpoint(checkpoint_path, state)
+        return self._summary(state)
+
+    def _page(self, election_id, after_id):
+        rows = (db.session.query(User.id, User.blockchain_address, Vote.id, Vote.tx_status, OnboardingJob.step)
+                .outerjoin(Vote, db.and_(Vote.user_id == User.id, Vote.election_id == election_id))
+                .outerjoin(OnboardingJob, OnboardingJob.user_id == User.id)
+                .filter(User.id > after_id, User.role == 'voter', User.blockchain_address.isnot(None))
+                .order_by(User.id)
+                .limit(self.page_size)
+                .all())
+        # end the read transaction between pages (see exports.iter_vote_audit_rows)
+        db.session.commit()
+        return rows
+
+    def _check(self, rows, block):
+        """[(registered, voted)] for one batch; None where the node returned no result."""
+        to = self.bc.contract_address
+        tag = hex(block)
+        calls = []
+        for row in rows:
+            calls.append(('eth_call', [{'to': to, 'data': _calldata(REGISTERED_SELECTOR, row[1])}, tag]))
+            calls.append(('eth_call', [{'to': to, 'data': _calldata(VOTED_SELECTOR, row[1])}, tag]))
+        results = self.bc.batch_rpc(calls)
+        return [(_bool(results[i]), _bool(results[i + 1])) for i in range(0, len(results), 2)]
+
+    @staticmethod
+    def _classify(row, registered, voted, stats, first_election=True):
+        user_id, address, vote_id, tx_status, step = row
+        base = {'user_id': user_id, 'address': address, 'vote_id': vote_id, 'tx_status': tx_status,
+                'onboarding': step, 'registered': registered, 'has_voted': voted}
+        if registered is None or voted is None:
+            stats['chain_errors'] += 1
+            return dict(base, kind='chain_error')
+        if tx_status in IN_FLIGHT_STATUSES:
+            # the receipt tracker has not settled it yet; either chain answer is fine
+            stats['in_flight'] += 1
+            return None
+        if tx_status == 'confirmed' and not voted:
+            stats['voted_in_db_not_on_chain'] += 1
+            return dict(base, kind='voted_in_db_not_on_chain')
+        if voted and tx_status != 'confirmed':
+            if not first_election:
+                # may be the voter's vote in an earlier election
+                stats['voted_on_chain_unattributed'] += 1
+                return None
+            stats['voted_on_chain_not_in_db'] += 1
+            return dict(base, kind='voted_on_chain_not_in_db')
+        if not registered:
+            if step in ONBOARDING_STEPS:
+                stats['onboarding'] += 1
+                return None
+            stats['unregistered'] += 1
+            return dict(base, kind='unregistered')
+        return None
+
+    # --------------------------------------------------------------------------
+    # CHECKPOINT
+    # --------------------------------------------------------------------------
+    @staticmethod
+    def _load_checkpoint(path):
+        if not path or not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _save_checkpoint(path, state):
+        if not path:
+            return
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _summary(state):
+        seconds = state['seconds']
+        return dict(state['stats'], election_id=state['election_id'], first_election=state['first_election'],
+                    block=state['block'],
+                    last_user_id=state['last_user_id'], seconds=round(seconds, 2),
+                    per_second=round(state['stats']['users'] / seconds, 1) if seconds else None)
@@ -0,0 +1,139 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class ResultsCache:
+    """
+    Cache for computed results keyed by the latest block number.
+    - Entries live in a local SQLite file so every gunicorn worker shares them.
+    - A block watcher thread records the chain head; a new block changes the key,
+      so cached results are recomputed at most once per block (or per TTL).
+    - invalidate() bumps a generation counter for changes that are not tied to a
+      block, e.g. candidate edits or a vote committed by this server.
+    """
+    def __init__(self, app=None, bc=None):
+        self.bc = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        if app:
+            self.init_app(app, bc)
+
+    def init_app(self, app, bc):
+        self.app = app
+        self.bc = bc
+        self.path = app.config.get('RESULTS_CACHE_PATH')
+        self.ttl = app.config.get('RESULTS_CACHE_TTL', 30)
+        self.max_entries = app.config.get('RESULTS_CACHE_MAX_ENTRIES', 64)
+        self.watch_interval = app.config.get('BLOCK_WATCH_INTERVAL', 1)
+        self._conn()
+
+    # --------------------------------------------------------------------------
+    # STORAGE
+    # --------------------------------------------------------------------------
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS results_cache '
+                         '(key TEXT PRIMARY KEY, payload TEXT NOT NULL, created_at REAL NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_meta '
+                         '(name TEXT PRIMARY KEY, value REAL NOT NULL, updated_at REAL NOT NULL)')
+            self._local.conn = conn
+        return conn
+
+    def _get_meta(self, name):
+        row = self._conn().execute('SELECT value, updated_at FROM cache_meta WHERE name = ?', (name,)).fetchone()
+        return row if row else (None, None)
+
+    def _set_meta(self, name, value):
+        self._conn().execute('INSERT OR REPLACE INTO cache_meta (name, value, updated_at) VALUES (?, ?, ?)',
+                             (name, value, time.time()))
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    # --------------------------------------------------------------------------
+    # BLOCK TRACKING
+    # --------------------------------------------------------------------------
+    def current_block(self):
+        block, updated_at = self._get_meta('latest_block')
+        # trust the watcher's value while it is fresh, otherwise ask the node
+        if block is not None and time.time() - updated_at < self.watch_interval * 3:
+            return int(block)
+        try:
+            block = self.bc.w3.eth.block_number
+        except Exception:
+            return None
+        self._set_meta('latest_block', block)
+        return block
+
+    def start_watcher(self):
+        if self._watcher:
+            return
+        self._watcher = threading.Thread(target=self._watch, name='block-watcher', daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        while True:
+            try:
+                self._set_meta('latest_block', self.bc.w3.eth.block_number)
+            except Exception:
+                pass
+            time.sleep(self.watch_interval)
+
+    # --------------------------------------------------------------------------
+    # CACHE API
+    # --------------------------------------------------------------------------
+    def get_or_compute(self, name, compute):
+        key, value = self._lookup(name)
+        if value is None:
+            value = self._store(key, compute())
+        return value
+
+    async def get_or_compute_async(self, name, compute):
+        """get_or_compute for async views; compute is a coroutine function."""
+        key, value = self._lookup(name)
+        if value is None:
+            value = self._store(key, await compute())
+        return value
+
+    def _lookup(self, name):
+        generation, _ = self._get_meta('generation')
+        key = '%s:%d:%s' % (name, generation or 0, self.current_block())
+        row = self._conn().execute('SELECT payload, created_at FROM results_cache WHERE key = ?', (key,)).fetchone()
+        if row and time.time() - row[1] < self.ttl:
+            self._count('hits')
+            return key, json.loads(row[0])
+        self._count('misses')
+        return key, None
+
+    def _store(self, key, value):
+        conn = self._conn()
+        conn.execute('INSERT OR REPLACE INTO results_cache (key, payload, created_at) VALUES (?, ?, ?)',
+                     (key, json.dumps(value), time.time()))
+        conn.execute('DELETE FROM results_cache WHERE key NOT IN '
+                     '(SELECT key FROM results_cache ORDER BY created_at DESC LIMIT ?)', (self.max_entries,))
+        return value
+
+    def invalidate(self):
+        conn = self._conn()
+        conn.execute('INSERT INTO cache_meta (name, value, updated_at) VALUES (?, 1, ?) '
+                     'ON CONFLICT(name) DO UPDATE SET value = value + 1, updated_at = excluded.updated_at',
+                     ('generation', time.time()))
+        self._count('invalidations')
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+        lookups = data['hits'] + data['misses']
+        data['hit_ratio'] = round(data['hits'] / lookups, 4) if lookups else None
+        data['entries'] = self._conn().execute('SELECT COUNT(*) FROM results_cache').fetchone()[0]
+        block, _ = self._get_meta('latest_block')
+        data['latest_block'] = int(block) if block is not None else None
+        return data
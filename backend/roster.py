@@ -0,0 +1,113 @@
+import threading
+import time
+from types import SimpleNamespace
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from models import db, Candidate, Election, CacheVersion
+
+CANDIDATE_FIELDS = ('id', 'candidate_number', 'name', 'party', 'age', 'qualification', 'description', 'is_verified')
+
+
+def _snapshot(row, fields):
+    return SimpleNamespace(**{field: getattr(row, field) for field in fields})
+
+
+class RosterCache:
+    """
+    In-process cache of the active election and the candidate list.
+    - Holds plain read-only snapshots, not ORM rows, so they are safe to share
+      between requests and threads.
+    - Admin changes call invalidate(), which bumps the 'roster' row in
+      cache_versions; other workers notice the new version on their next check
+      (at most every ROSTER_VERSION_CHECK_INTERVAL seconds) and reload.
+    """
+    NAME = 'roster'
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._state = None
+        self._stats = {'hits': 0, 'reloads': 0, 'version_checks': 0, 'invalidations': 0}
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.check_interval = app.config.get('ROSTER_VERSION_CHECK_INTERVAL', 1)
+
+    # --------------------------------------------------------------------------
+    # READS
+    # --------------------------------------------------------------------------
+    def active_election(self):
+        return self._current()['election']
+
+    def candidates(self):
+        return self._current()['candidates']
+
+    def candidate(self, candidate_id):
+        return self._current()['by_id'].get(candidate_id)
+
+    def _current(self):
+        state = self._state
+        now = time.monotonic()
+        if state is not None and now - state['checked_at'] < self.check_interval:
+            with self._lock:
+                self._stats['hits'] += 1
+            return state
+
+        version = self._db_version()
+        with self._lock:
+            self._stats['version_checks'] += 1
+            state = self._state
+            if state is not None and state['version'] == version:
+                state['checked_at'] = now
+                self._stats['hits'] += 1
+                return state
+
+        state = self._load(version, now)
+        with self._lock:
+            self._state = state
+            self._stats['reloads'] += 1
+        return state
+
+    def _db_version(self):
+        row = db.session.get(CacheVersion, self.NAME)
+        return row.version if row else 0
+
+    def _load(self, version, now):
+        election = Election.query.filter_by(is_active=True).order_by(Election.id).first()
+        candidates = [_snapshot(c, CANDIDATE_FIELDS) for c in Candidate.query.order_by(Candidate.id)]
+        return {
+            'version': version,
+            'checked_at': now,
+            'election': _snapshot(election, ('id', 'is_active', 'created_at')) if election else None,
+            'candidates': candidates,
+            'by_id': {c.id: c for c in candidates},
+        }
+
+    # --------------------------------------------------------------------------
+    # INVALIDATION
+    # --------------------------------------------------------------------------
+    def invalidate(self):
+        """Call after committing a candidate or election change."""
+        updated = (CacheVersion.query
+                   .filter_by(name=self.NAME)
+                   .update({'version': CacheVersion.version + 1, 'updated_at': datetime.utcnow()},
+                           synchronize_session=False))
+        if not updated:
+            db.session.add(CacheVersion(name=self.NAME, version=1, updated_at=datetime.utcnow()))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # another worker created the row first; bump that one instead
+            db.session.rollback()
+            return self.invalidate()
+        with self._lock:
+            self._state = None
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data['version'] = self._state['version'] if self._state else None
+            data['candidates'] = len(self._state['candidates']) if self._state else None
+        return data
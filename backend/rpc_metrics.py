@@ -0,0 +1,199 @@
+import threading
+import time
+from contextlib import contextmanager
+from web3.middleware import Web3Middleware
+from profiling import phase
+
+# latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (not thread-safe; callers hold a lock)."""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def cumulative(self):
+        """[(upper_bound, cumulative_count), ...] ending with ('+Inf', count)."""
+        total = 0
+        out = []
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            out.append((bound, total))
+        return out
+
+    def quantile(self, q):
+        """Approximate quantile: the upper bound of the bucket holding it."""
+        if not self.count:
+            return None
+        target = q * self.count
+        for bound, total in self.cumulative():
+            if total >= target:
+                return bound
+        return '+Inf'
+
+
+class RPCMetrics:
+    """
+    JSON-RPC instrumentation for one BlockchainClient.
+    - calls / errors / latency histogram per method (methods inside a batch are
+      counted individually and share the batch's latency).
+    - round_trips: HTTP requests actually made (a batch counts once).
+    - in_flight: requests currently waiting on the node.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._calls = {}
+            self._errors = {}
+            self._latency = {}
+            self._round_trips = 0
+            self._in_flight = 0
+            self._failovers = 0
+
+    @contextmanager
+    def track(self, methods, profile=True):
+        with self._lock:
+            self._round_trips += 1
+            self._in_flight += 1
+        start = time.perf_counter()
+        failed = False
+        try:
+            if profile:
+                with phase('rpc'):
+                    yield
+            else:
+                yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._in_flight -= 1
+                for method in methods:
+                    self._calls[method] = self._calls.get(method, 0) + 1
+                    histogram = self._latency.get(method)
+                    if histogram is None:
+                        histogram = self._latency[method] = Histogram()
+                    histogram.observe(elapsed)
+                    if failed:
+                        self._errors[method] = self._errors.get(method, 0) + 1
+
+    def record_error(self, method):
+        """Count a JSON-RPC error object returned without an exception."""
+        with self._lock:
+            self._errors[method] = self._errors.get(method, 0) + 1
+
+    def record_failover(self):
+        with self._lock:
+            self._failovers += 1
+
+    def snapshot(self):
+        with self._lock:
+            calls = dict(self._calls)
+            latency = {
+                method: {
+                    'count': h.count,
+                    'avg_ms': round(h.sum / h.count * 1000, 3) if h.count else None,
+                    'p50_le': h.quantile(0.5),
+                    'p95_le': h.quantile(0.95),
+                    'p99_le': h.quantile(0.99),
+                }
+                for method, h in self._latency.items()
+            }
+            return {
+                'calls': calls,
+                'total_calls': sum(calls.values()),
+                'errors': dict(self._errors),
+                'round_trips': self._round_trips,
+                'in_flight': self._in_flight,
+                'failovers': self._failovers,
+                'latency': latency,
+            }
+
+    def render_prometheus(self, prefix='voting_rpc'):
+        """Prometheus text exposition of every counter and histogram."""
+        with self._lock:
+            lines = [
+                '# HELP %s_requests_total JSON-RPC calls by method.' % prefix,
+                '# TYPE %s_requests_total counter' % prefix,
+            ]
+            lines += ['%s_requests_total{method="%s"} %d' % (prefix, m, n) for m, n in sorted(self._calls.items())]
+            lines += [
+                '# HELP %s_errors_total JSON-RPC calls that raised or returned an error.' % prefix,
+                '# TYPE %s_errors_total counter' % prefix,
+            ]
+            lines += ['%s_errors_total{method="%s"} %d' % (prefix, m, n) for m, n in sorted(self._errors.items())]
+            lines += [
+                '# HELP %s_round_trips_total HTTP requests sent to the node (batches count once).' % prefix,
+                '# TYPE %s_round_trips_total counter' % prefix,
+                '%s_round_trips_total %d' % (prefix, self._round_trips),
+                '# HELP %s_failovers_total Requests moved to another provider URL.' % prefix,
+                '# TYPE %s_failovers_total counter' % prefix,
+                '%s_failovers_total %d' % (prefix, self._failovers),
+                '# HELP %s_in_flight Requests currently waiting on the node.' % prefix,
+                '# TYPE %s_in_flight gauge' % prefix,
+                '%s_in_flight %d' % (prefix, self._in_flight),
+                '# HELP %s_latency_seconds JSON-RPC latency by method.' % prefix,
+                '# TYPE %s_latency_seconds histogram' % prefix,
+            ]
+            for method, h in sorted(self._latency.items()):
+                for bound, total in h.cumulative():
+                    lines.append('%s_latency_seconds_bucket{method="%s",le="%s"} %d' % (prefix, method, bound, total))
+                lines.append('%s_latency_seconds_sum{method="%s"} %.6f' % (prefix, method, h.sum))
+                lines.append('%s_latency_seconds_count{method="%s"} %d' % (prefix, method, h.count))
+        return '\n'.join(lines) + '\n'
+
+
+def metrics_middleware(metrics):
+    """Build a web3 middleware class that feeds every request into metrics."""
+    class RPCMetricsMiddleware(Web3Middleware):
+        def wrap_make_request(self, make_request):
+            def middleware(method, params):
+                with metrics.track((method,)):
+                    response = make_request(method, params)
+                if isinstance(response, dict) and 'error' in response:
+                    metrics.record_error(method)
+                return response
+            return middleware
+
+        def wrap_make_batch_request(self, make_batch_request):
+            def middleware(requests_info):
+                with metrics.track([method for method, _ in requests_info]):
+                    return make_batch_request(requests_info)
+            return middleware
+
+        # async requests interleave on one thread, so they stay out of the
+        # (stack-based, per-thread) request phase breakdown
+        async def async_wrap_make_request(self, make_request):
+            async def middleware(method, params):
+                with metrics.track((method,), profile=False):
+                    response = await make_request(method, params)
+                if isinstance(response, dict) and 'error' in response:
+                    metrics.record_error(method)
+                return response
+            return middleware
+
+        async def async_wrap_make_batch_request(self, make_batch_request):
+            async def middleware(requests_info):
+                with metrics.track([method for method, _ in requests_info], profile=False):
+                    return await make_batch_request(requests_info)
+            return middleware
+
+    return RPCMetricsMiddleware
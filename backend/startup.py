@@ -0,0 +1,36 @@
+import time
+
+
+class StartupTimer:
+    """
+    Wall time of each boot step of a worker, for /admin/stats and /metrics.
+    - Created on the first line of app.py, so the 'imports' step covers the
+      whole module import chain (web3, SQLAlchemy, Flask).
+    - mark(step) closes the step that started at the previous mark.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.steps = []
+
+    def mark(self, step):
+        now = time.perf_counter()
+        self.steps.append((step, now - self._last))
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self.started
+
+    def report(self):
+        return {'total_ms': round(self.total * 1000, 1),
+                'steps_ms': {step: round(seconds * 1000, 1) for step, seconds in self.steps}}
+
+    def render_prometheus(self, prefix='voting_startup'):
+        lines = [
+            '# HELP %s_seconds Worker boot time by step.' % prefix,
+            '# TYPE %s_seconds gauge' % prefix,
+        ]
+        lines += ['%s_seconds{step="%s"} %.6f' % (prefix, step, seconds) for step, seconds in self.steps]
+        lines.append('%s_seconds{step="total"} %.6f' % (prefix, self.total))
+        return '\n'.join(lines) + '\n'
@@ -25,9 +25,9 @@ document.addEventListener('DOMContentLoaded', function() {
   });
 
   let chart;
-  async function fetchResultsAndUpdate() {
-    const r = await fetch('/api/results');
-    const items = await r.json();
+  let items = [];
+
+  function renderChart() {
     const labels = items.map(i => i.name);
     const counts = items.map(i => i.count);
 
@@ -57,6 +57,43 @@ document.addEventListener('DOMContentLoaded', function() {
     }
   }
 
-  fetchResultsAndUpdate();
-  setInterval(fetchResultsAndUpdate, 5000);
+  async function fetchResultsAndUpdate() {
+    const r = await fetch('/api/results');
+    items = await r.json();
+    renderChart();
+  }
+
+  let polling = null;
+  function startPolling() {
+    if (polling) return;
+    fetchResultsAndUpdate();
+    polling = setInterval(fetchResultsAndUpdate, 5000);
+  }
+
+  if (!document.getElementById('resultsChart')) return;
+
+  if (window.EventSource) {
+    // Server pushes a snapshot, then only the rows whose count changed.
+    const source = new EventSource('/api/results/stream');
+    source.addEventListener('snapshot', (e) => {
+      items = JSON.parse(e.data);
+      renderChart();
+    });
+    source.addEventListener('delta', (e) => {
+      const delta = JSON.parse(e.data);
+      const byId = new Map(items.map(i => [i.id, i]));
+      delta.removed.forEach(id => byId.delete(id));
+      delta.changed.forEach(row => byId.set(row.id, row));
+      items = Array.from(byId.values()).sort((a, b) => a.id - b.id);
+      renderChart();
+    });
+    // EventSource does not retry a 503 (stream full, or no threaded server),
+    // so on any error drop the stream and keep the chart fresh by polling.
+    source.onerror = () => {
+      source.close();
+      startPolling();
+    };
+  } else {
+    startPolling();
+  }
 });
@@ -0,0 +1,153 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+
+class Subscriber:
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.closed = False
+
+
+class ResultsBroadcaster:
+    """
+    Fans one upstream results poller out to many Server-Sent Events subscribers.
+    - The poller recomputes results only while someone is subscribed, on every
+      notify() (vote committed, VoteCast indexed) or every poll interval.
+    - Only changed rows are pushed ("delta" events); new subscribers get a
+      "snapshot" first.
+    - Recent events are kept so a reconnecting client can resume from Last-Event-ID.
+      Ids are "<epoch>-<seq>"; an id from another process or restart gets a snapshot.
+    - Every subscriber holds a server thread: serve it from threaded workers
+      (gunicorn.conf.py) and keep RESULTS_STREAM_MAX_SUBSCRIBERS (per process)
+      below their thread count. Clients turned away poll /api/results.
+    """
+    def __init__(self, app=None, compute=None):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._subscribers = set()
+        self._thread = None
+        self._seq = 0
+        self._epoch = '%x' % int(time.time() * 1000)
+        self._rows = {}
+        self._stats = {'published': 0, 'dropped_subscribers': 0}
+        if app:
+            self.init_app(app, compute)
+
+    def init_app(self, app, compute):
+        self.app = app
+        self.compute = compute
+        self.poll_interval = app.config.get('RESULTS_STREAM_POLL_INTERVAL', 2)
+        self.heartbeat = app.config.get('RESULTS_STREAM_HEARTBEAT', 15)
+        self.max_subscribers = app.config.get('RESULTS_STREAM_MAX_SUBSCRIBERS', 1000)
+        self.queue_size = app.config.get('RESULTS_STREAM_QUEUE_SIZE', 64)
+        self._history = deque(maxlen=app.config.get('RESULTS_STREAM_HISTORY', 256))
+
+    # --------------------------------------------------------------------------
+    # UPSTREAM
+    # --------------------------------------------------------------------------
+    def notify(self, *args):
+        self._wake.set()
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name='results-broadcaster', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if not self._subscribers:
+                continue
+            try:
+                with self.app.app_context():
+                    self.refresh()
+            except Exception:
+                self.app.logger.exception("Results stream refresh failed")
+
+    def refresh(self):
+        """Recompute results and publish a delta if any row changed."""
+        rows = {row['id']: row for row in self.compute()}
+        with self._lock:
+            changed = [row for row_id, row in rows.items() if self._rows.get(row_id) != row]
+            removed = [row_id for row_id in self._rows if row_id not in rows]
+            self._rows = rows
+        if changed or removed:
+            self._publish('delta', {'changed': changed, 'removed': removed})
+
+    def _publish(self, kind, data):
+        with self._lock:
+            self._seq += 1
+            event = ('%s-%d' % (self._epoch, self._seq), kind, data)
+            self._history.append(event)
+            self._stats['published'] += 1
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.queue.put_nowait(event)
+            except queue.Full:
+                # slow consumer: drop it, the browser reconnects with Last-Event-ID
+                sub.closed = True
+                self._unsubscribe(sub)
+                with self._lock:
+                    self._stats['dropped_subscribers'] += 1
+
+    # --------------------------------------------------------------------------
+    # SUBSCRIBERS
+    # --------------------------------------------------------------------------
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber, or return None when the fan-out is full."""
+        sub = Subscriber(self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            replay = self._replay_after(last_event_id)
+            if replay is None or len(replay) > self.queue_size:
+                replay = [('%s-%d' % (self._epoch, self._seq), 'snapshot', list(self._rows.values()))]
+            self._subscribers.add(sub)
+        for event in replay:
+            sub.queue.put_nowait(event)
+        self.notify()
+        return sub
+
+    def _replay_after(self, last_event_id):
+        if not last_event_id or '-' not in last_event_id:
+            return None
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self._epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq == self._seq:
+            return []
+        if not self._history or int(self._history[0][0].rsplit('-', 1)[1]) > seq + 1:
+            return None
+        return [event for event in self._history if int(event[0].rsplit('-', 1)[1]) > seq]
+
+    def _unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def stream(self, sub):
+        """Generator of SSE frames for one subscriber, with heartbeat comments."""
+        try:
+            yield 'retry: 3000\n\n'
+            while not sub.closed:
+                try:
+                    event_id, kind, data = sub.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ': heartbeat\n\n'
+                    continue
+                yield 'id: %s\nevent: %s\ndata: %s\n\n' % (event_id, kind, json.dumps(data))
+        finally:
+            self._unsubscribe(sub)
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data['subscribers'] = len(self._subscribers)
+            data['last_event_id'] = '%s-%d' % (self._epoch, self._seq)
+        return data
@@ -0,0 +1,253 @@
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from models import db, Vote
+
+# how long a submitter may hold a claimed vote before it counts as abandoned
+LEASE_SECONDS = 60
+
+
+class VoteQueue:
+    """
+    Queued vote submission (VOTE_QUEUE_ENABLED).
+    - /vote reserves the (user, election) slot with a 'queued' Vote row and
+      returns 202 with a ticket; the row id is pushed onto a bounded queue.
+    - Submitter threads sign and broadcast at most VOTE_QUEUE_RATE tx/s per
+      process (all of its threads together); every web worker runs its own.
+    - A failed broadcast is re-queued up to VOTE_MAX_RETRIES before the vote is
+      marked 'failed'.
+    - A full queue is reported to the caller so /vote can answer 503 + Retry-After.
+    - Each vote is claimed with a conditional UPDATE (queued -> pending, with a
+      locked_until lease), so ids re-queued after a restart or by another
+      process are never sent twice.
+    - A claimed vote whose lease ran out without a tx_hash (the submitter died
+      mid-broadcast) is re-queued, or settled if the chain already has it; this
+      sweep runs at start and every LEASE_SECONDS.
+    """
+    def __init__(self, app=None, bc=None, on_submitted=None):
+        self.bc = None
+        self._threads = []
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._next_sweep = 0.0
+        self._stats = {'enqueued': 0, 'rejected': 0, 'submitted': 0, 'failed': 0, 'wait_seconds_total': 0.0}
+        if app:
+            self.init_app(app, bc, on_submitted)
+
+    def init_app(self, app, bc, on_submitted=None):
+        self.app = app
+        self.bc = bc
+        self.on_submitted = on_submitted
+        self.enabled = app.config.get('VOTE_QUEUE_ENABLED', False)
+        self.workers = app.config.get('VOTE_QUEUE_WORKERS', 4)
+        self.rate = app.config.get('VOTE_QUEUE_RATE', 20)
+        self.max_depth = app.config.get('VOTE_QUEUE_MAX_DEPTH', 5000)
+        self.max_retries = app.config.get('VOTE_MAX_RETRIES', 3)
+        self.queue = queue.Queue(maxsize=self.max_depth)
+
+    # --------------------------------------------------------------------------
+    # ADMISSION
+    # --------------------------------------------------------------------------
+    def full(self):
+        return self.queue.full()
+
+    def retry_after(self):
+        """Seconds until the current backlog should have drained."""
+        return max(1, int(self.queue.qsize() / self.rate) if self.rate else 1)
+
+    def enqueue(self, vote_id):
+        """Queue a reserved vote. Returns False (and counts a rejection) when full."""
+        try:
+            self.queue.put_nowait(vote_id)
+        except queue.Full:
+            with self._lock:
+                self._stats['rejected'] += 1
+            return False
+        with self._lock:
+            self._stats['enqueued'] += 1
+        return True
+
+    def reject(self):
+        with self._lock:
+            self._stats['rejected'] += 1
+
+    # --------------------------------------------------------------------------
+    # SUBMITTERS
+    # --------------------------------------------------------------------------
+    def start(self):
+        if self._threads:
+            return
+        with self.app.app_context():
+            self.recover()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name='vote-submitter-%d' % i, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def recover(self):
+        """Re-queue votes reserved before a restart. Returns how many were queued."""
+        self.release_abandoned()
+        ids = [vote_id for (vote_id,) in (db.session.query(Vote.id)
+                                          .filter(Vote.tx_status == 'queued')
+                                          .order_by(Vote.id)
+                                          .limit(self.max_depth))]
+        for vote_id in ids:
+            self.queue.put_nowait(vote_id)
+        return len(ids)
+
+    def release_abandoned(self):
+        """
+        Settle claimed votes with no tx_hash whose lease has run out: re-queue
+        them, or mark them confirmed when the voter's vote is already on chain
+        (sent just before the submitter died). Returns how many were re-queued.
+        """
+        now = datetime.utcnow()
+        abandoned = (Vote.query
+                     .filter(Vote.tx_status == 'pending', Vote.tx_hash.is_(None),
+                             db.or_(Vote.locked_until.is_(None), Vote.locked_until < now))
+                     .order_by(Vote.id)
+                     .limit(self.max_depth)
+                     .all())
+        requeued = 0
+        for vote in abandoned:
+            try:
+                # verify_vote() reads an RPC error as "not voted", which would re-send it
+                voted = self.bc.has_voted(vote.user.blockchain_address)
+            except Exception as e:
+                self.app.logger.warning("Checking abandoned vote %s failed, leaving it for the next sweep: %s",
+                                        vote.id, e)
+                continue
+            if voted:
+                values = {'tx_status': 'confirmed', 'confirmed_at': now, 'locked_until': None,
+                          'tx_error': 'sent before its submitter stopped; tx hash not recorded'}
+            else:
+                values = {'tx_status': 'queued', 'locked_until': None}
+            lease = (Vote.locked_until.is_(None) if vote.locked_until is None
+                     else Vote.locked_until == vote.locked_until)
+            released = (Vote.query
+                        .filter(Vote.id == vote.id, Vote.tx_status == 'pending', Vote.tx_hash.is_(None), lease)
+                        .update(values, synchronize_session=False))
+            db.session.commit()
+            # a full queue leaves the row 'queued' for recover() to pick up
+            if released and not voted and self.enqueue(vote.id):
+                requeued += 1
+        return requeued
+
+    def _sweep(self):
+        """release_abandoned() at most once per LEASE_SECONDS across the submitter threads."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + LEASE_SECONDS
+        try:
+            with self.app.app_context():
+                self.release_abandoned()
+        except Exception:
+            self.app.logger.exception("Releasing abandoned votes failed")
+
+    def _run(self):
+        while True:
+            self._sweep()
+            try:
+                vote_id = self.queue.get(timeout=LEASE_SECONDS)
+            except queue.Empty:
+                continue
+            self._throttle()
+            try:
+                with self.app.app_context():
+                    self.submit(vote_id)
+            except Exception:
+                self.app.logger.exception("Submitting queued vote %s failed", vote_id)
+            finally:
+                self.queue.task_done()
+
+    def _throttle(self):
+        """Shared rate limit across all submitter threads."""
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+    def submit(self, vote_id):
+        """Claim one queued vote and broadcast it. Returns False if already taken."""
+        lease = datetime.utcnow() + timedelta(seconds=LEASE_SECONDS)
+        claimed = (Vote.query
+                   .filter(Vote.id == vote_id, Vote.tx_status == 'queued')
+                   .update({'tx_status': 'pending', 'locked_until': lease}, synchronize_session=False))
+        db.session.commit()
+        if not claimed:
+            return False
+
+        vote = db.session.get(Vote, vote_id)
+        user = vote.user
+        try:
+            vote.tx_hash = self.bc.cast_vote(user.blockchain_private_key, vote.candidate.candidate_number,
+                                             user.blockchain_address)
+        except Exception as e:
+            vote.tx_error = str(e)[:255]
+            vote.retries += 1
+            retry = vote.retries < self.max_retries
+            vote.tx_status = 'queued' if retry else 'failed'
+            vote.locked_until = None
+            db.session.commit()
+            # a full queue leaves the row 'queued' for recover() to pick up
+            if not (retry and self.enqueue(vote_id)):
+                with self._lock:
+                    self._stats['failed'] += 1
+                self.app.logger.warning("Queued vote %s failed: %s", vote_id, e)
+            return True
+
+        vote.submitted_at = datetime.utcnow()
+        vote.locked_until = None
+        db.session.commit()
+        with self._lock:
+            self._stats['submitted'] += 1
+            if vote.queued_at:
+                self._stats['wait_seconds_total'] += (vote.submitted_at - vote.queued_at).total_seconds()
+        if self.on_submitted:
+            self.on_submitted()
+        return True
+
+    # --------------------------------------------------------------------------
+    # STATUS
+    # --------------------------------------------------------------------------
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+        waited = data.pop('wait_seconds_total')
+        data['avg_wait_seconds'] = round(waited / data['submitted'], 3) if data['submitted'] else None
+        data.update({
+            'enabled': self.enabled,
+            'depth': self.queue.qsize(),
+            'max_depth': self.max_depth,
+            'workers': self.workers,
+            'rate': self.rate,
+        })
+        return data
+
+    def render_prometheus(self, prefix='voting_vote_queue'):
+        data = self.stats()
+        lines = [
+            '# HELP %s_depth Votes waiting to be submitted.' % prefix,
+            '# TYPE %s_depth gauge' % prefix,
+            '%s_depth %d' % (prefix, data['depth']),
+            '# HELP %s_max_depth Queue capacity before /vote answers 503.' % prefix,
+            '# TYPE %s_max_depth gauge' % prefix,
+            '%s_max_depth %d' % (prefix, data['max_depth']),
+        ]
+        for name, help_text in (('enqueued', 'Votes accepted into the queue.'),
+                                ('rejected', 'Votes refused because the queue was full.'),
+                                ('submitted', 'Queued votes broadcast to the node.'),
+                                ('failed', 'Queued votes whose broadcast failed.')):
+            lines += [
+                '# HELP %s_%s_total %s' % (prefix, name, help_text),
+                '# TYPE %s_%s_total counter' % (prefix, name),
+                '%s_%s_total %d' % (prefix, name, data[name]),
+            ]
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,181 @@
+import csv
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import partial
+from itertools import islice
+from eth_account import Account
+from auth import hash_password, process_pool
+from models import db, User, OnboardingJob, ImportJob
+
+REQUIRED_FIELDS = ('username', 'email', 'password', 'voter_id')
+MAX_REPORTED_ERRORS = 50
+
+
+def iter_records(stream, fmt):
+    """Yield voter dicts from a CSV or JSONL text stream without reading it whole."""
+    if fmt == 'jsonl':
+        for line in stream:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # malformed line: the importer skips it as an invalid record
+                    yield None
+    else:
+        yield from csv.DictReader(stream)
+
+
+def _prepare(password_settings, record):
+    """Runs in a worker process: hash the password and create the voter's account."""
+    acct = Account.create()
+    return {
+        'username': record['username'],
+        'email': record['email'],
+        'password_hash': hash_password(password_settings, record['password']),
+        'voter_id': record['voter_id'],
+        'role': 'voter',
+        'blockchain_address': acct.address,
+        'blockchain_private_key': acct.key.hex(),
+    }
+
+
+class VoterImporter:
+    """
+    Streaming bulk import of voters.
+    - Records are read lazily and processed in chunks of VOTER_IMPORT_CHUNK_SIZE.
+    - Password hashing (PASSWORD_SCHEME) and key generation run on a process pool.
+    - Users and their onboarding jobs are inserted with one executemany per chunk;
+      the onboarding workers then fund and register them on chain.
+    """
+    def __init__(self, app=None, onboarding=None, hasher=None):
+        if app:
+            self.init_app(app, onboarding, hasher)
+
+    def init_app(self, app, onboarding, hasher):
+        self.app = app
+        self.onboarding = onboarding
+        self.hasher = hasher
+        self.chunk_size = app.config.get('VOTER_IMPORT_CHUNK_SIZE', 1000)
+        self.processes = app.config.get('VOTER_IMPORT_PROCESSES') or None
+
+    def run(self, records, progress=None):
+        """Import every record; progress(stats) is called after each chunk."""
+        stats = {'read': 0, 'imported': 0, 'skipped': 0, 'errors': [], 'started_at': time.time()}
+        records = iter(records)
+        with process_pool(self.processes) as pool:
+            while True:
+                chunk = list(islice(records, self.chunk_size))
+                if not chunk:
+                    break
+                stats['read'] += len(chunk)
+                valid = self._validate(chunk, stats)
+                if valid:
+                    prepare = partial(_prepare, self.hasher.settings)
+                    rows = list(pool.map(prepare, valid, chunksize=max(1, len(valid) // 32)))
+                    self._insert(rows)
+                    stats['imported'] += len(rows)
+                    self.onboarding.notify()
+                stats['elapsed'] = round(time.time() - stats['started_at'], 3)
+                stats['per_second'] = round(stats['imported'] / stats['elapsed'], 1) if stats['elapsed'] else None
+                if progress:
+                    progress(stats)
+        return stats
+
+    def _error(self, stats, message):
+        stats['skipped'] += 1
+        if len(stats['errors']) < MAX_REPORTED_ERRORS:
+            stats['errors'].append(message)
+
+    def _validate(self, chunk, stats):
+        cleaned = []
+        for n, record in enumerate(chunk, stats['read'] - len(chunk) + 1):
+            if not isinstance(record, dict):
+                self._error(stats, 'record %d is not a JSON object' % n)
+                continue
+            # JSONL values may be numbers, booleans, null or nested objects
+            values = {field: record.get(field) for field in REQUIRED_FIELDS}
+            if any(isinstance(value, (dict, list)) for value in values.values()):
+                self._error(stats, 'non-text field in record %d' % n)
+                continue
+            values = {field: '' if value is None else str(value) for field, value in values.items()}
+            if any(not values[field].strip() for field in REQUIRED_FIELDS):
+                self._error(stats, 'missing field in record %d' % n)
+                continue
+            cleaned.append({
+                'username': values['username'].strip(),
+                'email': values['email'].strip().lower(),
+                'password': values['password'],
+                'voter_id': values['voter_id'].strip(),
+            })
+
+        emails = {r['email'] for r in cleaned}
+        voter_ids = {r['voter_id'] for r in cleaned}
+        taken_emails = {e for (e,) in db.session.query(User.email).filter(User.email.in_(emails))}
+        taken_ids = {v for (v,) in db.session.query(User.voter_id).filter(User.voter_id.in_(voter_ids))}
+
+        valid = []
+        for record in cleaned:
+            if record['email'] in taken_emails:
+                self._error(stats, 'email already registered: %s' % record['email'])
+            elif record['voter_id'] in taken_ids:
+                self._error(stats, 'voter id already used: %s' % record['voter_id'])
+            else:
+                # also catches duplicates inside the same chunk
+                taken_emails.add(record['email'])
+                taken_ids.add(record['voter_id'])
+                valid.append(record)
+        return valid
+
+    def _insert(self, rows):
+        db.session.execute(db.insert(User), rows)
+        emails = [r['email'] for r in rows]
+        user_ids = [uid for (uid,) in db.session.query(User.id).filter(User.email.in_(emails))]
+        db.session.execute(db.insert(OnboardingJob), [{'user_id': uid, 'step': 'fund'} for uid in user_ids])
+        db.session.commit()
+
+    # --------------------------------------------------------------------------
+    # BACKGROUND JOBS (upload endpoint)
+    # --------------------------------------------------------------------------
+    def start_job(self, path, fmt):
+        """Import the file at path on a background thread; returns a job id."""
+        job_id = uuid.uuid4().hex
+        db.session.add(ImportJob(id=job_id, status='running'))
+        db.session.commit()
+        threading.Thread(target=self._run_job, args=(job_id, path, fmt), daemon=True).start()
+        return job_id
+
+    def _run_job(self, job_id, path, fmt):
+        def progress(stats):
+            (ImportJob.query.filter_by(id=job_id)
+             .update({'stats': json.dumps(stats), 'updated_at': datetime.utcnow()}, synchronize_session=False))
+            db.session.commit()
+
+        with self.app.app_context():
+            try:
+                with io.open(path, newline='', encoding='utf-8') as f:
+                    stats = self.run(iter_records(f, fmt), progress)
+                values = {'status': 'done', 'stats': json.dumps(stats)}
+            except Exception as e:
+                self.app.logger.exception("Voter import %s failed", job_id)
+                db.session.rollback()
+                values = {'status': 'failed', 'error': str(e)}
+            finally:
+                os.remove(path)
+            values['updated_at'] = datetime.utcnow()
+            ImportJob.query.filter_by(id=job_id).update(values, synchronize_session=False)
+            db.session.commit()
+
+    def job_status(self, job_id):
+        job = db.session.get(ImportJob, job_id)
+        if not job:
+            return None
+        data = {'status': job.status, 'stats': json.loads(job.stats) if job.stats else None}
+        if job.error:
+            data['error'] = job.error
+        return data
@@ -39,6 +39,18 @@ contract Voting {
         emit VoterRegistered(_voter);
     }
 
+    // Batch registration; already-registered addresses are skipped so one
+    // duplicate does not revert the whole chunk.
+    function registerVoters(address[] calldata _voters) public onlyOwner {
+        for (uint i = 0; i < _voters.length; i++) {
+            address voter = _voters[i];
+            if (!registeredVoter[voter]) {
+                registeredVoter[voter] = true;
+                emit VoterRegistered(voter);
+            }
+        }
+    }
+
     function castVote(uint _candidateId) public {
         require(registeredVoter[msg.sender], "Not registered");
         require(!hasVoted[msg.sender], "Already voted");
@@ -55,6 +67,14 @@ contract Voting {
         return candidates[_candidateId].voteCount;
     }
 
+    function getAllVoteCounts() public view returns (uint[] memory) {
+        uint[] memory counts = new uint[](candidatesCount);
+        for (uint i = 1; i <= candidatesCount; i++) {
+            counts[i - 1] = candidates[i].voteCount;
+        }
+        return counts;
+    }
+
     function verifyVote(address _voter) public view returns (bool) {
         return hasVoted[_voter];
     }
@@ -0,0 +1,14 @@
+-- Receipt tracking columns on votes (backend/receipts.py).
+-- Existing rows were broadcast before tracking existed; they start as 'pending'
+-- and are resolved by the tracker on its next pass.
+USE votingdb;
+
+ALTER TABLE votes
+  ADD COLUMN tx_status ENUM('pending','confirmed','failed','dropped') NOT NULL DEFAULT 'pending',
+  ADD COLUMN block_number INT NULL,
+  ADD COLUMN gas_used INT NULL,
+  ADD COLUMN tx_error VARCHAR(255) NULL,
+  ADD COLUMN retries INT NOT NULL DEFAULT 0,
+  ADD COLUMN submitted_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  ADD COLUMN confirmed_at DATETIME NULL,
+  ADD INDEX idx_votes_tx_status (tx_status);
@@ -0,0 +1,7 @@
+-- Queued vote submission (backend/vote_queue.py).
+-- 'queued' marks a reserved vote that has not been broadcast yet.
+USE votingdb;
+
+ALTER TABLE votes
+  MODIFY COLUMN tx_status ENUM('queued','pending','confirmed','failed','dropped') NOT NULL DEFAULT 'pending',
+  ADD COLUMN queued_at DATETIME NULL;
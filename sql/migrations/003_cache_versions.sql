@@ -0,0 +1,8 @@
+-- Version counters for in-process caches (backend/roster.py).
+USE votingdb;
+
+CREATE TABLE cache_versions (
+  name VARCHAR(50) PRIMARY KEY,
+  version INT NOT NULL DEFAULT 0,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,11 @@
+-- Indexes for the active-election lookup, tx hash lookups and per-election tallies.
+-- On large votes tables run this off-peak; InnoDB builds the indexes online.
+USE votingdb;
+
+ALTER TABLE elections
+  ADD INDEX idx_elections_active (is_active);
+
+ALTER TABLE votes
+  ADD INDEX idx_votes_tx_hash (tx_hash),
+  ADD INDEX idx_votes_election_candidate (election_id, candidate_id, tx_status),
+  ADD INDEX idx_votes_candidate (candidate_id);
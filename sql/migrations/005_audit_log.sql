@@ -0,0 +1,32 @@
+-- Merkle audit log of recorded votes (backend/audit.py).
+USE votingdb;
+
+CREATE TABLE audit_leaves (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  election_id INT NOT NULL,
+  position INT NOT NULL,
+  vote_id INT NOT NULL UNIQUE,
+  leaf_hash CHAR(64) NOT NULL,
+  UNIQUE KEY unique_audit_position (election_id, position),
+  FOREIGN KEY (election_id) REFERENCES elections(id),
+  FOREIGN KEY (vote_id) REFERENCES votes(id)
+);
+
+CREATE TABLE audit_nodes (
+  election_id INT NOT NULL,
+  level INT NOT NULL,
+  node_index INT NOT NULL,
+  hash CHAR(64) NOT NULL,
+  PRIMARY KEY (election_id, level, node_index)
+);
+
+CREATE TABLE audit_roots (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  election_id INT NOT NULL,
+  tree_size INT NOT NULL,
+  root CHAR(64) NOT NULL,
+  anchor_tx_hash VARCHAR(66) NULL,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  INDEX idx_audit_roots_election (election_id),
+  FOREIGN KEY (election_id) REFERENCES elections(id)
+);
@@ -0,0 +1,19 @@
+-- Pre-funded, pre-registered voter accounts (backend/account_pool.py).
+USE votingdb;
+
+CREATE TABLE account_pool (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  address VARCHAR(255) NOT NULL UNIQUE,
+  private_key VARCHAR(255) NOT NULL,
+  state ENUM('fund','register','confirm','ready','claimed','failed') NOT NULL DEFAULT 'fund',
+  attempts INT NOT NULL DEFAULT 0,
+  fund_tx_hash VARCHAR(200),
+  register_tx_hash VARCHAR(200),
+  last_error TEXT,
+  user_id INT NULL UNIQUE,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  ready_at DATETIME NULL,
+  claimed_at DATETIME NULL,
+  INDEX idx_account_pool_state (state),
+  FOREIGN KEY (user_id) REFERENCES users(id)
+);
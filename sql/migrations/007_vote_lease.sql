@@ -0,0 +1,7 @@
+-- Lease on votes held while one process broadcasts them: the vote queue
+-- submitter (backend/vote_queue.py) and the receipt tracker re-sending one
+-- (backend/receipts.py).
+USE votingdb;
+
+ALTER TABLE votes
+  ADD COLUMN locked_until DATETIME NULL;
@@ -0,0 +1,11 @@
+-- Status of admin voter uploads (backend/voter_import.py), shared by all workers.
+USE votingdb;
+
+CREATE TABLE import_jobs (
+  id VARCHAR(32) PRIMARY KEY,
+  status ENUM('running','done','failed') NOT NULL DEFAULT 'running',
+  stats TEXT,
+  error TEXT,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
@@ -0,0 +1,19 @@
+-- Background voter onboarding queue (backend/onboarding.py):
+-- fund -> registerVoter -> confirm receipts, one row per user.
+USE votingdb;
+
+CREATE TABLE IF NOT EXISTS onboarding_jobs (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  user_id INT NOT NULL UNIQUE,
+  step ENUM('fund','register','confirm','done','failed') NOT NULL DEFAULT 'fund',
+  attempts INT NOT NULL DEFAULT 0,
+  next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  locked_until DATETIME NULL,
+  fund_tx_hash VARCHAR(200),
+  register_tx_hash VARCHAR(200),
+  last_error TEXT,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  INDEX idx_onboarding_step (step),
+  FOREIGN KEY (user_id) REFERENCES users(id)
+);
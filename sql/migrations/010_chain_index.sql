@@ -0,0 +1,39 @@
+-- Local read-model of VoterRegistered / VoteCast events (backend/indexer.py).
+-- The indexer fills these from INDEXER_START_BLOCK on its first pass.
+USE votingdb;
+
+CREATE TABLE IF NOT EXISTS indexer_state (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  name VARCHAR(50) NOT NULL UNIQUE,
+  contract_address VARCHAR(42),
+  last_block INT NOT NULL DEFAULT -1,
+  last_block_hash VARCHAR(66),
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS chain_events (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  event VARCHAR(32) NOT NULL,
+  voter_address VARCHAR(42) NOT NULL,
+  candidate_number INT NULL,
+  block_number INT NOT NULL,
+  block_hash VARCHAR(66) NOT NULL,
+  tx_hash VARCHAR(66) NOT NULL,
+  log_index INT NOT NULL,
+  UNIQUE KEY unique_chain_event (tx_hash, log_index),
+  INDEX idx_chain_events_voter (voter_address),
+  INDEX idx_chain_events_block (block_number)
+);
+
+CREATE TABLE IF NOT EXISTS chain_tallies (
+  candidate_number INT PRIMARY KEY,
+  vote_count INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS chain_voters (
+  address VARCHAR(42) PRIMARY KEY,
+  registered TINYINT(1) NOT NULL DEFAULT 0,
+  has_voted TINYINT(1) NOT NULL DEFAULT 0,
+  candidate_number INT NULL,
+  vote_block INT NULL
+);
@@ -0,0 +1,6 @@
+-- Backoff before the receipt tracker (backend/receipts.py) re-sends a vote
+-- that reverted with a retryable reason such as "Not registered".
+USE votingdb;
+
+ALTER TABLE votes
+  ADD COLUMN next_retry_at DATETIME NULL;
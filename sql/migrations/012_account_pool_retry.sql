@@ -0,0 +1,6 @@
+-- Drop detection and failure backoff for pool accounts (backend/account_pool.py).
+USE votingdb;
+
+ALTER TABLE account_pool
+  ADD COLUMN submitted_at DATETIME NULL,
+  ADD COLUMN next_attempt_at DATETIME NULL;
@@ -0,0 +1,7 @@
+-- Keep the exact data each audit leaf hashed (backend/audit.py), so inclusion
+-- proofs do not depend on the vote row staying unchanged. Existing leaves stay
+-- NULL and their proofs are rebuilt from the vote as before.
+USE votingdb;
+
+ALTER TABLE audit_leaves
+  ADD COLUMN leaf_data VARCHAR(255) NULL;
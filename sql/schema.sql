@@ -16,7 +16,8 @@ CREATE TABLE users (
 CREATE TABLE elections (
   id INT AUTO_INCREMENT PRIMARY KEY,
   is_active TINYINT(1) DEFAULT 0,
-  created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  INDEX idx_elections_active (is_active)
 );
 
 CREATE TABLE candidates (
@@ -36,8 +37,144 @@ CREATE TABLE votes (
   candidate_id INT NOT NULL,
   election_id INT NOT NULL,
   tx_hash VARCHAR(255),
+  tx_status ENUM('queued','pending','confirmed','failed','dropped') NOT NULL DEFAULT 'pending',
+  block_number INT NULL,
+  gas_used INT NULL,
+  tx_error VARCHAR(255) NULL,
+  retries INT NOT NULL DEFAULT 0,
+  submitted_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  confirmed_at DATETIME NULL,
+  queued_at DATETIME NULL,
+  locked_until DATETIME NULL,
+  next_retry_at DATETIME NULL,
   UNIQUE KEY unique_vote (user_id, election_id),
+  INDEX idx_votes_tx_status (tx_status),
+  INDEX idx_votes_tx_hash (tx_hash),
+  INDEX idx_votes_election_candidate (election_id, candidate_id, tx_status),
+  INDEX idx_votes_candidate (candidate_id),
   FOREIGN KEY (user_id) REFERENCES users(id),
   FOREIGN KEY (candidate_id) REFERENCES candidates(id),
   FOREIGN KEY (election_id) REFERENCES elections(id)
 );
+
+-- background voter onboarding (fund -> registerVoter -> confirm receipts)
+CREATE TABLE onboarding_jobs (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  user_id INT NOT NULL UNIQUE,
+  step ENUM('fund','register','confirm','done','failed') NOT NULL DEFAULT 'fund',
+  attempts INT NOT NULL DEFAULT 0,
+  next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  locked_until DATETIME NULL,
+  fund_tx_hash VARCHAR(200),
+  register_tx_hash VARCHAR(200),
+  last_error TEXT,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  INDEX idx_onboarding_step (step),
+  FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+-- local read-model of contract events (backend/indexer.py)
+CREATE TABLE indexer_state (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  name VARCHAR(50) NOT NULL UNIQUE,
+  contract_address VARCHAR(42),
+  last_block INT NOT NULL DEFAULT -1,
+  last_block_hash VARCHAR(66),
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE chain_events (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  event VARCHAR(32) NOT NULL,
+  voter_address VARCHAR(42) NOT NULL,
+  candidate_number INT NULL,
+  block_number INT NOT NULL,
+  block_hash VARCHAR(66) NOT NULL,
+  tx_hash VARCHAR(66) NOT NULL,
+  log_index INT NOT NULL,
+  UNIQUE KEY unique_chain_event (tx_hash, log_index),
+  INDEX idx_chain_events_voter (voter_address),
+  INDEX idx_chain_events_block (block_number)
+);
+
+CREATE TABLE chain_tallies (
+  candidate_number INT PRIMARY KEY,
+  vote_count INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE chain_voters (
+  address VARCHAR(42) PRIMARY KEY,
+  registered TINYINT(1) NOT NULL DEFAULT 0,
+  has_voted TINYINT(1) NOT NULL DEFAULT 0,
+  candidate_number INT NULL,
+  vote_block INT NULL
+);
+
+CREATE TABLE cache_versions (
+  name VARCHAR(50) PRIMARY KEY,
+  version INT NOT NULL DEFAULT 0,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Merkle audit log of recorded votes (backend/audit.py)
+CREATE TABLE audit_leaves (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  election_id INT NOT NULL,
+  position INT NOT NULL,
+  vote_id INT NOT NULL UNIQUE,
+  leaf_data VARCHAR(255) NULL,
+  leaf_hash CHAR(64) NOT NULL,
+  UNIQUE KEY unique_audit_position (election_id, position),
+  FOREIGN KEY (election_id) REFERENCES elections(id),
+  FOREIGN KEY (vote_id) REFERENCES votes(id)
+);
+
+CREATE TABLE audit_nodes (
+  election_id INT NOT NULL,
+  level INT NOT NULL,
+  node_index INT NOT NULL,
+  hash CHAR(64) NOT NULL,
+  PRIMARY KEY (election_id, level, node_index)
+);
+
+CREATE TABLE audit_roots (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  election_id INT NOT NULL,
+  tree_size INT NOT NULL,
+  root CHAR(64) NOT NULL,
+  anchor_tx_hash VARCHAR(66) NULL,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  INDEX idx_audit_roots_election (election_id),
+  FOREIGN KEY (election_id) REFERENCES elections(id)
+);
+
+-- Pre-funded, pre-registered voter accounts (backend/account_pool.py)
+CREATE TABLE account_pool (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  address VARCHAR(255) NOT NULL UNIQUE,
+  private_key VARCHAR(255) NOT NULL,
+  state ENUM('fund','register','confirm','ready','claimed','failed') NOT NULL DEFAULT 'fund',
+  attempts INT NOT NULL DEFAULT 0,
+  fund_tx_hash VARCHAR(200),
+  register_tx_hash VARCHAR(200),
+  last_error TEXT,
+  submitted_at DATETIME NULL,
+  next_attempt_at DATETIME NULL,
+  user_id INT NULL UNIQUE,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  ready_at DATETIME NULL,
+  claimed_at DATETIME NULL,
+  INDEX idx_account_pool_state (state),
+  FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+-- Status of admin voter uploads (backend/voter_import.py)
+CREATE TABLE import_jobs (
+  id VARCHAR(32) PRIMARY KEY,
+  status ENUM('running','done','failed') NOT NULL DEFAULT 'running',
+  stats TEXT,
+  error TEXT,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);